@@ -0,0 +1,554 @@
+from __future__ import annotations
+
+# Standard library imports
+from pathlib import Path
+from typing import AsyncGenerator, Optional, Tuple, Union
+
+# Local imports
+from .lazy_import import lazy_import
+from .AsyncRestClient import AsyncRestClient
+from .TTLCache import TTLCache
+from .CDCS import detect_cdcsversion, parse_cdcsversion, read_token
+from .CDCS._template import manager_keys, template_keys
+from .CDCS._query import build_query, format_query_records
+from .CDCS._record import format_records
+
+# asyncio is imported on first use
+asyncio = lazy_import('asyncio')
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
+
+class AsyncCDCS(AsyncRestClient):
+    """
+    asyncio class for searching and retrieving the records and templates of
+    a Configurable Database Curation System (CDCS) database.  The REST calls
+    are sent with httpx so that the pages of large searches and the calls of
+    many concurrent searches share one event loop and connection pool.  The
+    queries are built and the results formatted by the same functions as the
+    CDCS class so that the returned DataFrames match.  Use the CDCS class for
+    uploading and managing content.
+    """
+    def __init__(self, host: str,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 token: Union[str, Path, None] = None,
+                 headers: Optional[dict] = None,
+                 cdcsversion: Optional[str] = None,
+                 template_cache_ttl: Optional[float] = None,
+                 **kwargs):
+        """
+        Class initializer.  Stores access information.
+
+        Parameters
+        ----------
+        host : str
+            URL for the database's server.
+        username : str, optional
+            Username of desired account on the server. A prompt will ask for
+            the username if not given. An empty str '' indicates that no
+            authentication information is needed.
+        password : str, optional
+            Password of desired account on the server.  A prompt will ask for
+            the password if not given.
+        token : str or file path, optional
+            An API access token to the CDCS instance.  This can be specified
+            by directly inputting the token, giving a file path to a file that
+            contains only the token, or specifying an environmental path
+            variable that contains the token or file path.
+            If you use a token, set username='' to skip the prompts.
+        headers : dict, optional
+            Any headers content that should be specified whenever making a rest
+            call.  If token is given, the token is added to it.
+        cdcsversion : str, optional
+            Allows for specifying the full CDCS version to ensure the class
+            methods perform the correct REST calls.  This can be specified as
+            "#.#.#".  If not given, the version is detected when entering the
+            object as an async context manager or by calling
+            set_cdcsversion().
+        template_cache_ttl : float, optional
+            If given, template and template manager information fetched from
+            the database will be cached for this many seconds to reduce the
+            number of REST calls made by methods that look up templates.
+            Default value of None does not cache templates.
+        **kwargs : any, optional
+            Any extra keyword arguments supported by AsyncRestClient, such as
+            max_concurrency.
+        """
+        self.__template_cache = TTLCache(template_cache_ttl)
+
+        hidden = None
+        if token is not None:
+            headers = dict(headers) if headers is not None else {}
+            hidden = {'token': read_token(token)}
+            headers['Authorization'] = 'Token Hidden(token)'
+
+        super().__init__(host, username=username, password=password,
+                         headers=headers, hidden=hidden, **kwargs)
+
+        self.__cdcsversion = None
+        if cdcsversion is not None:
+            self.__cdcsversion = parse_cdcsversion(cdcsversion)
+
+    async def __aenter__(self):
+        if self.__cdcsversion is None:
+            await self.set_cdcsversion()
+        return self
+
+    @property
+    def cdcsversion(self) -> Tuple:
+        """Set CDCS version for 2.X.X, or core version bumped by 1 major version for 3.X.X"""
+        if self.__cdcsversion is None:
+            raise ValueError('cdcsversion not known: use async with or set_cdcsversion()')
+        return self.__cdcsversion
+
+    @property
+    def template_cache(self) -> TTLCache:
+        """cdcs.TTLCache: The cache used for template information"""
+        return self.__template_cache
+
+    async def set_cdcsversion(self, cdcsversion: Optional[str] = None):
+        """
+        Sets the CDCS version, detecting it from the database if not given.
+
+        Parameters
+        ----------
+        cdcsversion : str, optional
+            The version as "#.#.#".
+        """
+        if cdcsversion is None:
+            response = await self.get('/rest/core-settings/', checkstatus=False)
+            self.__cdcsversion = detect_cdcsversion(response)
+        else:
+            self.__cdcsversion = parse_cdcsversion(cdcsversion)
+
+    def templates_dataframe(self,
+                            template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                            current: bool = True,
+                            use_cache: bool = True) -> pd.DataFrame:
+        """
+        Used by build_query() once the templates have been fetched, at which
+        point template is always a pandas.DataFrame.
+        """
+        if not isinstance(template, pd.DataFrame):
+            raise TypeError('templates must be fetched with fetch_templates()')
+        return template
+
+    async def get_template_managers(self, title: Optional[str] = None,
+                                    is_disabled: bool = False,
+                                    useronly: bool = False,
+                                    use_cache: bool = True) -> pd.DataFrame:
+        """
+        Get template managers from a curator.  See CDCS.get_template_managers().
+        """
+        # Set url based on useronly value
+        if useronly is False:
+            rest_url = '/rest/template-version-manager/global/'
+        elif useronly is True:
+            rest_url = '/rest/template-version-manager/user/'
+        else:
+            raise TypeError('useronly must be bool')
+
+        # Set params dict based on arguments
+        params = {}
+        if title is not None:
+            params['title'] = title
+        if is_disabled is True:
+            # Sent as requests does, since httpx would send 'true'
+            params['is_disabled'] = str(is_disabled)
+
+        # Check cache
+        key = ('template-managers', rest_url, title, is_disabled)
+        if use_cache:
+            template_managers = self.template_cache.get(key)
+            if template_managers is not None:
+                return template_managers.copy()
+
+        # Get response
+        response = await self.get(rest_url, params=params)
+        template_managers = pd.DataFrame(response.json())
+        if len(template_managers) == 0:
+            template_managers = pd.DataFrame(columns=manager_keys)
+
+        self.template_cache.set(key, template_managers.copy())
+
+        return template_managers
+
+    async def get_template_content(self, template_id: Union[int, str],
+                                   use_cache: bool = True) -> dict:
+        """
+        Gets the information for a single template version by its id.
+        """
+        key = ('template', template_id)
+        if use_cache:
+            content = self.template_cache.get(key)
+            if content is not None:
+                return dict(content)
+
+        response = await self.get(f'/rest/template/{template_id}/')
+        content = response.json()
+
+        self.template_cache.set(key, dict(content))
+
+        return content
+
+    async def get_templates(self, title: Optional[str] = None,
+                            is_disabled: bool = False,
+                            current: bool = True,
+                            useronly: bool = False,
+                            use_cache: bool = True,
+                            include_content: bool = True) -> pd.DataFrame:
+        """
+        Get all templates from a curator, fetching the template versions
+        concurrently.  See CDCS.get_templates().
+        """
+        template_managers = await self.get_template_managers(title=title,
+                                                             is_disabled=is_disabled,
+                                                             useronly=useronly,
+                                                             use_cache=use_cache)
+        if len(template_managers) == 0:
+            return pd.DataFrame(columns=template_keys)
+
+        # List ids and titles of all current templates
+        if current is True:
+            template_ids = template_managers.current.tolist()
+            titles = template_managers.title.tolist()
+
+        # List ids and titles of all templates
+        elif current is False:
+            template_ids = []
+            titles = []
+            for template_manager in template_managers.itertuples():
+                for version_id in template_manager.versions:
+                    template_ids.append(version_id)
+                    titles.append(template_manager.title)
+
+        else:
+            raise TypeError('current must be bool')
+
+        templates = await asyncio.gather(*[self.get_template_content(template_id,
+                                                                     use_cache=use_cache)
+                                           for template_id in template_ids])
+        if not include_content:
+            for content in templates:
+                content.pop('content', None)
+        templates = pd.DataFrame(templates)
+
+        # Add title to content
+        templates['title'] = titles
+
+        return templates
+
+    async def get_template(self, title: Optional[str] = None,
+                           is_disabled: bool = False,
+                           current: bool = True,
+                           useronly: bool = False,
+                           use_cache: bool = True) -> pd.Series:
+        """
+        Gets a single template from a curator.  See CDCS.get_template().
+        """
+        templates = await self.get_templates(title=title, is_disabled=is_disabled,
+                                             current=current, useronly=useronly,
+                                             use_cache=use_cache)
+
+        # Check that number of templates is exactly one.
+        if len(templates) == 1:
+            return templates.iloc[0]
+        elif len(templates) == 0:
+            raise ValueError('No matching template found')
+        else:
+            raise ValueError('Multiple matching templates found')
+
+    async def fetch_templates(self,
+                              template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                              current: bool = True,
+                              use_cache: bool = True) -> pd.DataFrame:
+        """
+        Handles interpreting the different template representations and
+        converting them all into a pandas DataFrame.  See
+        CDCS.templates_dataframe().
+        """
+        if template is None:
+            return await self.get_templates(current=current, use_cache=use_cache)
+
+        elif isinstance(template, str):
+            return await self.get_templates(title=template, current=current,
+                                            use_cache=use_cache)
+
+        elif isinstance(template, pd.Series):
+            return pd.DataFrame([template])
+
+        elif isinstance(template, list):
+            ts = []
+            for t in template:
+                # Check list item type and fetch template as needed
+                if isinstance(t, str):
+                    matches = await self.get_templates(title=t, current=current,
+                                                       use_cache=use_cache)
+                    for index in matches.index:
+                        ts.append(matches.loc[index])
+                elif isinstance(t, pd.Series):
+                    ts.append(t)
+                else:
+                    raise TypeError('invalid template list item type: must be str or pandas.Series')
+            return pd.DataFrame(ts)
+
+        elif isinstance(template, pd.DataFrame):
+            return template
+
+        raise TypeError('Invalid template type: must be str, list, None, pandas.Series or pandas.DataFrame')
+
+    async def build_query(self,
+                          template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                          title: Optional[str] = None,
+                          keyword: Union[str, list, None] = None,
+                          mongoquery: Union[str, dict, None] = None,
+                          current: bool = True,
+                          use_cache: bool = True) -> Tuple[pd.DataFrame, str, dict]:
+        """
+        Fetches the templates and builds the REST url and data for a query
+        search.  See CDCS.query() for a description of the parameters.
+        """
+        templates = await self.fetch_templates(template, current=current,
+                                               use_cache=use_cache)
+        templates, rest_url, data = build_query(self, template=templates,
+                                                title=title, keyword=keyword,
+                                                mongoquery=mongoquery,
+                                                current=current,
+                                                use_cache=use_cache)
+
+        # Searches of all template versions are not limited by template
+        if template is None and current is not True:
+            del data['templates']
+        return templates, rest_url, data
+
+    async def query(self,
+                    template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                    title: Optional[str] = None,
+                    keyword: Union[str, list, None] = None,
+                    mongoquery: Union[str, dict, None] = None,
+                    page: Optional[int] = None,
+                    parse_dates: bool = True,
+                    current: bool = True,
+                    use_cache: bool = True) -> pd.DataFrame:
+        """
+        Search all published local data records using either keyword or
+        mongo-style queries.  After the first page, all remaining pages are
+        requested at the same time, limited by max_concurrency.  See
+        CDCS.query() for a description of the parameters.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The records found by the search, identical to CDCS.query().
+        """
+        templates, rest_url, data = await self.build_query(template=template,
+                                                           title=title,
+                                                           keyword=keyword,
+                                                           mongoquery=mongoquery,
+                                                           current=current,
+                                                           use_cache=use_cache)
+        if page is None:
+            response = await self.post(rest_url, data=data, idempotent=True)
+            records = await get_all_pages(self, 'post', rest_url, response.json(),
+                                          data=data)
+        else:
+            response = await self.post(rest_url, params={'page': page}, data=data,
+                                       idempotent=True)
+            records = response.json()['results']
+
+        return format_query_records(pd.DataFrame(records), templates,
+                                    parse_dates=parse_dates)
+
+    async def query_count(self,
+                          template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                          title: Optional[str] = None,
+                          keyword: Union[str, list, None] = None,
+                          mongoquery: Union[str, dict, None] = None,
+                          current: bool = True,
+                          use_cache: bool = True) -> int:
+        """
+        Search all published local data records using either keyword or
+        mongo-style queries and return only the total count of matching
+        records.  See CDCS.query_count().
+        """
+        templates, rest_url, data = await self.build_query(template=template,
+                                                           title=title,
+                                                           keyword=keyword,
+                                                           mongoquery=mongoquery,
+                                                           current=current,
+                                                           use_cache=use_cache)
+        response = await self.post(rest_url, data=data, idempotent=True)
+        return response.json()['count']
+
+    async def iter_query(self,
+                         template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                         title: Optional[str] = None,
+                         keyword: Union[str, list, None] = None,
+                         mongoquery: Union[str, dict, None] = None,
+                         parse_dates: bool = True,
+                         current: bool = True,
+                         by_page: bool = False,
+                         use_cache: bool = True) -> AsyncGenerator[Union[dict, pd.DataFrame], None]:
+        """
+        Search all published local data records, yielding the results as each
+        page is received while the next page is requested.  See
+        CDCS.iter_query().
+        """
+        templates, rest_url, data = await self.build_query(template=template,
+                                                           title=title,
+                                                           keyword=keyword,
+                                                           mongoquery=mongoquery,
+                                                           current=current,
+                                                           use_cache=use_cache)
+
+        async for response_json in iter_pages(self, 'post', rest_url, data=data):
+            records = format_query_records(pd.DataFrame(response_json['results']),
+                                           templates, parse_dates=parse_dates)
+            if by_page:
+                yield records
+            else:
+                for record in records.to_dict('records'):
+                    yield record
+
+    async def get_records(self, template: Union[str, pd.Series, None] = None,
+                          title: Optional[str] = None,
+                          page: Optional[int] = None,
+                          parse_dates: bool = True) -> pd.DataFrame:
+        """
+        Retrieves user records.  After the first page, all remaining pages are
+        requested at the same time, limited by max_concurrency.  See
+        CDCS.get_records().
+
+        Returns
+        -------
+        pandas.DataFrame
+            All matching user records, identical to CDCS.get_records().
+        """
+        # Build params
+        params = {}
+        if template is not None:
+            if not isinstance(template, pd.Series):
+                template = await self.get_template(title=template)
+            params['template'] = template.id
+        if title is not None:
+            params['title'] = title
+        rest_url = '/rest/data/'
+
+        # CDCS 2.X.X returns all records without pages
+        if self.cdcsversion[0] == 2:
+            response = await self.get(rest_url, params=params)
+            records = response.json()
+
+        elif page is None:
+            response = await self.get(rest_url, params=params)
+            records = await get_all_pages(self, 'get', rest_url, response.json(),
+                                          params=params)
+        else:
+            params['page'] = page
+            response = await self.get(rest_url, params=params)
+            records = response.json()['results']
+
+        return format_records(pd.DataFrame(records), parse_dates=parse_dates)
+
+async def get_all_pages(client: AsyncRestClient,
+                        method: str,
+                        rest_url: str,
+                        response_json: dict,
+                        params: Optional[dict] = None,
+                        data: Optional[dict] = None) -> list:
+    """
+    Collects the results from all pages of a paginated REST call given the
+    json content of the first page's response.  The remaining pages are
+    requested at the same time, with the client limiting the number in
+    progress.  If the first page is empty, the pages are followed one by one.
+
+    Returns
+    -------
+    list
+        The results from all pages in page order.
+    """
+    records = response_json['results']
+    count = response_json['count']
+    if len(records) >= count:
+        return records
+
+    # The page size is unknown if the first page is empty
+    if len(records) == 0:
+        page = 2
+        while response_json['next'] is not None:
+            response_json = await get_page(client, method, rest_url, page,
+                                           params=params, data=data)
+            records.extend(response_json['results'])
+            page += 1
+
+    else:
+        numpages = -(-count // len(records))
+        tasks = [asyncio.ensure_future(get_page(client, method, rest_url, page,
+                                                params=params, data=data))
+                 for page in range(2, numpages + 1)]
+        try:
+            pages = await asyncio.gather(*tasks)
+
+        # Stop requesting pages after the first error
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for response_json in pages:
+            records.extend(response_json['results'])
+
+    assert len(records) == count
+    return records
+
+async def iter_pages(client: AsyncRestClient,
+                     method: str,
+                     rest_url: str,
+                     params: Optional[dict] = None,
+                     data: Optional[dict] = None) -> AsyncGenerator[dict, None]:
+    """
+    Iterates over the pages of a paginated REST call, yielding the json
+    content of each response while the next page is being requested.
+    """
+    page = 1
+    task = asyncio.ensure_future(get_page(client, method, rest_url, None,
+                                          params=params, data=data))
+    try:
+        while task is not None:
+            response_json = await task
+
+            # Request the next page before handing over the current one
+            if response_json['next'] is not None:
+                page += 1
+                task = asyncio.ensure_future(get_page(client, method, rest_url, page,
+                                                      params=params, data=data))
+            else:
+                task = None
+
+            yield response_json
+    finally:
+        if task is not None:
+            task.cancel()
+
+async def get_page(client: AsyncRestClient,
+                   method: str,
+                   rest_url: str,
+                   page: Optional[int],
+                   params: Optional[dict] = None,
+                   data: Optional[dict] = None) -> dict:
+    """
+    Sends a REST call for a single page of a paginated result.
+    """
+    params = dict(params) if params is not None else {}
+    if page is not None:
+        params['page'] = page
+
+    # Paginated calls only retrieve results so they can always be retried
+    if data is None:
+        response = await client.request(method, rest_url, params=params,
+                                        idempotent=True)
+    else:
+        response = await client.request(method, rest_url, params=params, data=data,
+                                        idempotent=True)
+    return response.json()
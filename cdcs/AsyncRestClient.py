@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+# Standard library imports
+from typing import Optional, Tuple, Union
+
+# Local imports
+from .lazy_import import lazy_import
+from .RestClient import resolve_login
+from .RetryPolicy import RetryPolicy
+
+# asyncio is imported on first use
+asyncio = lazy_import('asyncio')
+
+# https://www.python-httpx.org/, optional and imported on first use
+httpx = lazy_import('httpx')
+
+class AsyncRestClient(object):
+    """
+    Generic asyncio class for building REST calls to web databases.  Calls
+    are sent with a single pooled httpx.AsyncClient so that many calls can be
+    in progress on one event loop without a thread for each, and an
+    asyncio.Semaphore limits the number of calls in progress.  Requires the
+    optional httpx package, i.e. pip install cdcs[async].
+    """
+    def __init__(self,
+                 host: str,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 auth: Union[Tuple[str], bool, None] = None,
+                 cert: Union[str, Tuple[str], None] = None,
+                 headers: Optional[dict] = None,
+                 certification: Union[str, Tuple[str], None] = None,
+                 verify: Optional[bool] = True,
+                 hidden: Optional[dict] = None,
+                 max_concurrency: int = 10,
+                 timeout: Optional[float] = None,
+                 retry_policy: Union[RetryPolicy, bool, None] = None,
+                 client_kwargs: Optional[dict] = None):
+        """
+        Class initializer.  Stores access information.
+
+        Parameters
+        ----------
+        host : str
+            URL for the database's server.
+        username : str, optional
+            Username of desired account on the server. A prompt will ask for
+            the username if not given. An empty str '' indicates that no
+            authentication information is needed.
+        password : str, optional
+            Password of desired account on the server.  A prompt will ask for
+            the password if not given.
+        auth : tuple, optional
+            Auth tuple to enable Basic HTTP Auth.  Alternative to giving
+            username and password separately.
+        cert : str, optional
+            if String, path to ssl client cert file (.pem). If Tuple,
+            ('cert', 'key') pair.
+        headers : dict, optional
+            Any headers content that should be specified whenever making a rest
+            call.
+        certification : str, optional
+            Alias for cert.
+        verify : bool or str, optional
+            Either a boolean, in which case it controls whether we verify the
+            server's TLS certificate, or a string, in which case it must be a
+            path to a CA bundle to use. Defaults to True.
+        hidden : dict or None, optional
+            A dict containing values that may be contained in headers that
+            should be hidden from view except when REST calls are made.
+        max_concurrency : int, optional
+            The maximum number of calls in progress at the same time, which
+            is also the size of the connection pool.  Default value is 10.
+        timeout : float, optional
+            The number of seconds to wait for connecting and for each read or
+            write before giving up.  Default value of None waits indefinitely
+            like RestClient does.
+        retry_policy : cdcs.RetryPolicy or bool, optional
+            Determines which failed calls are retried and how long to wait
+            between tries.  If None or True (default), a RetryPolicy that
+            retries httpx timeouts and network errors is used.  False never
+            retries calls.  Waits are done with asyncio.sleep() rather than
+            the policy's sleep function.
+        client_kwargs : dict, optional
+            Any extra keyword arguments for the httpx.AsyncClient, such as
+            http2 or transport.
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+
+        # Set the retry policy
+        if retry_policy is None or retry_policy is True:
+            retry_policy = RetryPolicy(exceptions=(httpx.TimeoutException,
+                                                   httpx.NetworkError,
+                                                   httpx.RemoteProtocolError))
+        elif retry_policy is False:
+            retry_policy = None
+        elif not isinstance(retry_policy, RetryPolicy):
+            raise TypeError('retry_policy must be a RetryPolicy or bool')
+        self.__retry_policy = retry_policy
+
+        host, username, auth, cert = resolve_login(host, username=username,
+                                                   password=password, auth=auth,
+                                                   cert=cert,
+                                                   certification=certification)
+        self.__host = host
+        self.__user = username
+        self.__cert = cert
+        self.__verify = verify
+        self.__headers = headers
+        self.__hidden = hidden if hidden is not None else {}
+        self.__max_concurrency = max_concurrency
+
+        # Settings for the httpx.AsyncClient, which is made in the event loop
+        self.__client_kwargs = dict(auth=auth, cert=cert, verify=verify,
+                                    timeout=httpx.Timeout(timeout),
+                                    limits=httpx.Limits(max_connections=max_concurrency,
+                                                        max_keepalive_connections=max_concurrency))
+        if client_kwargs is not None:
+            self.__client_kwargs.update(client_kwargs)
+        self.__client = None
+        self.__semaphore = None
+        self.__loop = None
+
+    def __str__(self) -> str:
+        """str: String representation gives username and host info."""
+        return f'{self.__class__.__name__} for {self.username} @ {self.host}'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    @property
+    def host(self) -> str:
+        """str: The host url for the server."""
+        return self.__host
+
+    @property
+    def username(self) -> str:
+        """str: The username to use for the server."""
+        return self.__user
+
+    @property
+    def cert(self) -> Optional[str]:
+        """str or None: The certification information."""
+        return self.__cert
+
+    @property
+    def headers(self) -> Optional[dict]:
+        """dict or None: The headers information."""
+        return self.__headers
+
+    @property
+    def verify(self) -> bool:
+        """bool: The verify setting for the database."""
+        return self.__verify
+
+    @property
+    def max_concurrency(self) -> int:
+        """int: The maximum number of calls in progress at the same time."""
+        return self.__max_concurrency
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        """cdcs.RetryPolicy or None: Decides which failed calls are retried"""
+        return self.__retry_policy
+
+    @property
+    def client(self) -> Optional[httpx.AsyncClient]:
+        """httpx.AsyncClient or None: The pooled client, once a call has been sent."""
+        return self.__client
+
+    def __connect(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Gives the pooled client and semaphore of the running event loop"""
+        loop = asyncio.get_running_loop()
+
+        # The connections and semaphore belong to the loop they are made in
+        if self.__client is None or self.__loop is not loop:
+            self.__client = httpx.AsyncClient(**self.__client_kwargs)
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.__loop = loop
+        return self.__client, self.__semaphore
+
+    async def aclose(self):
+        """Closes all pooled connections."""
+        if self.__client is not None:
+            client = self.__client
+            self.__client = None
+            if self.__loop is asyncio.get_running_loop():
+                await client.aclose()
+
+    def add_hidden(self,
+                   name: str,
+                   value: str):
+        """
+        Adds/updates a value that should be hidden from view except
+        when REST calls are made.
+        """
+        self.__hidden[name] = value
+
+    def __reveal_hidden(self, headers: Optional[dict]) -> Optional[dict]:
+        """Fills in any hidden values in header strs"""
+        if headers is None or len(self.__hidden) == 0:
+            return headers
+        revealed = {}
+        for key, value in headers.items():
+            if isinstance(value, str):
+                for name, hidden in self.__hidden.items():
+                    value = value.replace(f'Hidden({name})', hidden)
+            revealed[key] = value
+        return revealed
+
+    async def request(self, method: str,
+                      rest_url: str,
+                      checkstatus: bool = True,
+                      idempotent: bool = False,
+                      **kwargs) -> httpx.Response:
+        """
+        Sends a REST call once the number of calls in progress is below
+        max_concurrency, retrying failed calls according to the retry_policy.
+
+        Parameters
+        ----------
+        method : str
+            The request method.
+        rest_url : str
+            The REST command URL, i.e. URL path after host.
+        checkstatus : bool
+            If True (default) then the response status of the call will be
+            checked and an error thrown if bad.  Setting this to False will
+            not automatically check the status.
+        idempotent : bool, optional
+            Marks that the request can be safely repeated even though its
+            method is not idempotent, i.e. a POST that only performs a search.
+            Default value is False.
+        **kwargs : any, optional
+            Any other arguments supported by httpx.AsyncClient.request()
+            except for url, such as params, data, json and headers.
+
+        Returns
+        -------
+        httpx.Response
+            The response object.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If checkstatus is True and the response code is not ok.
+        """
+        url = self.host + '/' + rest_url.lstrip('/')
+        kwargs['headers'] = self.__reveal_hidden(kwargs.pop('headers', self.headers))
+        client, semaphore = self.__connect()
+
+        policy = self.retry_policy
+        method = method.upper()
+        attempt = 0
+        while True:
+            async with semaphore:
+                if policy is not None:
+                    policy.count_attempt()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    error = None
+                except httpx.TransportError as err:
+                    response = None
+                    error = err
+
+            # Wait and retry if allowed by the policy
+            if policy is not None and policy.should_retry(method, attempt,
+                                                          response=response,
+                                                          error=error,
+                                                          idempotent=idempotent):
+                await asyncio.sleep(policy.delay(attempt, response))
+                attempt += 1
+                continue
+
+            if error is not None:
+                raise error
+            break
+
+        # Check for errors
+        if checkstatus and not response.is_success:
+            try:
+                print(response.json())
+            except:
+                print(response.text)
+            response.raise_for_status()
+
+        return response
+
+    async def head(self, rest_url: str, checkstatus: bool = True,
+                   **kwargs) -> httpx.Response:
+        """Sends a HEAD REST call.  See request()."""
+        return await self.request('head', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def get(self, rest_url: str, checkstatus: bool = True,
+                  **kwargs) -> httpx.Response:
+        """Sends a GET REST call.  See request()."""
+        return await self.request('get', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def post(self, rest_url: str, checkstatus: bool = True,
+                   **kwargs) -> httpx.Response:
+        """Sends a POST REST call.  See request()."""
+        return await self.request('post', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def put(self, rest_url: str, checkstatus: bool = True,
+                  **kwargs) -> httpx.Response:
+        """Sends a PUT REST call.  See request()."""
+        return await self.request('put', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def patch(self, rest_url: str, checkstatus: bool = True,
+                    **kwargs) -> httpx.Response:
+        """Sends a PATCH REST call.  See request()."""
+        return await self.request('patch', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def delete(self, rest_url: str, checkstatus: bool = True,
+                     **kwargs) -> httpx.Response:
+        """Sends a DELETE REST call.  See request()."""
+        return await self.request('delete', rest_url, checkstatus=checkstatus, **kwargs)
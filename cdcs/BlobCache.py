@@ -0,0 +1,464 @@
+# Standard library imports
+from contextlib import closing, contextmanager
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import sqlite3
+import stat
+import tempfile
+import time
+from typing import Iterable, Optional, Union
+
+# ioctl request code for cloning a file on Linux filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+class BlobCache(object):
+    """
+    On-disk cache of blob contents that can be shared between processes.
+    Contents are stored once per unique hash in an objects directory, and an
+    SQLite index maps cache keys to the stored contents.  The least recently
+    used entries are evicted when the total size exceeds a set limit.
+    """
+    def __init__(self,
+                 path: Union[str, Path],
+                 max_size: Optional[int] = None,
+                 max_age: Optional[float] = None,
+                 hash_name: str = 'sha256'):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory to store the cache in.  Will be created if it does
+            not exist.
+        max_size : int or None, optional
+            The maximum total size in bytes of the cached contents.  If None
+            (default), the size is not limited.
+        max_age : float or None, optional
+            The number of seconds after being stored that entries expire.  If
+            None (default), entries do not expire.
+        hash_name : str, optional
+            The hashlib algorithm used to address the stored contents.  Default
+            value is 'sha256'.
+        """
+        self.__path = Path(path)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.__hash_name = hash_name
+        hashlib.new(hash_name)
+
+        Path(self.path, 'objects').mkdir(parents=True, exist_ok=True)
+        Path(self.path, 'tmp').mkdir(exist_ok=True)
+        with closing(self.__connect()) as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS entries ('
+                       'key TEXT PRIMARY KEY, digest TEXT NOT NULL, '
+                       'size INTEGER NOT NULL, stored REAL NOT NULL, '
+                       'accessed REAL NOT NULL)')
+
+    @property
+    def path(self) -> Path:
+        """Path: The directory the cache is stored in."""
+        return self.__path
+
+    @property
+    def hash_name(self) -> str:
+        """str: The hashlib algorithm used to address the stored contents."""
+        return self.__hash_name
+
+    @property
+    def max_size(self) -> Optional[int]:
+        """int or None: The maximum total size in bytes of the cached contents."""
+        return self.__max_size
+
+    @max_size.setter
+    def max_size(self, value: Optional[int]):
+        if value is not None and value < 0:
+            raise ValueError('max_size must be None or a non-negative number')
+        self.__max_size = value
+
+    @property
+    def max_age(self) -> Optional[float]:
+        """float or None: The number of seconds after being stored that entries expire."""
+        return self.__max_age
+
+    @max_age.setter
+    def max_age(self, value: Optional[float]):
+        if value is not None and value < 0:
+            raise ValueError('max_age must be None or a non-negative number')
+        self.__max_age = value
+
+    @property
+    def size(self) -> int:
+        """int: The total size in bytes of the cached contents."""
+        with closing(self.__connect()) as db:
+            return self.__size(db)
+
+    def __len__(self) -> int:
+        with closing(self.__connect()) as db:
+            return db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens a new connection to the index"""
+        return sqlite3.connect(Path(self.path, 'index.sqlite'), timeout=60,
+                               isolation_level=None)
+
+    @contextmanager
+    def __transaction(self):
+        """Opens a connection and holds the write lock until finished"""
+        with closing(self.__connect()) as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            else:
+                db.execute('COMMIT')
+
+    def __size(self, db: sqlite3.Connection) -> int:
+        """Total size of the unique stored contents"""
+        return db.execute('SELECT COALESCE(SUM(size), 0) FROM '
+                          '(SELECT DISTINCT digest, size FROM entries)').fetchone()[0]
+
+    def object_path(self, digest: str) -> Path:
+        """
+        Gives the path where the contents with a given hash digest are stored.
+
+        Parameters
+        ----------
+        digest : str
+            The hex digest of the contents.
+
+        Returns
+        -------
+        Path
+            The path to the stored contents.
+        """
+        return Path(self.path, 'objects', digest[:2], digest)
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """
+        Finds the stored contents for a key and marks the entry as used.
+
+        Parameters
+        ----------
+        key : str
+            The key the contents were stored under.
+
+        Returns
+        -------
+        Path or None
+            The path to the stored contents, or None if the key is not cached
+            or has expired.  The file should be treated as read-only.
+        """
+        now = time.time()
+        with self.__transaction() as db:
+            row = db.execute('SELECT digest, stored FROM entries WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None:
+                return None
+            digest, stored = row
+
+            # Remove expired entries and entries whose contents are missing
+            path = self.object_path(digest)
+            if ((self.max_age is not None and now - stored >= self.max_age)
+                or not path.is_file()):
+                self.__remove(db, key)
+                return None
+
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Retrieves the stored contents for a key.
+
+        Parameters
+        ----------
+        key : str
+            The key the contents were stored under.
+
+        Returns
+        -------
+        bytes or None
+            The contents, or None if the key is not cached or has expired.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            # Evicted by another process since the lookup
+            return None
+
+    def set(self, key: str, content: Union[bytes, Iterable[bytes]]) -> Path:
+        """
+        Stores contents under a key.
+
+        Parameters
+        ----------
+        key : str
+            The key to store the contents under.
+        content : bytes or iterable of bytes
+            The contents, either all at once or as chunks.
+
+        Returns
+        -------
+        Path
+            The path to the stored contents.
+        """
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            content = [content]
+
+        hasher = hashlib.new(self.hash_name)
+        size = 0
+        fd, tmppath = tempfile.mkstemp(dir=Path(self.path, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content:
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            return self.__add(key, tmppath, hasher.hexdigest(), size)
+        finally:
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+
+    def set_file(self, key: str, filename: Union[str, Path],
+                 chunk_size: int = 1048576) -> Path:
+        """
+        Stores a copy of a file's contents under a key.
+
+        Parameters
+        ----------
+        key : str
+            The key to store the contents under.
+        filename : str or Path
+            The path to the file to store.
+        chunk_size : int, optional
+            The number of bytes to read at a time.  Default value is 1 MiB.
+
+        Returns
+        -------
+        Path
+            The path to the stored contents.
+        """
+        with open(filename, 'rb') as f:
+            return self.set(key, iter(lambda: f.read(chunk_size), b''))
+
+    def __add(self, key: str, tmppath: str, digest: str, size: int) -> Path:
+        """Moves new contents into place, indexes them and evicts old entries"""
+        path = self.object_path(digest)
+        path.parent.mkdir(exist_ok=True)
+
+        with self.__transaction() as db:
+            # Contents already stored for another key are reused
+            if not path.is_file():
+                os.chmod(tmppath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(tmppath, path)
+
+            old = db.execute('SELECT digest FROM entries WHERE key = ?',
+                             (key,)).fetchone()
+            now = time.time()
+            db.execute('INSERT OR REPLACE INTO entries '
+                       '(key, digest, size, stored, accessed) '
+                       'VALUES (?, ?, ?, ?, ?)', (key, digest, size, now, now))
+            if old is not None and old[0] != digest:
+                self.__unlink_unused(db, old[0])
+
+            # Evict least recently used entries
+            if self.max_size is not None:
+                while self.__size(db) > self.max_size:
+                    oldest = db.execute('SELECT key FROM entries '
+                                        'ORDER BY accessed LIMIT 1').fetchone()
+                    self.__remove(db, oldest[0])
+
+        return path
+
+    def __remove(self, db: sqlite3.Connection, key: str):
+        """Removes an entry and its contents if no longer used"""
+        row = db.execute('SELECT digest FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return
+        db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        self.__unlink_unused(db, row[0])
+
+    def __unlink_unused(self, db: sqlite3.Connection, digest: str):
+        """Deletes stored contents that no entries use"""
+        used = db.execute('SELECT COUNT(*) FROM entries WHERE digest = ?',
+                          (digest,)).fetchone()[0]
+        if used == 0:
+            try:
+                self.object_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+    def remove(self, key: str):
+        """
+        Removes an entry from the cache.
+
+        Parameters
+        ----------
+        key : str
+            The key to remove.
+        """
+        with self.__transaction() as db:
+            self.__remove(db, key)
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self.__transaction() as db:
+            for key, in db.execute('SELECT key FROM entries').fetchall():
+                self.__remove(db, key)
+
+    def expire(self) -> int:
+        """
+        Removes all entries older than max_age.
+
+        Returns
+        -------
+        int
+            The number of entries removed.
+        """
+        if self.max_age is None:
+            return 0
+        with self.__transaction() as db:
+            keys = db.execute('SELECT key FROM entries WHERE stored <= ?',
+                              (time.time() - self.max_age,)).fetchall()
+            for key, in keys:
+                self.__remove(db, key)
+        return len(keys)
+
+    def validate(self, key: Optional[str] = None,
+                 chunk_size: int = 1048576) -> int:
+        """
+        Checks that stored contents still match their hash digests, removing
+        any entries that do not.
+
+        Parameters
+        ----------
+        key : str, optional
+            The key of a single entry to check.  If not given, all entries are
+            checked.
+        chunk_size : int, optional
+            The number of bytes to read at a time.  Default value is 1 MiB.
+
+        Returns
+        -------
+        int
+            The number of entries removed.
+        """
+        with closing(self.__connect()) as db:
+            if key is None:
+                rows = db.execute('SELECT key, digest FROM entries').fetchall()
+            else:
+                rows = db.execute('SELECT key, digest FROM entries WHERE key = ?',
+                                  (key,)).fetchall()
+
+        removed = 0
+        checked = {}
+        for key, digest in rows:
+            if digest not in checked:
+                hasher = hashlib.new(self.hash_name)
+                try:
+                    with open(self.object_path(digest), 'rb') as f:
+                        for chunk in iter(lambda: f.read(chunk_size), b''):
+                            hasher.update(chunk)
+                except FileNotFoundError:
+                    checked[digest] = False
+                else:
+                    checked[digest] = hasher.hexdigest() == digest
+            if not checked[digest]:
+                # Bad contents are removed for all entries that use them
+                with self.__transaction() as db:
+                    removed += db.execute('DELETE FROM entries WHERE digest = ?',
+                                          (digest,)).rowcount
+                try:
+                    self.object_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def link(self, key: str, target: Union[str, Path],
+             method: str = 'copy') -> Optional[Path]:
+        """
+        Creates a file with the stored contents for a key.
+
+        Parameters
+        ----------
+        key : str
+            The key the contents were stored under.
+        target : str or Path
+            The path of the file to create.  An existing file is replaced.
+        method : str, optional
+            How the file is created.  'copy' (default) copies the contents.
+            'hardlink' links the file to the stored contents, which saves
+            space but means the file must not be modified.  'reflink' makes a
+            copy-on-write clone on filesystems that support it.  Both
+            'hardlink' and 'reflink' fall back to copying if not possible.
+
+        Returns
+        -------
+        Path or None
+            The path to the created file, or None if the key is not cached or
+            has expired.
+        """
+        if method not in ['copy', 'hardlink', 'reflink']:
+            raise ValueError("method must be 'copy', 'hardlink' or 'reflink'")
+
+        path = self.get_path(key)
+        if path is None:
+            return None
+        target = Path(target)
+        if target.exists() or target.is_symlink():
+            target.unlink()
+
+        try:
+            if method == 'hardlink':
+                try:
+                    os.link(path, target)
+                    return target
+                except OSError:
+                    pass
+
+            elif method == 'reflink':
+                try:
+                    reflink(path, target)
+                    return target
+                except (ImportError, OSError):
+                    if target.exists():
+                        target.unlink()
+
+            shutil.copyfile(path, target)
+        except FileNotFoundError:
+            # Evicted by another process since the lookup
+            if not path.exists():
+                return None
+            raise
+        return target
+
+def reflink(source: Union[str, Path], target: Union[str, Path]):
+    """
+    Makes a copy-on-write clone of a file.
+
+    Parameters
+    ----------
+    source : str or Path
+        The file to clone.
+    target : str or Path
+        The path of the new file.
+
+    Raises
+    ------
+    ImportError
+        If the platform does not provide fcntl.
+    OSError
+        If the filesystem does not support cloning.
+    """
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
@@ -5,7 +5,7 @@ from typing import Optional, Union, Tuple
 from pathlib import Path
 
 # Local imports
-from .. import RestClient
+from .. import RestClient, TTLCache, BlobCache, RecordCache, Profiler
 
 class CDCS(RestClient):
     """
@@ -21,7 +21,12 @@ class CDCS(RestClient):
                  certification: Union[str, Tuple[str], None] = None,
                  headers: Optional[dict] = None,
                  verify: Optional[bool] = True,
-                 cdcsversion: Optional[str] = None):
+                 cdcsversion: Optional[str] = None,
+                 template_cache_ttl: Optional[float] = None,
+                 blob_cache: Union[str, Path, BlobCache, None] = None,
+                 record_cache: Union[str, Path, RecordCache, None] = None,
+                 profiler: Union[Profiler, bool, None] = None,
+                 **kwargs):
         """
         Class initializer. Tests and stores access information.
         
@@ -63,17 +68,48 @@ class CDCS(RestClient):
             methods perform the correct REST calls.  This can be specified as
             "#.#.#".  If not given, will attempt to infer or guess an appropriate
             version that is likely to work.
+        template_cache_ttl : float, optional
+            If given, template and template manager information fetched from
+            the database will be cached for this many seconds to reduce the
+            number of REST calls made by methods that look up templates.  The
+            cache is cleared whenever templates are changed using this object.
+            Default value of None does not cache templates.
+        blob_cache : str, Path or cdcs.BlobCache, optional
+            If given, blob contents retrieved by get_blob_contents() and
+            download_blob() will be stored in and served from this on-disk
+            cache.  A str or Path value creates a BlobCache with no size limit
+            in that directory.  Default value of None does not cache blobs.
+        record_cache : str, Path or cdcs.RecordCache, optional
+            If given, sync_records() will mirror records to this local store,
+            which query() and get_records() can then search with local=True.
+            A str or Path value creates a RecordCache using that SQLite file.
+            Default value of None does not store records.
+        profiler : cdcs.Profiler or bool, optional
+            If given, the stages of the query(), get_records(),
+            get_templates(), upload_record() and download_blob() calls are
+            timed.  True creates a new Profiler.  Default value of None does
+            not profile calls.
+        **kwargs : any, optional
+            Any extra keyword arguments supported by RestClient, such as the
+            connection pool settings.
         """
-        if token is not None:
-
-            # Read token from environment variable
-            if isinstance(token, str) and os.getenv(token):
-                token = os.getenv(token)
+        # Create the template cache and record title index
+        self.__template_cache = TTLCache(template_cache_ttl)
+        self.__title_index = {}
+        if blob_cache is not None and not isinstance(blob_cache, BlobCache):
+            blob_cache = BlobCache(blob_cache)
+        self.__blob_cache = blob_cache
+        if record_cache is not None and not isinstance(record_cache, RecordCache):
+            record_cache = RecordCache(record_cache)
+        self.__record_cache = record_cache
+        if profiler is True:
+            profiler = Profiler()
+        elif profiler is False:
+            profiler = None
+        self.__profiler = profiler
 
-            # Read token from file if it is a file
-            if Path(token).is_file():
-                with open(token) as f:
-                    token = f.read().strip()
+        if token is not None:
+            token = read_token(token)
             
             # Initialize headers if needed
             if headers is None:
@@ -89,7 +125,7 @@ class CDCS(RestClient):
         # Call RestClient's init
         super().__init__(host, username=username, password=password, auth=auth,
                          cert=cert, certification=certification, headers=headers,
-                         verify=verify, hidden=hidden)
+                         verify=verify, hidden=hidden, **kwargs)
 
         # Handle CDCS version
         self.set_cdcsversion(cdcsversion=cdcsversion)
@@ -130,15 +166,18 @@ class CDCS(RestClient):
                             restore_template_manager, get_templates, get_template,
                             template_titles, upload_template, update_template,
                             disable_template, restore_template, set_current_template,
-                            templates_dataframe)
+                            templates_dataframe, clear_template_cache)
 
-    from ._query import query, query_count
+    from ._query import query, query_count, iter_query, sync_records
 
-    from ._record import (get_records, get_records_v2, get_record, upload_record,
-                          assign_records, update_record, delete_record, transform_record)
+    from ._record import (get_records, get_records_v2, iter_records, get_record,
+                          upload_record, upload_records, index_record_titles,
+                          clear_record_title_index, assign_records, update_record,
+                          delete_record, transform_record)
 
-    from ._blob import (get_blobs, get_blob, upload_blob, delete_blob, assign_blobs,
-                        get_blob_contents, download_blob)
+    from ._blob import (get_blobs, get_blob, upload_blob, upload_blobs, delete_blob,
+                        assign_blobs, get_blob_contents, iter_blob_contents,
+                        download_blob, download_blobs, blob_cache_key)
 
     from ._pid import (auto_set_pid, auto_set_pid_off, get_pid_paths, get_pid_path,
                              upload_pid_path, update_pid_path, delete_pid_path, 
@@ -152,6 +191,31 @@ class CDCS(RestClient):
         """Set CDCS version for 2.X.X, or core version bumped by 1 major version for 3.X.X"""
         return self.__cdcsversion
 
+    @property
+    def template_cache(self) -> TTLCache:
+        """cdcs.TTLCache: The cache used for template information"""
+        return self.__template_cache
+
+    @property
+    def blob_cache(self) -> Optional[BlobCache]:
+        """cdcs.BlobCache or None: The on-disk cache used for blob contents"""
+        return self.__blob_cache
+
+    @property
+    def record_cache(self) -> Optional[RecordCache]:
+        """cdcs.RecordCache or None: The local store used for synced records"""
+        return self.__record_cache
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        """cdcs.Profiler or None: The profiler timing the stages of high-level calls"""
+        return self.__profiler
+
+    @property
+    def title_index(self) -> dict:
+        """dict: The record titles indexed by index_record_titles() for each template id"""
+        return self.__title_index
+
     def testcall(self):
         """Simple rest call to check if authentication parameters are valid."""
 
@@ -168,38 +232,104 @@ class CDCS(RestClient):
 
             # Make a call to fetch cdcs core version
             r = self.get('/rest/core-settings/', checkstatus=False)
+            cdcsversion = detect_cdcsversion(r)
 
-            # Extract core version if call exists and permissions allowed
-            if r.status_code == 200:
+        # Handle manually given cdcs versions
+        else:
+            cdcsversion = parse_cdcsversion(cdcsversion)
 
-                # Read, split and transform core version into ints
-                cdcsversion = r.json()['core_version'].split('.')
-                for i in range(3):
-                    cdcsversion[i] = int(cdcsversion[i])
+        self.__cdcsversion = cdcsversion
 
-                # Bump primary core version by 1 to estimate cdcs version
-                cdcsversion[0] += 1
+def detect_cdcsversion(response) -> Tuple:
+    """
+    Infers the CDCS version from the response of a core-settings REST call.
 
-            # Guess a version 3 if call exists but permissions denied
-            elif r.status_code == 401:
-                cdcsversion = (3, 10, 0)
+    Parameters
+    ----------
+    response : requests.Response or httpx.Response
+        The response to the /rest/core-settings/ call.
 
-            # Guess a version 2 if call does not exist
-            elif r.status_code == 404:
-                cdcsversion = (2, 15, 0)
+    Returns
+    -------
+    tuple
+        The core version bumped by 1 major version, or a guessed version if
+        the call was denied or does not exist.
+    """
+    # Extract core version if call exists and permissions allowed
+    if response.status_code == 200:
 
-        # Handle manually given cdcs versions
-        else:
-            # Split and transform into ints
-            cdcsversion = cdcsversion.split('.')
-            if len(cdcsversion) != 3:
-                raise ValueError('cdcs version must be given in format #.#.#')
-            try:
-                for i in range(3):
-                    cdcsversion[i] = int(cdcsversion[i])
-            except ValueError as err:
-                raise ValueError('cdcs version must be given in format #.#.#') from err
-            if cdcsversion[0] < 2:
-                raise ValueError('CDCS class only works for versions 2+')
-
-        self.__cdcsversion = tuple(cdcsversion)
+        # Read, split and transform core version into ints
+        cdcsversion = response.json()['core_version'].split('.')
+        for i in range(3):
+            cdcsversion[i] = int(cdcsversion[i])
+
+        # Bump primary core version by 1 to estimate cdcs version
+        cdcsversion[0] += 1
+        return tuple(cdcsversion)
+
+    # Guess a version 3 if call exists but permissions denied
+    elif response.status_code == 401:
+        return (3, 10, 0)
+
+    # Guess a version 2 if call does not exist
+    elif response.status_code == 404:
+        return (2, 15, 0)
+
+    raise ValueError(f'CDCS version could not be detected: status {response.status_code}')
+
+def parse_cdcsversion(cdcsversion: str) -> Tuple:
+    """
+    Interprets a CDCS version given as "#.#.#".
+
+    Parameters
+    ----------
+    cdcsversion : str
+        The version.
+
+    Returns
+    -------
+    tuple
+        The version numbers.
+
+    Raises
+    ------
+    ValueError
+        If the version is not in the #.#.# format or is less than 2.
+    """
+    # Split and transform into ints
+    cdcsversion = cdcsversion.split('.')
+    if len(cdcsversion) != 3:
+        raise ValueError('cdcs version must be given in format #.#.#')
+    try:
+        for i in range(3):
+            cdcsversion[i] = int(cdcsversion[i])
+    except ValueError as err:
+        raise ValueError('cdcs version must be given in format #.#.#') from err
+    if cdcsversion[0] < 2:
+        raise ValueError('CDCS class only works for versions 2+')
+    return tuple(cdcsversion)
+
+def read_token(token: Union[str, Path]) -> str:
+    """
+    Reads an API access token given directly, as a file path, or as the name
+    of an environment variable containing either.
+
+    Parameters
+    ----------
+    token : str or file path
+        The token, token file, or environment variable name.
+
+    Returns
+    -------
+    str
+        The token.
+    """
+    # Read token from environment variable
+    if isinstance(token, str) and os.getenv(token):
+        token = os.getenv(token)
+
+    # Read token from file if it is a file
+    if Path(token).is_file():
+        with open(token) as f:
+            token = f.read().strip()
+    return token
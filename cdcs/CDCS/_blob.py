@@ -1,24 +1,43 @@
+from __future__ import annotations
+
 # Standard library imports
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+import hashlib
 import io
+import mmap
+import os
 from pathlib import Path
-from typing import Optional, Union
+import tempfile
+from types import SimpleNamespace
+from typing import Generator, Iterable, Optional, Union
 
-# https://pandas.pydata.org/
-import pandas as pd
+# http://docs.python-requests.org
+import requests
 
 # Local imports
-from .. import aslist, date_parser
+from ..lazy_import import lazy_import
+from .. import date_parser, date_column_parser
+from ._multipart import MultipartEncoder
+from ._workspace import assign_to_workspace
+from ..Profiler import profiled, profile_bind, profile_stage
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 blob_keys = ['id', ',user_id', 'filename', 'handle', 'upload_date', 'pid']
 
 def upload_blob(self,
                 filename: Union[str, Path],
                 pid: Union[str, bool, None] = None,
-                blobbytes: Optional[io.BytesIO] = None,
+                blobbytes: Union[io.IOBase, mmap.mmap, None] = None,
                 workspace: Union[str, pd.Series, None] = None,
+                use_mmap: bool = False,
+                progress_bar: bool = False,
                 verbose: bool = False) -> str:
     """
-    Adds a blob file to the repository.
+    Adds a blob file to the repository.  The file contents are streamed in
+    chunks while the request is sent rather than being loaded into memory.
     
     Parameters
     ----------
@@ -30,11 +49,20 @@ def upload_blob(self,
         superuser status to use.  If None (default) or False, no PID will be
         assigned. If True, the filename will be used as the PID. A str value
         specifies the PID value to use.
-    blobbytes : io.BytesIO, optional
-        Pre-loaded file contents.  Allows files already opened to be passed in.
+    blobbytes : file-like object or mmap.mmap, optional
+        Pre-loaded file contents.  Allows files already opened or memory
+        mapped to be passed in.  File objects are read from their current
+        position and are left open.
     workspace : str or pandas.Series, optional
         If given, the blob will be assigned to this workspace after
         successfully being uploaded.
+    use_mmap : bool, optional
+        If True, the file at filename is memory mapped and sent from the map
+        rather than being read through a file buffer.  Ignored if blobbytes
+        is given.  Default value is False.
+    progress_bar : bool, optional
+        If True, a progress bar of the bytes sent will be displayed.  Default
+        value is False.
     verbose : bool, optional
         Setting this to True will print extra status messages.  Default value
         is False.
@@ -44,14 +72,39 @@ def upload_blob(self,
     str
         The URL handle where the blob can be downloaded from.
     """
-    # Read file content
-    if blobbytes is None:
-        blobbytes = open(filename, 'rb')
-    
-    # Read file content
-    files = {}
-    files['blob'] = blobbytes
-    
+    response = post_blob(self, filename, pid=pid, blobbytes=blobbytes,
+                         use_mmap=use_mmap, progress_bar=progress_bar)
+    blob = SimpleNamespace(**response.json())
+
+    if verbose and response.status_code == 201:
+        if pid is None or pid is False:
+            print(f'File "{filename}" uploaded as blob "{blob.filename}" ({blob.id})')
+        else:
+            print(f'File "{filename}" uploaded as blob "{blob.filename}" ({blob.id}) with pid "{blob.pid}"')
+
+    # Assign blob to workspace
+    if workspace is not None:
+        self.assign_blobs(workspace, ids=blob.id, verbose=verbose)
+
+    return blob.handle
+
+def post_blob(self,
+              filename: Union[str, Path],
+              pid: Union[str, bool, None] = None,
+              blobbytes: Union[io.IOBase, mmap.mmap, None] = None,
+              use_mmap: bool = False,
+              progress_bar: bool = False) -> requests.Response:
+    """
+    Sends the streamed upload request for a blob.  See upload_blob() for
+    parameter descriptions.
+
+    Returns
+    -------
+    requests.Response
+        The response, whose json gives the metadata of the uploaded blob.
+        Callers wrap the metadata in a types.SimpleNamespace rather than a
+        pandas.Series so that uploading does not require pandas.
+    """
     # Set file name
     data  = {}
     data['filename'] = filename
@@ -59,32 +112,166 @@ def upload_blob(self,
     if pid is True:
         pid = filename
     
-    # Send request without PID
+    # Set request url and pid
     if pid is None or pid is False:
         rest_url = '/rest/blob/'
-        
-        response = self.post(rest_url, files=files, data=data)
-        blob = pd.Series(response.json())
-
-        if verbose and response.status_code == 201:    
-            print(f'File "{filename}" uploaded as blob "{blob.filename}" ({blob.id})')    
-    
-    # Send request with PID
     else:
         rest_url = 'pid/rest/upload-blob-pid'
         data['pid'] = pid
+
+    with ExitStack() as stack:
+
+        # Open file content if not given
+        name = None
+        if blobbytes is None:
+            blobbytes = stack.enter_context(open(filename, 'rb'))
+
+            # Empty files cannot be memory mapped
+            if use_mmap and os.fstat(blobbytes.fileno()).st_size > 0:
+                blobbytes = stack.enter_context(
+                    mmap.mmap(blobbytes.fileno(), 0, access=mmap.ACCESS_READ))
+                name = Path(filename).name
+
+        callback = None
+        if progress_bar:
+            from tqdm import tqdm
+            pbar = stack.enter_context(tqdm(unit='B', unit_scale=True))
+            callback = pbar.update
+
+        # Build the streamed multipart body
+        body = MultipartEncoder(data, 'blob', blobbytes, filename=name,
+                                callback=callback)
+        if progress_bar:
+            pbar.total = len(body)
+
+        headers = dict(self.headers) if self.headers is not None else {}
+        headers['Content-Type'] = body.content_type
+
+        response = self.post(rest_url, data=body, headers=headers)
     
-        response = self.post(rest_url, files=files, data=data)
-        blob = pd.Series(response.json())
+    return response
 
-        if verbose and response.status_code == 201:    
-            print(f'File "{filename}" uploaded as blob "{blob.filename}" ({blob.id}) with pid "{blob.pid}"')
+def upload_blobs(self,
+                 filenames: Iterable[Union[str, Path]],
+                 workspace: Union[str, pd.Series, None] = None,
+                 skip_existing: bool = True,
+                 max_workers: int = 1,
+                 use_mmap: bool = False,
+                 progress_bar: bool = True,
+                 verbose: bool = False) -> pd.DataFrame:
+    """
+    Adds multiple blob files to the repository.  The workspace and the list
+    of existing blobs are retrieved once, and the files can be uploaded
+    concurrently.  Errors for individual files are collected rather than
+    stopping the remaining uploads.
 
-    # Assign blob to workspace
-    if workspace is not None:
-        self.assign_blobs(workspace, ids=blob.id, verbose=verbose)
+    Parameters
+    ----------
+    filenames : iterable of str or Path
+        The paths to the files to upload.
+    workspace : str or pandas.Series, optional
+        If given, the blobs will be assigned to this workspace after
+        successfully being uploaded.
+    skip_existing : bool, optional
+        If True (default), files will not be uploaded if a blob with the same
+        file name and size already exists in the database.  The sizes of
+        existing blobs are found using ranged requests, so blobs on servers
+        that do not support them are never treated as existing.
+    max_workers : int, optional
+        The maximum number of files to upload at the same time.  The default
+        value of 1 uploads the files one after another.
+    use_mmap : bool, optional
+        If True, the files are memory mapped and sent from the maps.  Default
+        value is False.
+    progress_bar : bool, optional
+        If True (default) a progress bar of the files handled will be
+        displayed.
+    verbose : bool, optional
+        Setting this to True will print extra status messages.  Default value
+        is False.
 
-    return blob.handle
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each file in the same order as filenames, with fields
+        filename, id, handle, status and error.  status is 'uploaded',
+        'exists', 'failed' if the file could not be uploaded, or 'unassigned'
+        if the blob was uploaded but could not be assigned to the workspace.
+        error gives the reason for any failures.
+    """
+    # Get workspace id
+    if isinstance(workspace, str):
+        workspace = self.get_workspace(workspace)
+
+    # Group existing blobs by file name
+    existing = {}
+    if skip_existing:
+        for i, blob in get_blobs(self, parse_dates=False).iterrows():
+            existing.setdefault(blob.filename, []).append(blob)
+    
+    def upload(filename):
+        """Uploads one blob and assigns it to the workspace"""
+        result = {'filename': str(filename), 'id': None, 'handle': None,
+                  'status': None, 'error': None}
+        try:
+            # Check for an existing blob with the same name and size
+            size = os.stat(filename).st_size
+            for blob in existing.get(Path(filename).name, []):
+                if get_blob_size(self, blob) == size:
+                    result['id'] = blob.id
+                    result['handle'] = blob.handle
+                    result['status'] = 'exists'
+                    return result
+
+            response = post_blob(self, filename, use_mmap=use_mmap)
+            blob = SimpleNamespace(**response.json())
+            result['id'] = blob.id
+            result['handle'] = blob.handle
+        except Exception as err:
+            result['status'] = 'failed'
+            result['error'] = str(err)
+            return result
+
+        if verbose:
+            print(f'File "{filename}" uploaded as blob "{blob.filename}" ({blob.id})')
+
+        if workspace is not None:
+            try:
+                assign_to_workspace(self, 'blob', blob.id, workspace.id,
+                                    verbose=verbose)
+            except Exception as err:
+                result['status'] = 'unassigned'
+                result['error'] = str(err)
+                return result
+
+        result['status'] = 'uploaded'
+        return result
+
+    filenames = list(filenames)
+    if progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(filenames))
+
+    try:
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(upload, filename) for filename in filenames]
+                for future in as_completed(futures):
+                    if progress_bar:
+                        pbar.update(1)
+            results = [future.result() for future in futures]
+        else:
+            results = []
+            for filename in filenames:
+                results.append(upload(filename))
+                if progress_bar:
+                    pbar.update(1)
+    finally:
+        if progress_bar:
+            pbar.close()
+
+    return pd.DataFrame(results, columns=['filename', 'id', 'handle',
+                                          'status', 'error'])
     
 def get_blobs(self,
               filename: Optional[str] = None,
@@ -120,7 +307,7 @@ def get_blobs(self,
         blobs = pd.DataFrame(columns=blob_keys)
 
     if parse_dates and len(blobs) > 0:
-        blobs.upload_date = blobs.apply(date_parser, args=['upload_date'], axis=1)
+        blobs['upload_date'] = date_column_parser(blobs.upload_date)
 
     return blobs
 
@@ -178,7 +365,10 @@ def assign_blobs(self, workspace: Union[str, pd.Series],
                  blobs: Union[pd.Series, pd.DataFrame, None] = None,
                  ids: Union[str, list, None] = None,
                  filename: Optional[str] = None,
-                 verbose: bool = False):
+                 max_workers: int = 1,
+                 progress_bar: bool = False,
+                 raise_errors: bool = True,
+                 verbose: bool = False) -> pd.DataFrame:
     """
     Assigns one or more blobs to a workspace.
 
@@ -196,9 +386,25 @@ def assign_blobs(self, workspace: Union[str, pd.Series],
     filename : str, optional
         The name of the blob file to assign to the workspace.  Cannot be given
         with blobs or ids.
+    max_workers : int, optional
+        The maximum number of blobs to assign at the same time.  The default
+        value of 1 assigns the blobs one after another.
+    progress_bar : bool, optional
+        If True a progress bar will be displayed.  Default value is False.
+    raise_errors : bool, optional
+        If True (default), the first error encountered will be raised after
+        all assignments have been tried.  If False, errors are only reported
+        in the returned results.
     verbose : bool, optional
         Setting this to True will print extra status messages.  Default value
         is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each id with fields id, status and error.  status is
+        either 'assigned' or 'failed', and error gives the reason for any
+        failures.
     """
     # Get workspace id
     if isinstance(workspace, str):
@@ -226,16 +432,15 @@ def assign_blobs(self, workspace: Union[str, pd.Series],
         raise ValueError('No blobs specified to assign to the workspace')
 
     # Assign blobs to the workspace
-    for blob_id in aslist(ids):
-        rest_url = f'/rest/blob/{blob_id}/assign/{workspace_id}'
-        response = self.patch(rest_url)
-
-        if verbose and response.status_code == 200:
-            print(f'blob {blob_id} assigned to workspace {workspace_id}')
+    return assign_to_workspace(self, 'blob', ids, workspace_id,
+                               max_workers=max_workers,
+                               progress_bar=progress_bar,
+                               raise_errors=raise_errors, verbose=verbose)
 
 def get_blob_contents(self, blob: Optional[pd.Series] = None, 
                       id: Optional[str] = None,
-                      filename: Optional[str] = None) -> bytes:
+                      filename: Optional[str] = None,
+                      use_cache: bool = True) -> bytes:
     """
     Retrieves the contents for a single blob.  The blob can be uniquely
     identified by passing the blob metadata, or by using its id or filename.
@@ -248,6 +453,10 @@ def get_blob_contents(self, blob: Optional[pd.Series] = None,
         The unique ID associated with the blob.
     filename : str, optional
         The name of the file to limit the search by.
+    use_cache : bool, optional
+        If True (default) and the object has a blob_cache, the contents will
+        be taken from the cache if present and stored in it after being
+        downloaded.
     
     Returns
     -------
@@ -260,26 +469,138 @@ def get_blob_contents(self, blob: Optional[pd.Series] = None,
         If more than one argument given, or if filename does not uniquely
         identify a blob.
     """
+    cache = self.blob_cache if use_cache else None
 
     if blob is None:
+        # Cached contents can be found from the id alone
+        if cache is not None and id is not None and filename is None:
+            content = cache.get(blob_cache_key(self, id))
+            if content is not None:
+                return content
         blob = self.get_blob(id=id, filename=filename)
     elif id is not None:
         raise ValueError('blob and id cannot both be given')
     elif filename is not None:
         raise ValueError('blob and filename cannot both be given')
     
+    if cache is not None:
+        content = cache.get(blob_cache_key(self, blob.id))
+        if content is not None:
+            return content
+
     rest_url = f'/rest/blob/download/{blob.id}'
     response = self.get(rest_url)
+    
+    if cache is not None:
+        cache.set(blob_cache_key(self, blob.id), response.content)
     return response.content
+
+def blob_cache_key(self, id: str) -> str:
+    """
+    Gives the key used for a blob in the blob cache, which identifies the blob
+    by its download URL.
+
+    Parameters
+    ----------
+    id : str
+        The unique ID associated with the blob.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    return f'{self.host}/rest/blob/download/{id}/'
         
+def iter_blob_contents(self, blob: Optional[pd.Series] = None,
+                       id: Optional[str] = None,
+                       filename: Optional[str] = None,
+                       chunk_size: int = 1048576,
+                       checksum: Optional[str] = None,
+                       hash_name: str = 'sha256') -> Generator[bytes, None, None]:
+    """
+    Streams the contents for a single blob, yielding fixed-size chunks as
+    they are received rather than loading the whole blob into memory.  The
+    blob can be uniquely identified by passing the blob metadata, or by using
+    its id or filename.
+    
+    Parameters
+    ----------
+    blob : pandas.Series, optional
+        The blob metadata for a blob.
+    id : str, optional
+        The unique ID associated with the blob.
+    filename : str, optional
+        The name of the file to limit the search by.
+    chunk_size : int, optional
+        The number of bytes to read at a time.  Default value is 1 MiB.
+    checksum : str, optional
+        If given, the hex digest of the contents will be computed from the
+        chunks as they are yielded and compared to this value after the last
+        chunk.
+    hash_name : str, optional
+        The hashlib algorithm to use for checksum.  Default value is 'sha256'.
+    
+    Yields
+    ------
+    bytes
+        Sequential chunks of the blob file contents.
+
+    Raises
+    ------
+    ValueError
+        If more than one argument given, if filename does not uniquely
+        identify a blob, or if the checksum of the streamed contents does not
+        match.  A checksum mismatch is raised after all chunks have been
+        yielded, so callers should not trust the contents until the iteration
+        completes.
+    """
+    if blob is None:
+        blob = self.get_blob(id=id, filename=filename)
+    elif id is not None:
+        raise ValueError('blob and id cannot both be given')
+    elif filename is not None:
+        raise ValueError('blob and filename cannot both be given')
+    
+    hasher = hashlib.new(hash_name) if checksum is not None else None
+
+    rest_url = f'/rest/blob/download/{blob.id}'
+    response = self.get(rest_url, stream=True)
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+    finally:
+        response.close()
+
+    # Verify checksum
+    if hasher is not None:
+        digest = hasher.hexdigest()
+        if digest != checksum.lower():
+            raise ValueError(f'checksum mismatch for blob {blob.filename}: expected {checksum}, got {digest}')
+
+@profiled
 def download_blob(self, blob: Optional[pd.Series] = None,
                   id: Optional[str] = None,
                   filename: Optional[str] = None,
-                  savedir: Union[str, Path] = '.') -> bytes:
+                  savedir: Union[str, Path] = '.',
+                  chunk_size: int = 1048576,
+                  checksum: Optional[str] = None,
+                  hash_name: str = 'sha256',
+                  resume: bool = False,
+                  range_workers: int = 1,
+                  use_cache: bool = True,
+                  cache_link: str = 'copy') -> Path:
     """
     Retrieves the contents for a single blob and saves it using the stored file
     name.  The blob can be uniquely identified by passing the blob metadata, or
-    by using its id or filename.
+    by using its id or filename.  The contents are streamed in chunks to a
+    hidden partial file in savedir, which is renamed to the blob's file name
+    once the download is complete.  This keeps memory usage constant and
+    ensures that an incomplete download never replaces the saved file.  The
+    partial file has a unique name unless resume is True, so that the same
+    blob can be downloaded to the same directory at the same time.
     
     Parameters
     ----------
@@ -292,28 +613,412 @@ def download_blob(self, blob: Optional[pd.Series] = None,
     savedir : str or Path, optional
         The directory to save the file to.  Default value uses the current
         working directory.
+    chunk_size : int, optional
+        The number of bytes to read and write at a time.  Default value is
+        1 MiB.
+    checksum : str, optional
+        If given, the hex digest of the downloaded contents will be computed
+        and compared to this value before the file is saved.  The digest is
+        computed from the chunks as they are received, except for resumed and
+        ranged downloads, which are read back from the file.
+    hash_name : str, optional
+        The hashlib algorithm to use for checksum.  Default value is 'sha256'.
+    resume : bool, optional
+        If True, the partial file of an interrupted download is kept under a
+        fixed name, and a previously kept partial file is continued by
+        requesting only the remaining bytes.  If the server does not support
+        ranged requests, the download starts over.  Default value is False.
+    range_workers : int, optional
+        If larger than 1, the blob will be split into this many byte ranges
+        that are downloaded in parallel and written into place.  This falls
+        back to a single download if the server does not support ranged
+        requests.  Any partial file is ignored in this mode.  Default value is
+        1.
+    use_cache : bool, optional
+        If True (default) and the object has a blob_cache, the file will be
+        created from the cache if present and the downloaded contents will be
+        stored in the cache.
+    cache_link : str, optional
+        How files are created from the cache: 'copy' (default), 'hardlink' or
+        'reflink'.  Hardlinked files share their contents with the cache and
+        must not be modified.  See BlobCache.link().
     
     Returns
     -------
-    bytes
-        The blob file contents.
+    Path
+        The path to the saved file.
 
     Raises
     ------
     ValueError
-        If more than one argument given, or if filename does not uniquely
-        identify a blob.
+        If more than one argument given, if filename does not uniquely
+        identify a blob, or if the checksum of the downloaded contents does
+        not match.
     """
     if blob is None:
-        blob = self.get_blob(id=id, filename=filename)
+        with profile_stage(self, 'get_blob'):
+            blob = self.get_blob(id=id, filename=filename)
     elif id is not None:
         raise ValueError('blob and id cannot both be given')
     elif filename is not None:
         raise ValueError('blob and filename cannot both be given')
         
     savepath = Path(savedir, blob.filename)
-    with open(savepath, 'wb') as f:
-        f.write(self.get_blob_contents(blob=blob))
+
+    # Find how much of the blob was previously downloaded
+    if resume:
+        partpath = savepath.with_name(f'.{savepath.name}.part')
+        if partpath.is_file():
+            start = partpath.stat().st_size
+        else:
+            start = 0
+    
+    # Use a unique partial file so that simultaneous downloads do not collide
+    else:
+        fd, partpath = tempfile.mkstemp(prefix=f'.{savepath.name}.',
+                                        suffix='.part', dir=savepath.parent)
+        os.close(fd)
+        partpath = Path(partpath)
+        start = 0
+
+    cache = self.blob_cache if use_cache else None
+    key = blob_cache_key(self, blob.id)
+
+    size = None
+    hasher = None
+    try:
+        # Create the file from the cache if present and valid
+        cached = False
+        if cache is not None:
+            with profile_stage(self, 'cache'):
+                cachepath = cache.get_path(key)
+                if cachepath is not None:
+                    if (checksum is not None and 
+                        file_hexdigest(cachepath, hash_name, chunk_size) != checksum.lower()):
+                        cache.remove(key)
+                    else:
+                        cached = cache.link(key, partpath, method=cache_link) is not None
+
+        if not cached:
+            # Download byte ranges in parallel if supported by the server
+            if range_workers > 1:
+                with profile_stage(self, 'size'):
+                    size = get_blob_size(self, blob)
+            if size is not None:
+                with profile_stage(self, 'ranges'):
+                    download_blob_ranges(self, blob, partpath, size,
+                                         range_workers=range_workers,
+                                         chunk_size=chunk_size)
+        
+            # Stream the contents to the partial file
+            else:
+                headers = None
+                if start > 0:
+                    headers = dict(self.headers) if self.headers is not None else {}
+                    headers['Range'] = f'bytes={start}-'
+                rest_url = f'/rest/blob/download/{blob.id}'
+                with profile_stage(self, 'http'):
+                    response = self.get(rest_url, stream=True, headers=headers,
+                                        checkstatus=start == 0)
+            
+                    # Restart from the beginning if the range was not satisfiable
+                    if response.status_code == 416:
+                        response.close()
+                        start = 0
+                        response = self.get(rest_url, stream=True)
+                    elif not response.ok:
+                        response.close()
+                        response.raise_for_status()
+
+                # Restart from the beginning if Range was ignored
+                if response.status_code != 206:
+                    start = 0
+
+                # Hash complete downloads as they are streamed
+                if checksum is not None and start == 0:
+                    hasher = hashlib.new(hash_name)
+            
+                try:
+                    with profile_stage(self, 'transfer'):
+                        with open(partpath, 'ab' if start > 0 else 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=chunk_size):
+                                f.write(chunk)
+                                if hasher is not None:
+                                    hasher.update(chunk)
+                finally:
+                    response.close()
+
+        # Verify checksum, reading the file only for resumed or ranged downloads
+        if checksum is not None and not cached:
+            with profile_stage(self, 'checksum'):
+                if hasher is not None:
+                    digest = hasher.hexdigest()
+                else:
+                    digest = file_hexdigest(partpath, hash_name, chunk_size)
+            if digest != checksum.lower():
+                partpath.unlink()
+                raise ValueError(f'checksum mismatch for blob {blob.filename}: expected {checksum}, got {digest}')
+
+        # Store new downloads in the cache
+        if cache is not None and not cached:
+            with profile_stage(self, 'cache_store'):
+                cache.set_file(key, partpath, chunk_size=chunk_size)
+        
+        # Move completed download into place
+        os.replace(partpath, savepath)
+    
+    # Remove partial file unless resuming later is wanted
+    except BaseException:
+        if (not resume or size is not None) and partpath.is_file():
+            partpath.unlink()
+        raise
+
+    return savepath
+
+def download_blobs(self, blobs: Union[pd.Series, pd.DataFrame],
+                   savedir: Union[str, Path] = '.',
+                   skip_existing: bool = True,
+                   max_workers: int = 1,
+                   chunk_size: int = 1048576,
+                   resume: bool = False,
+                   range_workers: int = 1,
+                   progress_bar: bool = True,
+                   verbose: bool = False) -> pd.DataFrame:
+    """
+    Downloads multiple blobs and saves them using their stored file names.
+    The blobs can be downloaded concurrently, and errors for individual blobs
+    are collected rather than stopping the remaining downloads.
+
+    Parameters
+    ----------
+    blobs : pandas.Series or pandas.DataFrame
+        The blob metadata for the blobs to download, such as returned by
+        get_blobs().
+    savedir : str or Path, optional
+        The directory to save the files to.  Default value uses the current
+        working directory.
+    skip_existing : bool, optional
+        If True (default), blobs will not be downloaded if a file with the
+        same name and size already exists in savedir.  The sizes of the blobs
+        are found using ranged requests, so files are always downloaded from
+        servers that do not support them.
+    max_workers : int, optional
+        The maximum number of blobs to download at the same time.  The default
+        value of 1 downloads the blobs one after another.
+    chunk_size : int, optional
+        The number of bytes to read and write at a time.  Default value is
+        1 MiB.
+    resume : bool, optional
+        If True, interrupted downloads can be continued.  See download_blob().
+        Default value is False.
+    range_workers : int, optional
+        The number of byte ranges to download in parallel for each blob.  See
+        download_blob().  Default value is 1.
+    progress_bar : bool, optional
+        If True (default) a progress bar of the blobs handled will be
+        displayed.
+    verbose : bool, optional
+        Setting this to True will print extra status messages.  Default value
+        is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each blob in the same order as blobs, with fields id,
+        filename, path, status and error.  status is 'downloaded', 'exists'
+        or 'failed', and error gives the reason for any failures.
+    """
+    if isinstance(blobs, pd.Series):
+        blobs = blobs.to_frame().T
+    elif not isinstance(blobs, pd.DataFrame):
+        raise TypeError('invalid blobs type')
+
+    # Build results table entries
+    results = []
+    savepaths = set()
+    for i, blob in blobs.iterrows():
+        savepath = Path(savedir, blob.filename)
+        result = {'id': blob.id, 'filename': blob.filename, 'path': savepath,
+                  'status': None, 'error': None, 'blob': blob}
+        
+        # Blobs with the same file name would overwrite each other
+        if savepath in savepaths:
+            result['status'] = 'failed'
+            result['error'] = 'Blob with the same file name already in blobs!'
+        savepaths.add(savepath)
+        results.append(result)
+
+    def download(result):
+        """Downloads one blob"""
+        blob = result.pop('blob')
+        try:
+            # Check for an existing file with the same size
+            savepath = result['path']
+            if skip_existing and savepath.is_file():
+                if get_blob_size(self, blob) == savepath.stat().st_size:
+                    result['status'] = 'exists'
+                    return result
+
+            download_blob(self, blob, savedir=savedir, chunk_size=chunk_size,
+                          resume=resume, range_workers=range_workers)
+        except Exception as err:
+            result['status'] = 'failed'
+            result['error'] = str(err)
+        else:
+            result['status'] = 'downloaded'
+            if verbose:
+                print(f'Blob "{blob.filename}" ({blob.id}) saved to {savepath}')
+        return result
+
+    todownload = [result for result in results if result['status'] is None]
+    if progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(todownload))
+    
+    try:
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(download, result) for result in todownload]
+                for future in as_completed(futures):
+                    if progress_bar:
+                        pbar.update(1)
+        else:
+            for result in todownload:
+                download(result)
+                if progress_bar:
+                    pbar.update(1)
+    finally:
+        if progress_bar:
+            pbar.close()
+
+    for result in results:
+        result.pop('blob', None)
+
+    return pd.DataFrame(results, columns=['id', 'filename', 'path',
+                                          'status', 'error'])
+
+def file_hexdigest(filename: Union[str, Path],
+                   hash_name: str = 'sha256',
+                   chunk_size: int = 1048576) -> str:
+    """
+    Computes the hex digest of a file's contents, reading it in chunks.
+
+    Parameters
+    ----------
+    filename : str or Path
+        The path to the file.
+    hash_name : str, optional
+        The hashlib algorithm to use.  Default value is 'sha256'.
+    chunk_size : int, optional
+        The number of bytes to read at a time.  Default value is 1 MiB.
+
+    Returns
+    -------
+    str
+        The hex digest.
+    """
+    hasher = hashlib.new(hash_name)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def get_blob_size(self, blob: pd.Series) -> Optional[int]:
+    """
+    Checks if the server supports ranged downloads for a blob and gets the
+    blob's size.
+
+    Parameters
+    ----------
+    blob : pandas.Series
+        The blob metadata for a blob.
+
+    Returns
+    -------
+    int or None
+        The size of the blob in bytes, or None if the server does not support
+        ranged downloads.
+    """
+    headers = dict(self.headers) if self.headers is not None else {}
+    headers['Range'] = 'bytes=0-0'
+    rest_url = f'/rest/blob/download/{blob.id}'
+    response = self.get(rest_url, stream=True, headers=headers)
+    response.close()
+
+    # Parse "bytes 0-0/size"
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code != 206 or '/' not in content_range:
+        return None
+    try:
+        return int(content_range.split('/')[-1])
+    except ValueError:
+        return None
+
+def download_blob_ranges(self,
+                         blob: pd.Series,
+                         path: Path,
+                         size: int,
+                         range_workers: int = 4,
+                         chunk_size: int = 1048576):
+    """
+    Downloads a blob by fetching multiple byte ranges in parallel and writing
+    each into place in the output file.
+
+    Parameters
+    ----------
+    blob : pandas.Series
+        The blob metadata for a blob.
+    path : Path
+        The file to save the contents to.
+    size : int
+        The size of the blob in bytes.
+    range_workers : int, optional
+        The number of ranges to split the blob into and fetch at the same time.
+        Default value is 4.
+    chunk_size : int, optional
+        The number of bytes to read and write at a time.  Default value is
+        1 MiB.
+    
+    Raises
+    ------
+    ValueError
+        If the server does not return the requested range.
+    """
+    rest_url = f'/rest/blob/download/{blob.id}'
+
+    # Create the full size output file, which is done for empty blobs
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    if size == 0:
+        return
+    
+    def fetch(first, last):
+        """Fetches one byte range and writes it into the file"""
+        headers = dict(self.headers) if self.headers is not None else {}
+        headers['Range'] = f'bytes={first}-{last}'
+        with profile_stage(self, 'http'):
+            response = self.get(rest_url, stream=True, headers=headers)
+        try:
+            if response.status_code != 206:
+                raise ValueError('server did not return the requested range')
+            with profile_stage(self, 'transfer'), open(path, 'r+b') as f:
+                f.seek(first)
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                if f.tell() != last + 1:
+                    raise ValueError('incomplete range received')
+        finally:
+            response.close()
+
+    # Split into equal ranges
+    range_size = -(-size // range_workers)
+    ranges = [(first, min(first + range_size, size) - 1)
+              for first in range(0, size, range_size)]
+    
+    fetch = profile_bind(self, fetch)
+    with ThreadPoolExecutor(max_workers=range_workers) as executor:
+        for future in [executor.submit(fetch, *r) for r in ranges]:
+            future.result()
 
 def delete_blob(self, blob: Optional[pd.Series] = None,
                 id: Optional[str] = None,
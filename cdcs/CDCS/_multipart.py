@@ -0,0 +1,164 @@
+# Standard library imports
+import io
+import mmap
+import os
+import uuid
+from typing import Callable, Optional, Union
+
+class MultipartEncoder(object):
+    """
+    File-like multipart/form-data body for uploading a single file along with
+    simple form fields.  The file contents are read in chunks while the
+    request is being sent, so the full body is never held in memory.
+    """
+    def __init__(self,
+                 fields: dict,
+                 name: str,
+                 fileobj: Union[io.IOBase, mmap.mmap],
+                 filename: Optional[str] = None,
+                 callback: Optional[Callable[[int], None]] = None):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        fields : dict
+            The simple form fields to include before the file.
+        name : str
+            The form field name for the file.
+        fileobj : file-like object or mmap.mmap
+            The open binary file or memory map to stream the contents from.
+            File objects are read from their current position.
+        filename : str, optional
+            The file name to report for the file.  If not given, will be
+            taken from fileobj's name attribute if it has one, or name
+            otherwise.
+        callback : callable, optional
+            Function that is called with the number of bytes each time part of
+            the body is read.  Useful for progress bars.
+        """
+        self.__boundary = uuid.uuid4().hex
+        self.__callback = callback
+
+        if filename is None:
+            filename = getattr(fileobj, 'name', None)
+            if not isinstance(filename, str) or filename[:1] == '<':
+                filename = name
+        filename = os.path.basename(filename).replace('"', '%22')
+
+        # Build the bytes that come before and after the file contents
+        head = b''
+        for key, value in fields.items():
+            if value is None:
+                continue
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            head += (f'--{self.__boundary}\r\n'
+                     f'Content-Disposition: form-data; name="{key}"\r\n\r\n').encode('utf-8')
+            head += value + b'\r\n'
+        head += (f'--{self.__boundary}\r\n'
+                 f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n\r\n').encode('utf-8')
+        tail = f'\r\n--{self.__boundary}--\r\n'.encode('utf-8')
+
+        # Handle memory maps by slicing directly from the map
+        if isinstance(fileobj, mmap.mmap):
+            self.__buffer = fileobj
+            self.__fileobj = None
+            self.__start = 0
+            filesize = len(fileobj)
+
+        # Handle file objects
+        else:
+            self.__buffer = None
+            self.__fileobj = fileobj
+            self.__start = fileobj.tell()
+            fileobj.seek(0, io.SEEK_END)
+            filesize = fileobj.tell() - self.__start
+            fileobj.seek(self.__start)
+
+        self.__head = head
+        self.__tail = tail
+        self.__filesize = filesize
+        self.__position = 0
+
+    @property
+    def content_type(self) -> str:
+        """str: The Content-Type header value for the body."""
+        return f'multipart/form-data; boundary={self.__boundary}'
+
+    def __len__(self) -> int:
+        """int: The total number of bytes in the body."""
+        return len(self.__head) + self.__filesize + len(self.__tail)
+
+    def tell(self) -> int:
+        """int: The number of body bytes read so far."""
+        return self.__position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        Moves to a new position in the body.  Allows the body to be sent
+        again if a request needs to be retried.
+        """
+        if whence == io.SEEK_CUR:
+            offset += self.__position
+        elif whence == io.SEEK_END:
+            offset += len(self)
+        self.__position = max(0, min(offset, len(self)))
+        return self.__position
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads the next part of the body.  Reads never cross between the form
+        fields, file contents and closing boundary, so fewer bytes than size
+        may be returned before the end of the body.
+
+        Parameters
+        ----------
+        size : int, optional
+            The maximum number of bytes to read.  Negative values (default)
+            read all remaining bytes of the current section.
+
+        Returns
+        -------
+        bytes
+            The bytes read.  Empty when the end of the body is reached.
+        """
+        headsize = len(self.__head)
+        filesize = self.__filesize
+        position = self.__position
+
+        # Read from the form fields
+        if position < headsize:
+            end = headsize if size < 0 else min(headsize, position + size)
+            chunk = self.__head[position:end]
+
+        # Read from the file contents
+        elif position < headsize + filesize:
+            offset = position - headsize
+            remaining = filesize - offset
+            n = remaining if size < 0 else min(remaining, size)
+            if self.__buffer is not None:
+                chunk = self.__buffer[offset:offset + n]
+            else:
+                self.__fileobj.seek(self.__start + offset)
+                chunk = self.__fileobj.read(n)
+                if len(chunk) == 0:
+                    raise IOError('file ended before its expected size')
+
+        # Read from the closing boundary
+        else:
+            offset = position - headsize - filesize
+            end = len(self.__tail) if size < 0 else min(len(self.__tail), offset + size)
+            chunk = self.__tail[offset:end]
+
+        self.__position += len(chunk)
+        if self.__callback is not None and len(chunk) > 0:
+            self.__callback(len(chunk))
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(65536)
+            if len(chunk) == 0:
+                break
+            yield chunk
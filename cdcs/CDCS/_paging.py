@@ -0,0 +1,222 @@
+# Standard library imports
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import math
+from typing import Generator, Optional
+
+# Local imports
+from ..Profiler import profile_bind, profile_stage
+
+def get_all_pages(client,
+                  method: str,
+                  rest_url: str,
+                  response_json: dict,
+                  params: Optional[dict] = None,
+                  data: Optional[dict] = None,
+                  max_workers: int = 1,
+                  progress_bar: bool = True) -> list:
+    """
+    Collects the results from all pages of a paginated REST call given the
+    json content of the first page's response.
+
+    Parameters
+    ----------
+    client : cdcs.RestClient
+        The client to use for sending the REST calls.
+    method : str
+        The request method used for each page, i.e. 'get' or 'post'.
+    rest_url : str
+        The REST command URL, i.e. URL path after host.
+    response_json : dict
+        The json content of the response for page 1.
+    params : dict, optional
+        Any params sent with the page 1 call.  The page number will be added
+        to a copy of this for each subsequent page.
+    data : dict, optional
+        Any data sent with the page 1 call.
+    max_workers : int, optional
+        The maximum number of pages to request at the same time.  The default
+        value of 1 requests the pages one after another, following each
+        response's next field.  Values larger than 1 use the total count and
+        page size of the first response to request all remaining pages
+        concurrently.
+    progress_bar : bool, optional
+        If True (default) a progress bar will be displayed if there are
+        multiple pages.
+
+    Returns
+    -------
+    list
+        The results from all pages in page order.
+    """
+    records = response_json['results']
+    count = response_json['count']
+    if len(records) >= count:
+        return records
+
+    if params is None:
+        params = {}
+
+    if progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=count, initial=len(records))
+
+    try:
+        # Repeat call until all content received.  The page size is unknown
+        # if the first page is empty, so the pages are followed one by one.
+        if max_workers <= 1 or len(records) == 0:
+            page = 2
+            while response_json['next'] is not None:
+                response_json = get_page(client, method, rest_url, page,
+                                         params=params, data=data)
+                newrecords = response_json['results']
+                with profile_stage(client, 'extend'):
+                    records.extend(newrecords)
+                page += 1
+
+                if progress_bar:
+                    pbar.update(len(newrecords))
+
+        # Request all remaining pages concurrently
+        else:
+            numpages = math.ceil(count / len(records))
+            pages = {}
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            futures = {}
+            try:
+                fetch = profile_bind(client, get_page)
+                for page in range(2, numpages + 1):
+                    future = executor.submit(fetch, client, method, rest_url,
+                                             page, params=params, data=data)
+                    futures[future] = page
+
+                for future in as_completed(futures):
+                    newrecords = future.result()['results']
+                    pages[futures[future]] = newrecords
+
+                    if progress_bar:
+                        pbar.update(len(newrecords))
+            
+            # Stop requesting pages after the first error
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+                raise
+            executor.shutdown()
+
+            # Reassemble in page order
+            with profile_stage(client, 'extend'):
+                for page in range(2, numpages + 1):
+                    records.extend(pages[page])
+    finally:
+        if progress_bar:
+            pbar.close()
+
+    assert len(records) == count
+    return records
+
+def iter_pages(client,
+               method: str,
+               rest_url: str,
+               params: Optional[dict] = None,
+               data: Optional[dict] = None,
+               prefetch: bool = True) -> Generator[dict, None, None]:
+    """
+    Iterates over the pages of a paginated REST call, yielding the json
+    content of each response as it is received.
+
+    Parameters
+    ----------
+    client : cdcs.RestClient
+        The client to use for sending the REST calls.
+    method : str
+        The request method used for each page, i.e. 'get' or 'post'.
+    rest_url : str
+        The REST command URL, i.e. URL path after host.
+    params : dict, optional
+        Any params to send with each call.  The page number will be added to
+        a copy of this for pages after the first.
+    data : dict, optional
+        Any data to send with each call.
+    prefetch : bool, optional
+        If True (default), the next page is requested in a background thread
+        while the current page is being handled by the caller.
+
+    Yields
+    ------
+    dict
+        The json content of each page's response.
+    """
+    # Handle non-prefetching
+    if not prefetch:
+        page = None
+        while True:
+            response_json = get_page(client, method, rest_url, page,
+                                     params=params, data=data)
+            yield response_json
+            if response_json['next'] is None:
+                break
+            page = 2 if page is None else page + 1
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = 1
+        future = executor.submit(get_page, client, method, rest_url, None,
+                                 params=params, data=data)
+        while future is not None:
+            response_json = future.result()
+
+            # Request the next page before handing over the current one
+            if response_json['next'] is not None:
+                page += 1
+                future = executor.submit(get_page, client, method, rest_url,
+                                         page, params=params, data=data)
+            else:
+                future = None
+
+            yield response_json
+
+def get_page(client,
+             method: str,
+             rest_url: str,
+             page: Optional[int],
+             params: Optional[dict] = None,
+             data: Optional[dict] = None) -> dict:
+    """
+    Sends a REST call for a single page of a paginated result.
+
+    Parameters
+    ----------
+    client : cdcs.RestClient
+        The client to use for sending the REST call.
+    method : str
+        The request method, i.e. 'get' or 'post'.
+    rest_url : str
+        The REST command URL, i.e. URL path after host.
+    page : int or None
+        The page number to retrieve.  If None, no page number is sent which
+        returns the first page.
+    params : dict, optional
+        Any other params to send with the call.
+    data : dict, optional
+        Any data to send with the call.
+
+    Returns
+    -------
+    dict
+        The json content of the response.
+    """
+    params = dict(params) if params is not None else {}
+    if page is not None:
+        params['page'] = page
+
+    # Paginated calls only retrieve results so they can always be retried
+    with profile_stage(client, 'http'):
+        if data is None:
+            response = client.request(method, rest_url, params=params,
+                                      idempotent=True)
+        else:
+            response = client.request(method, rest_url, params=params, data=data,
+                                      idempotent=True)
+    with profile_stage(client, 'json'):
+        return response.json()
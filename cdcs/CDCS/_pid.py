@@ -1,9 +1,14 @@
+from __future__ import annotations
+
 # Standard library imports
 from typing import Union
 import contextlib
 
-# https://pandas.pydata.org/
-import pandas as pd
+# Local imports
+from ..lazy_import import lazy_import
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 @property
 def auto_set_pid(self) -> bool:
@@ -1,19 +1,23 @@
+from __future__ import annotations
+
 # Standard library imports
-from typing import Optional, Union
+from typing import Generator, Optional, Tuple, Union
 import json
 
-from tqdm import tqdm
-
-# https://pandas.pydata.org/
-import pandas as pd
-
 # Local imports
-from .. import aslist, date_parser
+from ..lazy_import import lazy_import
+from .. import date_column_parser
+from ._paging import get_all_pages, iter_pages
+from ..Profiler import profiled, profile_stage
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 query_keys = ['id', 'template', 'workspace', 'user_id', 'title', 'xml_content',
               'creation_date', 'last_modification_date', 'last_change_date',
               'template_title']
 
+@profiled
 def query(self,
           template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
           title: Optional[str] = None,
@@ -22,7 +26,10 @@ def query(self,
           page: Optional[int] = None,
           parse_dates: bool = True,
           progress_bar: bool = True,
-          current: bool = True) -> pd.DataFrame:
+          current: bool = True,
+          max_workers: int = 1,
+          local: bool = False,
+          use_cache: bool = True) -> pd.DataFrame:
     """
     Search all published local data records using either keyword or mongo-style
     queries. Note: specifying no parameters will return all records in the
@@ -57,6 +64,21 @@ def query(self,
         templates will be queried.  Default is True.  This is ignored if
         template is a pandas.Series or pandas.DataFrame as those
         representations include version information.
+    max_workers : int, optional
+        The maximum number of result pages to request at the same time when
+        page is None.  The default value of 1 requests the pages one after
+        another.  Values larger than 1 use the record count and page size
+        returned with the first page to request all remaining pages
+        concurrently.
+    local : bool, optional
+        If True, the records will be taken from the object's record_cache
+        rather than the database.  The templates must have been synced with
+        sync_records(), and keyword and mongoquery cannot be given.  Default
+        value is False.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
     
     Returns
     -------
@@ -66,111 +88,69 @@ def query(self,
     Raises
     ------
     ValueError
-        If query and keyword are both given.
+        If query and keyword are both given, or if local is True and the
+        search cannot be done with the record cache.
     """
-
-    templates = self.templates_dataframe(template, current=current)
-
-    # Set data based on arguments
-    data = {'all': 'true'} 
-    data = {}
-    
-    # Manage query field and rest_url
-    if keyword is not None:
-        rest_url = '/rest/data/query/keyword/'
-        if mongoquery is not None:
-            raise ValueError('keyword and mongoquery cannot both be given')
-        data['query'] = keyword
-        
-    elif mongoquery is not None:
-        rest_url = '/rest/data/query/'
-        if not isinstance(mongoquery, str):
-            data['query'] = json.dumps(mongoquery)
-        else:
-            data['query'] = mongoquery
-    else:
-        rest_url = '/rest/data/query/'
-        data['query'] = '{}'
-
-    # Manage template 
-    if template is not None or current is True:
-        data['templates'] = []
-        for template_id in templates.id.values:
-            if self.cdcsversion[0] > 2:
-                data['templates'].append({"id":int(template_id)})
-            else:
-                data['templates'].append({"id":template_id})
-                    
-        data['templates'] = json.dumps(data['templates'])
-
-    # Manage title
-    if title is not None:
-        data['title'] = title
+    if local:
+        if keyword is not None or mongoquery is not None:
+            raise ValueError('keyword and mongoquery cannot be used with local')
+        templates = self.templates_dataframe(template, current=current,
+                                             use_cache=use_cache)
+        with profile_stage(self, 'local_records'):
+            records = get_local_records(self, templates, title=title)
+        return format_query_records(records, templates, parse_dates=parse_dates,
+                                    client=self)
+
+    with profile_stage(self, 'build_query'):
+        templates, rest_url, data = build_query(self, template=template,
+                                                title=title, keyword=keyword,
+                                                mongoquery=mongoquery,
+                                                current=current,
+                                                use_cache=use_cache)
 
     # Get results from all pages
     if page is None:
 
         # Get response
-        response = self.post(rest_url, data=data)
-        response_json = response.json()
-        records = response_json['results']
-
-        if len(records) < response_json['count']:
-            
-            if progress_bar:
-                pbar = tqdm(total=response_json['count'], initial=len(records))
-            
-            # Repeat post until all content received
-            params = {'page':2}
-            while response_json['next'] is not None:
-                response = self.post(rest_url, params=params, data=data)
-                response_json = response.json()
-                newrecords = response_json['results']
-                records.extend(newrecords)
-                params['page'] += 1
-
-                if progress_bar:
-                    pbar.update(len(newrecords))
-            
-            if progress_bar:
-                pbar.close()
-
-            assert len(records) == response_json['count']
+        with profile_stage(self, 'http'):
+            response = self.post(rest_url, data=data, idempotent=True)
+        with profile_stage(self, 'json'):
+            response_json = response.json()
+        with profile_stage(self, 'pages'):
+            records = get_all_pages(self, 'post', rest_url, response_json,
+                                    data=data, max_workers=max_workers,
+                                    progress_bar=progress_bar)
         
-        records = pd.DataFrame(records)
+        with profile_stage(self, 'dataframe'):
+            records = pd.DataFrame(records)
 
     else:
         params = {'page':page}
-        response = self.post(rest_url, params=params, data=data)
-        response_json = response.json()
-        records = pd.DataFrame(response_json['results'])
-
-    if len(records) == 0:
-        records = pd.DataFrame(columns=query_keys)
-
-    # Set template titles
-    def set_template_titles(series, templates):
-        return templates[templates.id == series.template].iloc[0].title
-    if len(records) > 0:
-        records['template_title'] = records.apply(set_template_titles, args=[templates], axis=1)
-
-    # Parse date fields
-    if parse_dates and len(records) > 0:
-        for key in ['creation_date', 'last_modification_date', 'last_change_date']:
-            records[key] = records.apply(date_parser, args=[key], axis=1)
-    
-    return records
-
-def query_count(self,
-                template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
-                title: Optional[str] = None,
-                keyword: Union[str, list, None] = None,
-                mongoquery: Union[str, dict, None] = None,
-                current: bool = True,
-                ) -> pd.DataFrame:
+        with profile_stage(self, 'http'):
+            response = self.post(rest_url, params=params, data=data, idempotent=True)
+        with profile_stage(self, 'json'):
+            response_json = response.json()
+        with profile_stage(self, 'dataframe'):
+            records = pd.DataFrame(response_json['results'])
+
+    return format_query_records(records, templates, parse_dates=parse_dates,
+                                client=self)
+
+def iter_query(self,
+               template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+               title: Optional[str] = None,
+               keyword: Union[str, list, None] = None,
+               mongoquery: Union[str, dict, None] = None,
+               parse_dates: bool = True,
+               current: bool = True,
+               by_page: bool = False,
+               prefetch: bool = True,
+               use_cache: bool = True) -> Generator[Union[dict, pd.DataFrame], None, None]:
     """
     Search all published local data records using either keyword or mongo-style
-    queries and return only the total count of matching records.
+    queries, yielding the results as each page of results is received rather
+    than collecting all records before returning.  This keeps memory usage
+    bounded by the page size for large searches.
 
     Parameters
     ----------
@@ -186,24 +166,75 @@ def query_count(self,
         Mongodb find query to use in limiting searches by record element
         fields.  Note: only record parsing is supported, not field projection.
         keyword and mongoquery cannot both be given.
+    parse_dates : bool, optional
+        If True (default) then date fields will automatically be parsed into
+        pandas.Timestamp objects.  If False they will be left as str values.
     current : bool, optional
         If set to False, then records matching all versions of matching
         templates will be queried.  Default is True.  This is ignored if
         template is a pandas.Series or pandas.DataFrame as those
         representations include version information.
-
-    Returns
-    -------
-    int
-        The number of records matching the search request.
+    by_page : bool, optional
+        If False (default), each record is yielded separately as a dict.  If
+        True, each page of records is yielded as a pandas.DataFrame with the
+        same fields as returned by query().
+    prefetch : bool, optional
+        If True (default), the next page of results is requested in the
+        background while the current page is being processed by the caller.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
+    
+    Yields
+    ------
+    dict or pandas.DataFrame
+        The matching records, either individually or by page.
     
     Raises
     ------
     ValueError
         If query and keyword are both given.
     """
+    templates, rest_url, data = build_query(self, template=template,
+                                            title=title, keyword=keyword,
+                                            mongoquery=mongoquery,
+                                            current=current,
+                                            use_cache=use_cache)
+
+    for response_json in iter_pages(self, 'post', rest_url, data=data,
+                                    prefetch=prefetch):
+        records = pd.DataFrame(response_json['results'])
+        records = format_query_records(records, templates,
+                                       parse_dates=parse_dates)
+        if by_page:
+            yield records
+        else:
+            for record in records.to_dict('records'):
+                yield record
 
-    templates = self.templates_dataframe(template, current=current)
+def build_query(self,
+                template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                title: Optional[str] = None,
+                keyword: Union[str, list, None] = None,
+                mongoquery: Union[str, dict, None] = None,
+                current: bool = True,
+                use_cache: bool = True) -> Tuple[pd.DataFrame, str, dict]:
+    """
+    Builds the REST url and data for a query search.  See query() for a
+    description of the parameters.
+
+    Returns
+    -------
+    templates : pandas.DataFrame
+        The templates being searched.
+    rest_url : str
+        The REST command URL for the search.
+    data : dict
+        The data to send with the search.
+    """
+    templates = self.templates_dataframe(template, current=current,
+                                         use_cache=use_cache)
 
     # Set data based on arguments
     data = {'all': 'true'} 
@@ -225,9 +256,9 @@ def query_count(self,
     else:
         rest_url = '/rest/data/query/'
         data['query'] = '{}'
-    
+
     # Manage template 
-    if template is not None:
+    if template is not None or current is True:
         data['templates'] = []
         for template_id in templates.id.values:
             if self.cdcsversion[0] > 2:
@@ -241,30 +272,252 @@ def query_count(self,
     if title is not None:
         data['title'] = title
 
-    # Get response
-    response = self.post(rest_url, data=data)
-    response_json = response.json()
+    return templates, rest_url, data
 
-    return response_json['count']
+def format_query_records(records: pd.DataFrame,
+                         templates: pd.DataFrame,
+                         parse_dates: bool = True,
+                         client = None) -> pd.DataFrame:
+    """
+    Adds template titles to and parses the dates of raw query results.
+
+    Parameters
+    ----------
+    records : pandas.DataFrame
+        The records as returned by the query REST call.
+    templates : pandas.DataFrame
+        The templates that were searched.
+    parse_dates : bool, optional
+        If True (default) then date fields will automatically be parsed into
+        pandas.Timestamp objects.  If False they will be left as str values.
+    client : cdcs.CDCS, optional
+        The client whose profiler, if any, times the formatting stages.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The formatted records.
+    """
+    if len(records) == 0:
+        records = pd.DataFrame(columns=query_keys)
+
+    # Set template titles
+    if len(records) > 0:
+        with profile_stage(client, 'template_titles'):
+            template_titles = dict(zip(templates.id, templates.title))
+            records['template_title'] = records.template.map(template_titles)
+
+    # Parse date fields
+    if parse_dates and len(records) > 0:
+        with profile_stage(client, 'parse_dates'):
+            for key in ['creation_date', 'last_modification_date', 'last_change_date']:
+                records[key] = date_column_parser(records[key])
+    
+    return records
+
+def get_local_records(self,
+                      templates: Optional[pd.DataFrame] = None,
+                      title: Optional[str] = None) -> pd.DataFrame:
+    """
+    Retrieves records from the record cache.
+
+    Parameters
+    ----------
+    templates : pandas.DataFrame, optional
+        The templates to limit the records by.  If not given, the records of
+        all synced templates are returned.
+    title : str, optional
+        Record title to limit the records by.
 
+    Returns
+    -------
+    pandas.DataFrame
+        The raw cached records.
 
-def query_ipyparallel(self,
-                      client,
-                      template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
-                      title: Optional[str] = None,
-                      keyword: Union[str, list, None] = None,
-                      mongoquery: Union[str, dict, None] = None
-                      ) -> pd.DataFrame:
+    Raises
+    ------
+    ValueError
+        If the object has no record cache or a template has not been synced.
+    """
+    if self.record_cache is None:
+        raise ValueError('no record_cache set')
+
+    template_ids = None
+    if templates is not None:
+        template_ids = templates.id.tolist()
+        for template_id in template_ids:
+            if not self.record_cache.is_synced(self.host, template_id):
+                raise ValueError(f'records for template {template_id} have not been synced')
+    
+    return pd.DataFrame(self.record_cache.get_records(self.host, templates=template_ids,
+                                                      title=title))
+
+def sync_records(self,
+                 template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                 current: bool = True,
+                 full: bool = False,
+                 progress_bar: bool = False) -> pd.DataFrame:
+    """
+    Updates the record cache with the records of one or more templates.  The
+    records of each template are paged through and the last_modification_date
+    and last_change_date of each are compared with the cached copy, so that
+    only new and changed records are stored.  Cached records that were not
+    seen are removed.  CDCS queries search the record content rather than the
+    record metadata, so the dates cannot be used to limit the records
+    retrieved.
+
+    Parameters
+    ----------
+    template : list, str, pandas.Series or pandas.DataFrame, optional
+        One or more templates or template titles to sync.  If not given, all
+        templates will be synced.
+    current : bool, optional
+        If set to False, then records of all versions of matching templates
+        will be synced.  Default is True.  This is ignored if template is a
+        pandas.Series or pandas.DataFrame as those representations include
+        version information.
+    full : bool, optional
+        If True, all retrieved records will be stored even if their dates
+        match the cached copies.  Default value is False.
+    progress_bar : bool, optional
+        If True a progress bar will be displayed for multi-page results.
+        Default value is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A summary for each template with fields template, title, updated,
+        deleted and count, giving the number of records stored, the number
+        removed and the total number cached.
+
+    Raises
+    ------
+    ValueError
+        If the object has no record cache.
+    """
+    if self.record_cache is None:
+        raise ValueError('no record_cache set')
+    cache = self.record_cache
+
+    templates = self.templates_dataframe(template, current=current)
+    
+    results = []
+    for i in range(len(templates)):
+        template = templates.iloc[i]
+        known = {} if full else cache.dates(self.host, template.id)
+        
+        # Store new and changed records
+        updated, seen, since = sync_pages(self, template, known,
+                                          cache.get_since(self.host, template.id),
+                                          progress_bar=progress_bar)
+        
+        # Remove records that were not seen
+        deleted = cache.delete(self.host, template.id,
+                               cache.ids(self.host, template.id) - seen)
+
+        cache.set_since(self.host, template.id, since)
+        results.append({'template': template.id, 'title': template.title,
+                        'updated': updated, 'deleted': deleted,
+                        'count': cache.count(self.host, template.id)})
+
+    return pd.DataFrame(results, columns=['template', 'title', 'updated',
+                                          'deleted', 'count'])
+
+def sync_pages(self,
+               template: pd.Series,
+               known: dict,
+               since: Optional[str],
+               progress_bar: bool = False) -> Tuple[int, set, Optional[str]]:
+    """
+    Retrieves the records of a template page by page and stores the ones
+    that are new or have different dates than the cached copies.
+
+    Returns
+    -------
+    updated : int
+        The number of records stored.
+    seen : set
+        The ids of all retrieved records as str.
+    since : str or None
+        The newest modification or change date seen, or the given since if no
+        records were newer.
+    """
+    templates, rest_url, data = build_query(self, template=template)
+    updated = 0
+    seen = set()
+    pbar = None
+    try:
+        for response_json in iter_pages(self, 'post', rest_url, data=data):
+            records = response_json['results']
+            changed = [record for record in records
+                       if known.get(str(record['id'])) != (record.get('last_modification_date'),
+                                                          record.get('last_change_date'))]
+            updated += self.record_cache.update(self.host, template.id, changed)
+            seen.update(str(record['id']) for record in records)
+            if len(records) > 0:
+                since = newest_date(records, since)
+            
+            if progress_bar:
+                if pbar is None:
+                    from tqdm import tqdm
+                    pbar = tqdm(total=response_json['count'])
+                pbar.update(len(records))
+    finally:
+        if pbar is not None:
+            pbar.close()
+
+    return updated, seen, since
+
+def newest_date(records: list, since: Optional[str] = None) -> Optional[str]:
+    """
+    Finds the newest modification or change date of raw records.
+
+    Parameters
+    ----------
+    records : list of dict
+        The records as returned by the REST calls.
+    since : str, optional
+        A previous newest date to include in the comparison.
+
+    Returns
+    -------
+    str or None
+        The newest date as an ISO 8601 UTC str, or None if no dates found.
+    """
+    dates = [since]
+    for record in records:
+        dates.append(record.get('last_modification_date'))
+        dates.append(record.get('last_change_date'))
+    
+    newest = None
+    for date in dates:
+        if date is None:
+            continue
+        date = pd.Timestamp(date)
+        if date.tzinfo is None:
+            date = date.tz_localize('UTC')
+        else:
+            date = date.tz_convert('UTC')
+        if newest is None or date > newest:
+            newest = date
+    
+    if newest is None:
+        return None
+    return newest.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def query_count(self,
+                template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
+                title: Optional[str] = None,
+                keyword: Union[str, list, None] = None,
+                mongoquery: Union[str, dict, None] = None,
+                current: bool = True,
+                use_cache: bool = True) -> int:
     """
     Search all published local data records using either keyword or mongo-style
-    queries. Note: specifying no parameters will return all records in the
-    database!
+    queries and return only the total count of matching records.
 
     Parameters
     ----------
-    client : ipyparallel.client.client.Client
-        An ipyparallel Client object to use for performing multiple
-        parallel web requests.
     template : list, str, pandas.Series or pandas.DataFrame, optional
         One or more templates or template titles to limit the search by.
     title : str, optional
@@ -277,95 +530,35 @@ def query_ipyparallel(self,
         Mongodb find query to use in limiting searches by record element
         fields.  Note: only record parsing is supported, not field projection.
         keyword and mongoquery cannot both be given.
+    current : bool, optional
+        If set to False, then records matching all versions of matching
+        templates will be queried.  Default is True.  This is ignored if
+        template is a pandas.Series or pandas.DataFrame as those
+        representations include version information.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
 
     Returns
     -------
-    pandas.DataFrame
-        All records matching the search request.
+    int
+        The number of records matching the search request.
     
     Raises
     ------
     ValueError
         If query and keyword are both given.
-    """  
-    raise NotImplementedError('Still need to finish')
-    # Create direct and load balanced views
-    dview = client[:]
-    lview = client.load_balanced_view()
-
-    # Set data based on arguments
-    data = {'all': 'true'} 
-    data = {}
-    
-    # Manage query field and rest_url
-    if keyword is not None:
-        rest_url = '/rest/data/query/keyword/'
-        if mongoquery is not None:
-            raise ValueError('keyword and mongoquery cannot both be given')
-        data['query'] = keyword
-        
-    elif mongoquery is not None:
-        rest_url = '/rest/data/query/'
-        if not isinstance(mongoquery, str):
-            data['query'] = json.dumps(mongoquery)
-        else:
-            data['query'] = mongoquery
-    else:
-        rest_url = '/rest/data/query/'
-        data['query'] = '{}'
-    
-    # Manage template 
-    if template is not None:
-        data['templates'] = []
-        
-        # Handle DataFrames
-        if isinstance(template, pd.DataFrame):
-            templates = template
-            for template_id in template.id.values:
-                data['templates'].append({"id":template_id})
-        else:
-            for t in aslist(template):
-                templates = []
-                if not isinstance(t, pd.Series):
-                    t = self.get_template(title=t)
-                
-                data['templates'].append({"id":t.id})
-                templates.append(t)
-            templates = pd.DataFrame(templates)    
-                    
-        data['templates'] = json.dumps(data['templates'])
-    else:
-        templates = self.get_templates()
+    """
 
-    # Manage title
-    if title is not None:
-        data['title'] = title
+    templates, rest_url, data = build_query(self, template=template,
+                                            title=title, keyword=keyword,
+                                            mongoquery=mongoquery,
+                                            current=current,
+                                            use_cache=use_cache)
 
-    # Get response for page 1
-    response = self.post(rest_url, data=data)
+    # Get response
+    response = self.post(rest_url, data=data, idempotent=True)
     response_json = response.json()
-    records = response_json['results']
-
-    numpages = response_json['count'] / len(records)
-    pages = list(range(2, numpages+1))
-    if numpages > 1:
 
-        dview.push(dict(self=self, data=data))
-        
-        def post_page(page):
-            params = {'page':page}
-            response = self.post(rest_url, params=params, data=data)
-            response_json = response.json()
-            return response_json['results']
-
-        results = lview.map_async(post_page, pages)
-        assert len(records) == response_json['count']
-        records = pd.DataFrame(records)
-
-    # Set template titles
-    def set_template_titles(series, templates):
-        return templates[templates.id == series.template].iloc[0].title
-    if len(records) > 0:
-        records['template_title'] = records.apply(set_template_titles, args=[templates], axis=1)
-
-    return records
+    return response_json['count']
@@ -1,27 +1,32 @@
+from __future__ import annotations
+
 # Standard library imports
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Union
-
-# https://tqdm.github.io/
-from tqdm import tqdm
-
-# https://ipython.org/
-from IPython.display import display, HTML
-
-# https://pandas.pydata.org/
-import pandas as pd
+from typing import Generator, Iterable, Optional, Tuple, Union
 
 # Local imports
-from .. import aslist, date_parser
+from ..lazy_import import lazy_import
+from .. import date_column_parser
+from ._paging import get_all_pages, iter_pages
+from ._query import build_query, get_local_records
+from ._workspace import assign_to_workspace
+from ..Profiler import profiled, profile_stage
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 record_keys = ['id', 'template', 'workspace', 'user_id', 'title', 'xml_content',
                'creation_date', 'last_modification_date', 'last_change_date']
 
+@profiled
 def get_records(self, template: Union[str, pd.Series, None] = None,
                 title: Optional[str] = None,
                 page: Optional[int] = None,
                 parse_dates: bool = True,
-                progress_bar: bool = True) -> pd.DataFrame:
+                progress_bar: bool = True,
+                max_workers: int = 1,
+                local: bool = False) -> pd.DataFrame:
     """
     Retrieves user records.
 
@@ -41,12 +46,31 @@ def get_records(self, template: Union[str, pd.Series, None] = None,
     progress_bar : bool, optional
         If True (default) a progress bar will be displayed for multi-page
         query results. Only used for CDCS versions 3.X.X.
+    max_workers : int, optional
+        The maximum number of result pages to request at the same time when
+        page is None.  The default value of 1 requests the pages one after
+        another.  Values larger than 1 request all remaining pages
+        concurrently.  Only used for CDCS versions 3.X.X.
+    local : bool, optional
+        If True, the records will be taken from the object's record_cache
+        rather than the database.  The template must have been synced with
+        sync_records().  Default value is False.
 
     Returns
     -------
     pandas.DataFrame
         All matching user records.
     """
+    # Get records from the record cache
+    if local:
+        templates = None
+        if template is not None:
+            if not isinstance(template, pd.Series):
+                template = self.get_template(title=template)
+            templates = template.to_frame().T
+        with profile_stage(self, 'local_records'):
+            records = get_local_records(self, templates, title=title)
+        return format_records(records, parse_dates=parse_dates, client=self)
 
     # Use old method for CDCS 2.X.X
     if self.cdcsversion[0] == 2:
@@ -65,7 +89,8 @@ def get_records(self, template: Union[str, pd.Series, None] = None,
             
         # Handle template titles
         else:
-            template = self.get_template(title=template)
+            with profile_stage(self, 'get_template'):
+                template = self.get_template(title=template)
             params['template'] = template.id
             
     # Manage title
@@ -76,49 +101,28 @@ def get_records(self, template: Union[str, pd.Series, None] = None,
 
     # Get results from all pages
     if page is None:
-        response = self.get(rest_url, params=params)
-        response_json = response.json()
-        records = response_json['results']
-        
-        if len(records) < response_json['count']:
-
-            if progress_bar:
-                pbar = tqdm(total=response_json['count'], initial=len(records))
+        with profile_stage(self, 'http'):
+            response = self.get(rest_url, params=params)
+        with profile_stage(self, 'json'):
+            response_json = response.json()
+        with profile_stage(self, 'pages'):
+            records = get_all_pages(self, 'get', rest_url, response_json,
+                                    params=params, max_workers=max_workers,
+                                    progress_bar=progress_bar)
         
-            # Repeat post until all content received
-            params['page'] = 2
-            while response_json['next'] is not None:
-                response = self.get(rest_url, params=params)
-                response_json = response.json()
-                newrecords = response_json['results']
-                records.extend(newrecords)
-                params['page'] += 1
-
-                if progress_bar:
-                    pbar.update(len(newrecords))
-            
-            if progress_bar:
-                pbar.close()
-
-            assert len(records) == response_json['count']
-        
-        records = pd.DataFrame(records)
+        with profile_stage(self, 'dataframe'):
+            records = pd.DataFrame(records)
 
     else:
         params['page'] = page
-        response = self.get(rest_url, params=params)
-        response_json = response.json()
-        records = pd.DataFrame(response_json['results'])
+        with profile_stage(self, 'http'):
+            response = self.get(rest_url, params=params)
+        with profile_stage(self, 'json'):
+            response_json = response.json()
+        with profile_stage(self, 'dataframe'):
+            records = pd.DataFrame(response_json['results'])
         
-    if len(records) == 0:
-        records = pd.DataFrame(columns=record_keys)
-
-    # Parse date fields
-    if parse_dates and len(records) > 0:
-        for key in ['creation_date', 'last_modification_date', 'last_change_date']:
-            records[key] = records.apply(date_parser, args=[key], axis=1)
-    
-    return records
+    return format_records(records, parse_dates=parse_dates, client=self)
 
 def get_records_v2(self, template: Union[str, pd.Series, None] = None,
                    title: Optional[str] = None,
@@ -165,13 +169,109 @@ def get_records_v2(self, template: Union[str, pd.Series, None] = None,
     response = self.get(rest_url, params=params)
     records = response.json()
     records = pd.DataFrame(records)
+    
+    return format_records(records, parse_dates=parse_dates)
+
+def iter_records(self, template: Union[str, pd.Series, None] = None,
+                 title: Optional[str] = None,
+                 parse_dates: bool = True,
+                 by_page: bool = False,
+                 prefetch: bool = True) -> Generator[Union[dict, pd.DataFrame], None, None]:
+    """
+    Retrieves user records, yielding the results as each page of results is
+    received rather than collecting all records before returning.  This keeps
+    memory usage bounded by the page size for large numbers of records.
+
+    Parameters
+    ----------
+    template : str or pandas.Series, optional
+        The template or template title to limit the search by.
+    title : str, optional
+        The data record title to limit the search by.
+    parse_dates : bool, optional
+        If True (default) then date fields will automatically be parsed into
+        pandas.Timestamp objects.  If False they will be left as str values.
+    by_page : bool, optional
+        If False (default), each record is yielded separately as a dict.  If
+        True, each page of records is yielded as a pandas.DataFrame with the
+        same fields as returned by get_records().  CDCS versions 2.X.X do not
+        paginate the records, so all records will be in a single page.
+    prefetch : bool, optional
+        If True (default), the next page of results is requested in the
+        background while the current page is being processed by the caller.
+        Only used for CDCS versions 3.X.X.
+
+    Yields
+    ------
+    dict or pandas.DataFrame
+        The matching user records, either individually or by page.
+    """
+    # Build params
+    params = {}
+
+    # Manage template
+    if template is not None:
+        
+        # Handle template series
+        if isinstance(template, pd.Series):
+            params['template'] = template.id
+            
+        # Handle template titles
+        else:
+            template = self.get_template(title=template)
+            params['template'] = template.id
+            
+    # Manage title
+    if title is not None:
+        params['title'] = title
+
+    rest_url = '/rest/data/'
+
+    # CDCS 2.X.X returns all records in one unpaginated response
+    if self.cdcsversion[0] == 2:
+        pages = [{'results': self.get(rest_url, params=params).json()}]
+    else:
+        pages = iter_pages(self, 'get', rest_url, params=params,
+                           prefetch=prefetch)
+
+    for response_json in pages:
+        records = format_records(pd.DataFrame(response_json['results']),
+                                 parse_dates=parse_dates)
+        if by_page:
+            yield records
+        else:
+            for record in records.to_dict('records'):
+                yield record
+
+def format_records(records: pd.DataFrame,
+                   parse_dates: bool = True,
+                   client = None) -> pd.DataFrame:
+    """
+    Parses the dates of raw record results.
+
+    Parameters
+    ----------
+    records : pandas.DataFrame
+        The records as returned by the data REST call.
+    parse_dates : bool, optional
+        If True (default) then date fields will automatically be parsed into
+        pandas.Timestamp objects.  If False they will be left as str values.
+    client : cdcs.CDCS, optional
+        The client whose profiler, if any, times the formatting stages.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The formatted records.
+    """
     if len(records) == 0:
         records = pd.DataFrame(columns=record_keys)
-    
+
     # Parse date fields
     if parse_dates and len(records) > 0:
-        for key in ['creation_date', 'last_modification_date', 'last_change_date']:
-            records[key] = records.apply(date_parser, args=[key], axis=1)
+        with profile_stage(client, 'parse_dates'):
+            for key in ['creation_date', 'last_modification_date', 'last_change_date']:
+                records[key] = date_column_parser(records[key])
     
     return records
 
@@ -231,7 +331,10 @@ def assign_records(self, workspace: Union[str, pd.Series],
                    template: Union[str, pd.Series, None] = None,
                    title: Optional[str] = None,
                    auto_set_pid_off: bool = False,
-                   verbose: bool = False):
+                   max_workers: int = 1,
+                   progress_bar: bool = False,
+                   raise_errors: bool = True,
+                   verbose: bool = False) -> pd.DataFrame:
     """
     Assigns one or more records to a workspace.
 
@@ -259,9 +362,25 @@ def assign_records(self, workspace: Union[str, pd.Series],
         value is being uploaded.  For uploading multiple records with PID values
         use the auto_set_pid_off context manager around batch uploads, or
         manually turn the setting on/off with auto_set_pid.
+    max_workers : int, optional
+        The maximum number of records to assign at the same time.  The default
+        value of 1 assigns the records one after another.
+    progress_bar : bool, optional
+        If True a progress bar will be displayed.  Default value is False.
+    raise_errors : bool, optional
+        If True (default), the first error encountered will be raised after
+        all assignments have been tried.  If False, errors are only reported
+        in the returned results.
     verbose : bool, optional
         Setting this to True will print extra status messages.  Default value
         is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each id with fields id, status and error.  status is
+        either 'assigned' or 'failed', and error gives the reason for any
+        failures.
     """
     # Get workspace id
     if isinstance(workspace, str):
@@ -290,29 +409,20 @@ def assign_records(self, workspace: Union[str, pd.Series],
 
     # Assign records to the workspace
     with self.auto_set_pid_off(auto_set_pid_off):
-        for record_id in aslist(ids):
-            rest_url = f'/rest/data/{record_id}/assign/{workspace_id}'
-            response = self.patch(rest_url)
+        return assign_to_workspace(self, 'data', ids, workspace_id,
+                                   max_workers=max_workers,
+                                   progress_bar=progress_bar,
+                                   raise_errors=raise_errors, verbose=verbose)
 
-            if verbose and response.status_code == 200:
-                print(f'record {record_id} assigned to workspace {workspace_id}')
-
-def upload_record(self, template: Union[str, pd.Series],
-                  filename: Optional[str] = None,
-                  content: Union[str, bytes, None] = None,
-                  title: Optional[str] = None,
-                  workspace: Union[str, pd.Series] = None,
-                  duplicatecheck: bool = True,
-                  auto_set_pid_off: bool = False,
-                  verbose: bool = False):
+def load_record_content(filename: Union[str, Path, None] = None,
+                        content: Union[str, bytes, None] = None,
+                        title: Optional[str] = None) -> Tuple[str, bytes]:
     """
-    Adds a data record to the curator
+    Loads and encodes the content of a record to upload.
 
     Parameters
     ----------
-    template : str or pandas.Series
-        The template or template title to associate with the record.
-    filename : str, optional
+    filename : str or Path, optional
         Name of an XML file whose contents are to be uploaded.  Either filename
         or content required.
     content : str or bytes, optional
@@ -320,39 +430,22 @@ def upload_record(self, template: Union[str, pd.Series],
     title : str, optional
         Title to save the record as.  Optional if filename is given (title will
         be taken as filename without ext).
-    workspace : str or pandas.Series, optional
-        If given, the record will be assigned to this workspace after
-        successfully being uploaded.
-    duplicatecheck : bool, optional
-        If True (default), then a ValueError will be raised if a record already
-        exists in the database with the same template and title.  If False, no
-        check is performed possibly allowing for multiple records with the same
-        title to exist in the database.
-    auto_set_pid_off : bool, optional
-        If True the auto_set PID will automatically be turned off before and
-        turned on after uploading. Not  needed if the record has no PID value
-        or pid_xpath set.  Convenient if a single record with a PID
-        value is being uploaded.  For uploading multiple records with PID values
-        use the auto_set_pid_off context manager around batch uploads, or
-        manually turn the setting on/off with auto_set_pid.
-    verbose : bool, optional
-        Setting this to True will print extra status messages.  Default value
-        is False.
+
+    Returns
+    -------
+    title : str
+        The record title.
+    content : bytes
+        The encoded record content.
 
     Raises
     ------
     ValueError
         If an improper or incomplete combination of filename, content, and
-        title parameters are given, or if duplicatecheck=True and a record
-        with the same title and template exist.
+        title parameters are given.
     TypeError
         If content is not str or bytes.
     """
-
-    # Fetch template by title if needed
-    if isinstance(template, str):
-        template = self.get_template(title=template)
-    
     # Load content from file
     if filename is not None:
         if content is not None:
@@ -390,12 +483,90 @@ def upload_record(self, template: Union[str, pd.Series],
         
     else:
         raise ValueError('filename or content must be given')
+
+    return title, content
+
+@profiled
+def upload_record(self, template: Union[str, pd.Series],
+                  filename: Optional[str] = None,
+                  content: Union[str, bytes, None] = None,
+                  title: Optional[str] = None,
+                  workspace: Union[str, pd.Series] = None,
+                  duplicatecheck: bool = True,
+                  auto_set_pid_off: bool = False,
+                  use_cache: bool = True,
+                  verbose: bool = False):
+    """
+    Adds a data record to the curator
+
+    Parameters
+    ----------
+    template : str or pandas.Series
+        The template or template title to associate with the record.
+    filename : str, optional
+        Name of an XML file whose contents are to be uploaded.  Either filename
+        or content required.
+    content : str or bytes, optional
+        String content to upload. Either filename or content required.
+    title : str, optional
+        Title to save the record as.  Optional if filename is given (title will
+        be taken as filename without ext).
+    workspace : str or pandas.Series, optional
+        If given, the record will be assigned to this workspace after
+        successfully being uploaded.
+    duplicatecheck : bool, optional
+        If True (default), then a ValueError will be raised if a record already
+        exists in the database with the same template and title.  If False, no
+        check is performed possibly allowing for multiple records with the same
+        title to exist in the database.  If the titles of the template's
+        records have been indexed with index_record_titles(), the check uses
+        the index rather than searching the database.
+    auto_set_pid_off : bool, optional
+        If True the auto_set PID will automatically be turned off before and
+        turned on after uploading. Not  needed if the record has no PID value
+        or pid_xpath set.  Convenient if a single record with a PID
+        value is being uploaded.  For uploading multiple records with PID values
+        use the auto_set_pid_off context manager around batch uploads, or
+        manually turn the setting on/off with auto_set_pid.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
+    verbose : bool, optional
+        Setting this to True will print extra status messages.  Default value
+        is False.
+
+    Raises
+    ------
+    ValueError
+        If an improper or incomplete combination of filename, content, and
+        title parameters are given, or if duplicatecheck=True and a record
+        with the same title and template exist.
+    TypeError
+        If content is not str or bytes.
+    """
+
+    # Fetch template by title if needed
+    if isinstance(template, str):
+        with profile_stage(self, 'get_template'):
+            template = self.get_template(title=template, use_cache=use_cache)
+    
+    # Load and encode content
+    with profile_stage(self, 'load_content'):
+        title, content = load_record_content(filename=filename, content=content,
+                                             title=title)
     
     # Check if matching record already exists
+    titles = self.title_index.get(template.id)
     if duplicatecheck is True:
-        matches = self.query(template=template, title=title)
-        if len(matches) > 0:
-            raise ValueError('Record with matching title and template found!')
+        with profile_stage(self, 'duplicate_check'):
+            if titles is not None:
+                if title in titles:
+                    raise ValueError('Record with matching title and template found!')
+            else:
+                matches = self.query(template=template, title=title)
+                if len(matches) > 0:
+                    raise ValueError('Record with matching title and template found!')
     
     # Set data dict
     data = {
@@ -407,15 +578,248 @@ def upload_record(self, template: Union[str, pd.Series],
     rest_url = '/rest/data/'
 
     with self.auto_set_pid_off(auto_set_pid_off):
-        response = self.post(rest_url, data=data)
+        with profile_stage(self, 'http'):
+            response = self.post(rest_url, data=data)
+        if titles is not None:
+            titles.add(title)
     
         if verbose and response.status_code == 201:
             record_id = response.json()['id']
             print(f'record {title} ({record_id}) successfully uploaded.')
 
         if workspace is not None:
-            assign_records(self, workspace=workspace, ids=[response.json()['id']],
-                        verbose=verbose)
+            with profile_stage(self, 'assign_workspace'):
+                assign_records(self, workspace=workspace, ids=[response.json()['id']],
+                            verbose=verbose)
+
+def upload_records(self, template: Union[str, pd.Series],
+                   records: Iterable[Union[str, Path, Tuple[str, Union[str, bytes]]]],
+                   workspace: Union[str, pd.Series, None] = None,
+                   duplicatecheck: bool = True,
+                   auto_set_pid_off: bool = False,
+                   max_workers: int = 1,
+                   progress_bar: bool = True,
+                   verbose: bool = False) -> pd.DataFrame:
+    """
+    Adds multiple data records with the same template to the curator.  The
+    template and workspace are resolved once, duplicate checking is done with
+    one search for the whole batch, and the records can be uploaded
+    concurrently.  The content of each record is only read from its file
+    when it is uploaded.  Errors for individual records are collected rather than
+    stopping the remaining uploads.
+
+    Parameters
+    ----------
+    template : str or pandas.Series
+        The template or template title to associate with the records.
+    records : iterable
+        The records to upload.  Each item is either the path to an XML file,
+        in which case the title will be the file name without extension, or a
+        (title, content) tuple where content is the XML str or bytes.
+    workspace : str or pandas.Series, optional
+        If given, the records will be assigned to this workspace after
+        successfully being uploaded.
+    duplicatecheck : bool, optional
+        If True (default), then records will be skipped if a record already
+        exists in the database, or earlier in records, with the same template
+        and title.  The existing titles are found with one paged search for
+        the batch, or taken from the title index if it was built with
+        index_record_titles().  If False, no check is performed possibly
+        allowing for multiple records with the same title to exist in the
+        database.
+    auto_set_pid_off : bool, optional
+        If True the auto_set PID will automatically be turned off before and
+        turned on after uploading all of the records. Not needed if the records
+        have no PID values or pid_xpath set.
+    max_workers : int, optional
+        The maximum number of records to upload at the same time.  The default
+        value of 1 uploads the records one after another.
+    progress_bar : bool, optional
+        If True (default) a progress bar will be displayed.
+    verbose : bool, optional
+        Setting this to True will print extra status messages.  Default value
+        is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each record in the same order as records, with fields
+        title, filename, id, status and error.  status is 'uploaded',
+        'duplicate', 'failed' if the record could not be uploaded, or
+        'unassigned' if the record was uploaded but could not be assigned to
+        the workspace.  error gives the reason for any failures.
+    """
+    # Fetch template by title if needed
+    if isinstance(template, str):
+        template = self.get_template(title=template)
+
+    # Get workspace id
+    if isinstance(workspace, str):
+        workspace = self.get_workspace(workspace)
+
+    # Find titles of existing records, using the title index if built
+    titles = self.title_index.get(template.id)
+    if duplicatecheck is True:
+        if titles is None:
+            titles = get_record_titles(self, template)
+        batch_titles = set()
+    
+    # Build results table entries without loading any content
+    results = []
+    for record in records:
+        if isinstance(record, tuple):
+            title, content = record
+            filename = None
+        else:
+            content = None
+            filename = str(record)
+            title = Path(filename).stem
+            
+        result = {'title': title, 'filename': filename, 'id': None,
+                  'status': None, 'error': None, 'content': content}
+        if duplicatecheck is True and title is not None:
+            if title in titles or title in batch_titles:
+                result['status'] = 'duplicate'
+                result['error'] = 'Record with matching title and template found!'
+                result.pop('content')
+            else:
+                batch_titles.add(title)
+        results.append(result)
+
+    def upload(result):
+        """Loads and uploads one record and assigns it to the workspace"""
+        try:
+            title, content = load_record_content(filename=result['filename'],
+                                                 content=result.pop('content'),
+                                                 title=result['title'])
+            data = {
+                'title': title,
+                'template': template.id,
+                'xml_content': content
+            }
+            response = self.post('/rest/data/', data=data)
+            result['id'] = response.json()['id']
+        except Exception as err:
+            result['status'] = 'failed'
+            result['error'] = str(err)
+            return result
+        
+        if titles is not None:
+            titles.add(result['title'])
+        if verbose:
+            print(f'record {result["title"]} ({result["id"]}) successfully uploaded.')
+
+        if workspace is not None:
+            try:
+                assign_to_workspace(self, 'data', result['id'], workspace.id,
+                                    verbose=verbose)
+            except Exception as err:
+                result['status'] = 'unassigned'
+                result['error'] = str(err)
+                return result
+        
+        result['status'] = 'uploaded'
+        return result
+
+    toupload = [result for result in results if result['status'] is None]
+    if progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(toupload))
+
+    with self.auto_set_pid_off(auto_set_pid_off):
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(upload, result) for result in toupload]
+                for future in as_completed(futures):
+                    if progress_bar:
+                        pbar.update(1)
+        else:
+            for result in toupload:
+                upload(result)
+                if progress_bar:
+                    pbar.update(1)
+
+    if progress_bar:
+        pbar.close()
+
+    for result in results:
+        result.pop('content', None)
+
+    return pd.DataFrame(results, columns=['title', 'filename', 'id',
+                                          'status', 'error'])
+
+def index_record_titles(self, template: Union[str, pd.Series],
+                        refresh: bool = False) -> set:
+    """
+    Builds an index of the titles of all records associated with a template.
+    Once built, upload_record() and upload_records() check for duplicate
+    titles using the index instead of searching the database, and add the
+    titles of newly uploaded records to it.  This makes checking for
+    duplicates cheap when uploading many records to the same template.
+    Note that the index will not reflect records added or deleted by others.
+
+    Parameters
+    ----------
+    template : str or pandas.Series
+        The template or template title to index the record titles of.
+    refresh : bool, optional
+        If False (default), an existing index for the template will be reused.
+        If True, the index will be rebuilt from the database.
+
+    Returns
+    -------
+    set
+        The indexed titles.
+    """
+    # Fetch template by title if needed
+    if isinstance(template, str):
+        template = self.get_template(title=template)
+
+    titles = self.title_index.get(template.id)
+    if titles is not None and not refresh:
+        return titles
+
+    titles = get_record_titles(self, template)
+    self.title_index[template.id] = titles
+    return titles
+
+def get_record_titles(self, template: pd.Series) -> set:
+    """
+    Retrieves the titles of all records associated with a template, paging
+    through the search results without keeping the record contents.
+
+    Parameters
+    ----------
+    template : pandas.Series
+        The template to get the record titles of.
+
+    Returns
+    -------
+    set
+        The record titles.
+    """
+    titles = set()
+    templates, rest_url, data = build_query(self, template=template)
+    for response_json in iter_pages(self, 'post', rest_url, data=data):
+        titles.update(record['title'] for record in response_json['results'])
+    return titles
+
+def clear_record_title_index(self, template: Union[str, pd.Series, None] = None):
+    """
+    Removes record titles indexed by index_record_titles().
+
+    Parameters
+    ----------
+    template : str or pandas.Series, optional
+        The template or template title to remove the index for.  If not given,
+        the indices for all templates will be removed.
+    """
+    if template is None:
+        self.title_index.clear()
+    else:
+        if isinstance(template, str):
+            template = self.get_template(title=template)
+        self.title_index.pop(template.id, None)
 
 def update_record(self, record: Optional[pd.Series] = None,
                   template: Union[str, pd.Series, None] = None,
@@ -553,6 +957,9 @@ def delete_record(self, record: Optional[pd.Series] = None,
         rest_url = f'/rest/data/{record.id}/'
     
     response = self.delete(rest_url)
+    titles = self.title_index.get(record.template)
+    if titles is not None:
+        titles.discard(record.title)
     
     if verbose and response.status_code == 204:
         print(f'record {record.title} ({record.id}) has been deleted.')
@@ -678,6 +1085,7 @@ def transform_record(self,
     response = self.post(rest_url, data=data)
     
     if render_html:
+        from IPython.display import display, HTML
         display(HTML(response.text))
     else:
         return response.text
\ No newline at end of file
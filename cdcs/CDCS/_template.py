@@ -1,9 +1,16 @@
+from __future__ import annotations
+
 # Standard library imports
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Union
 
-# https://pandas.pydata.org/
-import pandas as pd
+# Local imports
+from ..lazy_import import lazy_import
+from ..Profiler import profiled, profile_bind, profile_stage
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 manager_keys = ['id','versions','current','disabled_versions','title',
                 'user','is_disabled','_cls','creation_date','display_rank']
@@ -11,7 +18,8 @@ template_keys = ['id','user','filename','checksum','content','hash','dependencie
 
 def get_template_managers(self, title: Optional[str] = None,
                           is_disabled: bool = False,
-                          useronly: bool = False) -> pd.DataFrame:
+                          useronly: bool = False,
+                          use_cache: bool = True) -> pd.DataFrame:
     """
     Get template managers from a curator
 
@@ -25,6 +33,10 @@ def get_template_managers(self, title: Optional[str] = None,
     useronly : bool, optional
         If True, only a user's templates are returned. If False (default),
         then all global templates are returned.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
 
     Returns
     -------
@@ -51,12 +63,21 @@ def get_template_managers(self, title: Optional[str] = None,
     if is_disabled is True:
         params['is_disabled'] = is_disabled
     
+    # Check cache
+    key = ('template-managers', rest_url, title, is_disabled)
+    if use_cache:
+        template_managers = self.template_cache.get(key)
+        if template_managers is not None:
+            return template_managers.copy()
+
     # Get response
     response = self.get(rest_url, params=params)
     template_managers = pd.DataFrame(response.json())
     if len(template_managers) == 0:
         template_managers = pd.DataFrame(columns=manager_keys)
     
+    self.template_cache.set(key, template_managers.copy())
+
     return template_managers
     
 def disable_template_manager(self,
@@ -95,6 +116,7 @@ def disable_template_manager(self,
 
     manager_id = template_manager["id"]
     self.patch(f'/rest/template-version-manager/{manager_id}/disable/')
+    self.clear_template_cache()
     
     if verbose:
         print(f'template manager with id {manager_id} disabled')
@@ -135,14 +157,19 @@ def restore_template_manager(self,
 
     manager_id = template_manager["id"]
     self.patch(f'/rest/template-version-manager/{manager_id}/restore/')
+    self.clear_template_cache()
 
     if verbose:
         print(f'template manager with id {manager_id} restored')
 
+@profiled
 def get_templates(self, title: Optional[str] = None,
                   is_disabled: bool = False,
                   current: bool = True,
-                  useronly: bool = False) -> pd.DataFrame:
+                  useronly: bool = False,
+                  use_cache: bool = True,
+                  max_workers: int = 1,
+                  include_content: bool = True) -> pd.DataFrame:
     """
     Get all templates from a curator.
 
@@ -158,6 +185,19 @@ def get_templates(self, title: Optional[str] = None,
     useronly : bool, optional
         If True, only a user's templates are returned. If False (default),
         then all global templates are returned.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
+    max_workers : int, optional
+        The maximum number of templates to fetch at the same time.  The
+        default value of 1 fetches the templates one after another.  The
+        templates are returned in the same order regardless of this value.
+    include_content : bool, optional
+        If True (default), the XSD contents of the templates are included in
+        the results.  Setting this to False drops the contents, which can save
+        a lot of memory when only the template ids, titles and hashes are
+        needed.
 
     Returns
     -------
@@ -166,43 +206,48 @@ def get_templates(self, title: Optional[str] = None,
     """
 
     # Get template managers
-    template_managers = self.get_template_managers(title=title,
-                                                   is_disabled=is_disabled,
-                                                   useronly=useronly)      
+    with profile_stage(self, 'template_managers'):
+        template_managers = self.get_template_managers(title=title,
+                                                       is_disabled=is_disabled,
+                                                       useronly=useronly,
+                                                       use_cache=use_cache)
     if len(template_managers) > 0:
-        # Get all current templates
+        # List ids and titles of all current templates
         if current is True:
-            templates = []
-            for current_id in template_managers.current:
+            template_ids = template_managers.current.tolist()
+            titles = template_managers.title.tolist()
 
-                # Set url and get response
-                rest_url = f'/rest/template/{current_id}/'
-                response = self.get(rest_url)
-                templates.append(response.json())
-            templates = pd.DataFrame(templates)
-
-            # Add title to content
-            templates['title'] = template_managers.title
-
-        # Get all templates
+        # List ids and titles of all templates
         elif current is False:
-            templates = []
+            template_ids = []
+            titles = []
             for template_manager in template_managers.itertuples():
                 for version_id in template_manager.versions:
+                    template_ids.append(version_id)
+                    titles.append(template_manager.title)
 
-                    # Set url and get response
-                    rest_url = f'/rest/template/{version_id}/'
-                    response = self.get(rest_url)
-
-                    # Add title to content
-                    content = response.json()
-                    content['title'] = template_manager.title
-                    templates.append(content)
+        else:
+            raise TypeError('current must be bool')
 
+        # Fetch the templates in order
+        def fetch(template_id):
+            with profile_stage(self, 'template'):
+                content = get_template_content(self, template_id,
+                                               use_cache=use_cache)
+            if not include_content:
+                content.pop('content', None)
+            return content
+        if max_workers > 1 and len(template_ids) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                templates = list(executor.map(profile_bind(self, fetch), template_ids))
+        else:
+            templates = [fetch(template_id) for template_id in template_ids]
+        with profile_stage(self, 'dataframe'):
             templates = pd.DataFrame(templates)
 
-        else:
-            raise TypeError('current must be bool')
+        # Add title to content
+        templates['title'] = titles
+
     else:
         templates = pd.DataFrame(columns=template_keys)
             
@@ -211,7 +256,8 @@ def get_templates(self, title: Optional[str] = None,
 def get_template(self, title: Optional[str] = None,
                  is_disabled: bool = False,
                  current: bool = True,
-                 useronly: bool = False) -> pd.Series:
+                 useronly: bool = False,
+                 use_cache: bool = True) -> pd.Series:
     """
     Gets a single template from a curator.
 
@@ -227,6 +273,10 @@ def get_template(self, title: Optional[str] = None,
     useronly : bool, optional
         If True, only a user's templates are returned. If False (default), then
         all global templates are returned.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.  Setting this
+        to False will always fetch the information from the database.
 
     Returns
     -------
@@ -241,7 +291,8 @@ def get_template(self, title: Optional[str] = None,
 
     # Get templates 
     templates = self.get_templates(title=title, is_disabled=is_disabled,
-                                    current=current, useronly=useronly)
+                                    current=current, useronly=useronly,
+                                    use_cache=use_cache)
 
     # Check that number of templates is exactly one.
     if len(templates) == 1:
@@ -251,6 +302,48 @@ def get_template(self, title: Optional[str] = None,
     else:
         raise ValueError('Multiple matching templates found')
 
+def get_template_content(self, template_id: Union[int, str],
+                         use_cache: bool = True) -> dict:
+    """
+    Gets the information for a single template version by its id.
+
+    Parameters
+    ----------
+    template_id : int or str
+        The database id of the template version.
+    use_cache : bool, optional
+        If True (default), cached template information will be used if the
+        template cache is enabled and the information is cached.
+
+    Returns
+    -------
+    dict
+        The template information as returned by the database.
+    """
+    key = ('template', template_id)
+    if use_cache:
+        content = self.template_cache.get(key)
+        if content is not None:
+            return dict(content)
+
+    # Set url and get response
+    rest_url = f'/rest/template/{template_id}/'
+    response = self.get(rest_url)
+    content = response.json()
+
+    self.template_cache.set(key, dict(content))
+
+    return content
+
+def clear_template_cache(self):
+    """
+    Removes all cached template information so that it will be fetched from
+    the database the next time it is needed.  This is done automatically when
+    templates are changed using this object, but may be needed if templates
+    are changed by other users.
+    """
+    self.template_cache.clear()
+
 @property
 def template_titles(self) -> list:
     """list: All template titles"""
@@ -354,6 +447,7 @@ def upload_template(self,
 
     # Send request
     response = self.post(rest_url, data=data)
+    self.clear_template_cache()
     
     if verbose and response.status_code == 201:
         template_id = response.json()['id']
@@ -475,6 +569,7 @@ def update_template(self,
 
     # Send request
     response = self.post(rest_url, data=data)
+    self.clear_template_cache()
     
     template_id = response.json()['id']
     if verbose and response.status_code == 201:
@@ -564,6 +659,7 @@ def disable_template(self,
             raise ValueError('template version already disabled')
 
     self.patch(f'/rest/template/version/{template_id}/disable/')
+    self.clear_template_cache()
     
     if verbose:
         print(f'template with id {template_id} disabled')
@@ -630,6 +726,7 @@ def restore_template(self,
             raise ValueError('template version already active')
 
     self.patch(f'/rest/template/version/{template_id}/restore/')
+    self.clear_template_cache()
 
     if verbose:
         print(f'template with id {template_id} restored')
@@ -699,23 +796,26 @@ def set_current_template(self,
             raise ValueError('template version is disabled')
 
     self.patch(f'/rest/template/version/{template_id}/current/')
+    self.clear_template_cache()
 
     if verbose:
         print(f'template with id {template_id} set as current version')
 
 def templates_dataframe(self,
                         template: Union[list, str, pd.Series, pd.DataFrame, None] = None,
-                        current: bool = True) -> pd.DataFrame:
+                        current: bool = True,
+                        use_cache: bool = True) -> pd.DataFrame:
     """
     Handles interpreting the different template representations and converting
     them all into a pandas DataFrame.
     """
     # Build templates DataFrame from template parameter based on data type
     if template is None:
-        templates = self.get_templates(current=current)
+        templates = self.get_templates(current=current, use_cache=use_cache)
 
     elif isinstance(template, str):
-        templates = self.get_templates(title=template, current=current)
+        templates = self.get_templates(title=template, current=current,
+                                       use_cache=use_cache)
 
     elif isinstance(template, pd.Series):
         templates = pd.DataFrame([template])
@@ -725,7 +825,8 @@ def templates_dataframe(self,
         for t in template:
             # Check list item type and fetch template as needed
             if isinstance(t, str):
-                matches = self.get_templates(title=t, current=current)
+                matches = self.get_templates(title=t, current=current,
+                                             use_cache=use_cache)
                 for index in matches.index:
                     ts.append(matches.loc[index])
             elif isinstance(t, pd.Series):
@@ -1,8 +1,15 @@
+from __future__ import annotations
+
 # Standard library imports
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Union
+
+# Local imports
+from ..lazy_import import lazy_import
+from .. import aslist
 
-# https://pandas.pydata.org/
-import pandas as pd
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 def get_workspaces(self, title:Optional[str]=None) -> pd.DataFrame:
     """
@@ -61,4 +68,92 @@ def get_workspace(self, title:Optional[str]=None) -> pd.Series:
 @property
 def global_workspace(self) -> pd.Series:
     """pandas.Series: The global public workspace"""
-    return self.get_workspace(title='Global Public Workspace')
\ No newline at end of file
+    return self.get_workspace(title='Global Public Workspace')
+
+def assign_to_workspace(self,
+                        kind: str,
+                        ids: Union[str, int, list],
+                        workspace_id: Union[str, int],
+                        max_workers: int = 1,
+                        progress_bar: bool = False,
+                        raise_errors: bool = True,
+                        verbose: bool = False) -> pd.DataFrame:
+    """
+    Assigns records or blobs to a workspace by id.  Every id is tried even if
+    some of the assignments fail.
+
+    Parameters
+    ----------
+    kind : str
+        The type of entries being assigned: 'data' for records or 'blob' for
+        blobs.
+    ids : str, int or list
+        The ID(s) of the entries to assign to the workspace.
+    workspace_id : str or int
+        The id of the workspace to assign the entries to.
+    max_workers : int, optional
+        The maximum number of assignment calls to make at the same time.  The
+        default value of 1 assigns the entries one after another.
+    progress_bar : bool, optional
+        If True a progress bar will be displayed.  Default value is False.
+    raise_errors : bool, optional
+        If True (default), the first error encountered will be raised after
+        all assignments have been tried.  If False, errors are only reported
+        in the returned results.
+    verbose : bool, optional
+        Setting this to True will print extra status messages.  Default value
+        is False.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results for each id with fields id, status and error.  status is
+        either 'assigned' or 'failed', and error gives the reason for any
+        failures.
+    """
+    label = {'data': 'record', 'blob': 'blob'}[kind]
+    ids = aslist(ids)
+    errors = [None for i in range(len(ids))]
+
+    def assign(entry_id):
+        """Assigns one entry to the workspace"""
+        rest_url = f'/rest/{kind}/{entry_id}/assign/{workspace_id}'
+        response = self.patch(rest_url)
+
+        if verbose and response.status_code == 200:
+            print(f'{label} {entry_id} assigned to workspace {workspace_id}')
+
+    if progress_bar:
+        from tqdm import tqdm
+        pbar = tqdm(total=len(ids))
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(assign, entry_id): i
+                       for i, entry_id in enumerate(ids)}
+            for future in as_completed(futures):
+                errors[futures[future]] = future.exception()
+                if progress_bar:
+                    pbar.update(1)
+    else:
+        for i, entry_id in enumerate(ids):
+            try:
+                assign(entry_id)
+            except Exception as err:
+                errors[i] = err
+            if progress_bar:
+                pbar.update(1)
+
+    if progress_bar:
+        pbar.close()
+
+    if raise_errors:
+        for err in errors:
+            if err is not None:
+                raise err
+
+    return pd.DataFrame({
+        'id': ids,
+        'status': ['assigned' if err is None else 'failed' for err in errors],
+        'error': [None if err is None else str(err) for err in errors],
+    })
@@ -0,0 +1,138 @@
+# Standard library imports
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Any, AsyncGenerator, Tuple
+
+# Local imports
+from .ExecutorRestClient import ExecutorRestClient
+from .CDCS import CDCS
+
+class ExecutorCDCS(ExecutorRestClient):
+    """
+    asyncio interface to a CDCS database that runs the CDCS methods in a
+    thread pool.  Each CDCS method is mirrored by a coroutine that runs the
+    CDCS method in one of the max_concurrency worker threads, so the REST
+    calls and the DataFrame results are identical to those of the CDCS class.
+    Note that a method making several REST calls, such as query() for many
+    pages, holds its worker thread until it returns.  Generator methods are
+    mirrored by async generators, and the global_workspace and
+    template_titles properties by coroutines.
+    """
+    client_class = CDCS
+
+    @property
+    def cdcsversion(self) -> Tuple:
+        """Set CDCS version for 2.X.X, or core version bumped by 1 major version for 3.X.X"""
+        return self.client.cdcsversion
+
+    @property
+    def template_cache(self):
+        """cdcs.TTLCache: The cache used for template information"""
+        return self.client.template_cache
+
+    @property
+    def blob_cache(self):
+        """cdcs.BlobCache or None: The on-disk cache used for blob contents"""
+        return self.client.blob_cache
+
+    @property
+    def record_cache(self):
+        """cdcs.RecordCache or None: The local store used for synced records"""
+        return self.client.record_cache
+
+    @property
+    def profiler(self):
+        """cdcs.Profiler or None: The profiler timing the stages of high-level calls"""
+        return self.client.profiler
+
+    @property
+    def title_index(self) -> dict:
+        """dict: The record titles indexed by index_record_titles() for each template id"""
+        return self.client.title_index
+
+    async def get_auto_set_pid(self) -> bool:
+        """Gets the CDCS.auto_set_pid setting of the database."""
+        return await self.run(getattr, self.client, 'auto_set_pid')
+
+    async def set_auto_set_pid(self, value: bool):
+        """Changes the CDCS.auto_set_pid setting of the database."""
+        await self.run(setattr, self.client, 'auto_set_pid', value)
+
+    @asynccontextmanager
+    async def auto_set_pid_off(self, work: bool = True):
+        """
+        Async context manager equivalent of CDCS.auto_set_pid_off().
+        """
+        context = self.client.auto_set_pid_off(work)
+        await self.run(context.__enter__)
+        try:
+            yield
+        except BaseException as err:
+            if not await self.run(context.__exit__, type(err), err, err.__traceback__):
+                raise
+        else:
+            await self.run(context.__exit__, None, None, None)
+
+def mirror(name: str):
+    """Builds a coroutine method that calls a CDCS method in a worker thread"""
+    method = getattr(CDCS, name)
+
+    @wraps(method)
+    async def coroutine(self, *args, **kwargs) -> Any:
+        return await self.run(getattr(self.client, name), *args, **kwargs)
+    coroutine.__qualname__ = f'ExecutorCDCS.{name}'
+    return coroutine
+
+def mirror_property(name: str):
+    """Builds a coroutine method that reads a CDCS property in a worker thread"""
+    prop = getattr(CDCS, name)
+
+    async def coroutine(self) -> Any:
+        return await self.run(getattr, self.client, name)
+    coroutine.__name__ = name
+    coroutine.__qualname__ = f'ExecutorCDCS.{name}'
+    coroutine.__doc__ = prop.__doc__
+    return coroutine
+
+def mirror_generator(name: str):
+    """Builds an async generator method that advances a CDCS generator in worker threads"""
+    method = getattr(CDCS, name)
+
+    @wraps(method)
+    async def generator(self, *args, **kwargs) -> AsyncGenerator[Any, None]:
+        async for value in self.iterate(getattr(self.client, name), *args, **kwargs):
+            yield value
+    generator.__qualname__ = f'ExecutorCDCS.{name}'
+    return generator
+
+# CDCS methods mirrored as coroutines
+mirrored_methods = [
+    'testcall', 'get_workspaces', 'get_workspace',
+    'get_template_managers', 'disable_template_manager',
+    'restore_template_manager', 'get_templates', 'get_template',
+    'upload_template', 'update_template', 'disable_template',
+    'restore_template', 'set_current_template', 'templates_dataframe',
+    'query', 'query_count', 'sync_records',
+    'get_records', 'get_record', 'upload_record', 'upload_records',
+    'index_record_titles', 'assign_records', 'update_record', 'delete_record',
+    'transform_record',
+    'get_blobs', 'get_blob', 'upload_blob', 'upload_blobs', 'delete_blob',
+    'assign_blobs', 'get_blob_contents', 'download_blob', 'download_blobs',
+    'get_pid_paths', 'get_pid_path', 'upload_pid_path', 'update_pid_path',
+    'delete_pid_path', 'get_pid_xpaths', 'get_pid_xpath', 'upload_pid_xpath',
+    'update_pid_xpath', 'delete_pid_xpath',
+    'get_xslts', 'get_xslt', 'upload_xslt', 'update_xslt', 'delete_xslt',
+]
+
+# CDCS properties that make REST calls, mirrored as coroutines
+mirrored_properties = ['global_workspace', 'template_titles']
+
+# CDCS generator methods mirrored as async generators
+mirrored_generators = ['iter_query', 'iter_records', 'iter_blob_contents']
+
+for name in mirrored_methods:
+    setattr(ExecutorCDCS, name, mirror(name))
+for name in mirrored_properties:
+    setattr(ExecutorCDCS, name, mirror_property(name))
+for name in mirrored_generators:
+    setattr(ExecutorCDCS, name, mirror_generator(name))
@@ -0,0 +1,209 @@
+# Standard library imports
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncGenerator, Callable, Optional
+
+# http://docs.python-requests.org
+import requests
+
+# Local imports
+from .lazy_import import lazy_import
+from .RestClient import RestClient
+
+# asyncio is imported on first use
+asyncio = lazy_import('asyncio')
+
+class ExecutorRestClient(object):
+    """
+    asyncio interface to a RestClient that runs the blocking calls in a
+    thread pool.  This is an executor wrapper, not an asynchronous HTTP
+    client: every call in progress occupies one worker thread, of which
+    there are max_concurrency, while the wrapped client's pooled session
+    sends the request.  An asyncio.Semaphore limits the number of calls in
+    progress so that extra calls wait on the event loop rather than in the
+    executor queue.  Using the synchronous client underneath keeps the
+    request building and response handling identical to RestClient.  See
+    AsyncRestClient for a client that sends the calls asynchronously.
+    """
+    client_class = RestClient
+
+    def __init__(self, *args,
+                 client: Optional[RestClient] = None,
+                 max_concurrency: int = 10,
+                 **kwargs):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        *args : any, optional
+            Positional arguments for initializing a new client of
+            client_class.  Cannot be given with client.
+        client : RestClient, optional
+            An existing client to use.  If not given, a new client is created
+            using the other arguments.
+        max_concurrency : int, optional
+            The maximum number of calls in progress at the same time, which
+            is also the number of worker threads.  New clients are also given
+            a connection pool of this size unless pool_maxsize is given.
+            Default value is 10.
+        **kwargs : any, optional
+            Keyword arguments for initializing a new client of client_class.
+            Cannot be given with client.
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+
+        if client is None:
+            kwargs.setdefault('pool_maxsize', max_concurrency)
+            client = self.client_class(*args, **kwargs)
+        elif len(args) > 0 or len(kwargs) > 0:
+            raise TypeError('client cannot be given with client arguments')
+        elif not isinstance(client, self.client_class):
+            raise TypeError(f'client must be a {self.client_class.__name__}')
+
+        self.__client = client
+        self.__max_concurrency = max_concurrency
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.__semaphore = None
+        self.__loop = None
+
+    def __str__(self) -> str:
+        return f'Executor{self.client}'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    @property
+    def client(self) -> RestClient:
+        """RestClient: The client used to send the calls."""
+        return self.__client
+
+    @property
+    def max_concurrency(self) -> int:
+        """int: The maximum number of calls in progress at the same time."""
+        return self.__max_concurrency
+
+    @property
+    def host(self) -> str:
+        """str: The host url for the server."""
+        return self.client.host
+
+    @property
+    def username(self) -> str:
+        """str: The username to use for the server."""
+        return self.client.username
+
+    async def aclose(self):
+        """Waits for calls in progress and closes all pooled connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self.__executor.shutdown, wait=True))
+        self.client.close()
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Calls a blocking function in a worker thread once the number of calls
+        in progress is below max_concurrency.
+
+        Parameters
+        ----------
+        func : callable
+            The function to call.
+        *args : any, optional
+            Positional arguments to call func with.
+        **kwargs : any, optional
+            Keyword arguments to call func with.
+
+        Returns
+        -------
+        any
+            The value returned by func.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Semaphores belong to the event loop they are first used in
+        if self.__semaphore is None or self.__loop is not loop:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.__loop = loop
+
+        async with self.__semaphore:
+            return await loop.run_in_executor(self.__executor,
+                                              partial(func, *args, **kwargs))
+
+    async def iterate(self, func: Callable, *args, **kwargs) -> AsyncGenerator[Any, None]:
+        """
+        Iterates over a blocking generator, advancing it in worker threads.
+
+        Parameters
+        ----------
+        func : callable
+            The generator function to call.
+        *args : any, optional
+            Positional arguments to call func with.
+        **kwargs : any, optional
+            Keyword arguments to call func with.
+
+        Yields
+        ------
+        any
+            The values yielded by the generator.
+        """
+        iterator = func(*args, **kwargs)
+        done = object()
+        try:
+            while True:
+                value = await self.run(next, iterator, done)
+                if value is done:
+                    break
+                yield value
+        finally:
+            await self.run(iterator.close)
+
+    async def request(self, method: str,
+                      rest_url: str,
+                      checkstatus: bool = True,
+                      **kwargs) -> requests.Response:
+        """
+        Sends a REST call.  See RestClient.request() for parameter
+        descriptions.
+
+        Returns
+        -------
+        requests.Response
+            The response object.
+        """
+        return await self.run(self.client.request, method, rest_url,
+                              checkstatus=checkstatus, **kwargs)
+
+    async def head(self, rest_url: str, checkstatus: bool = True,
+                   **kwargs) -> requests.Response:
+        """Sends a HEAD REST call.  See RestClient.head()."""
+        return await self.request('head', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def get(self, rest_url: str, checkstatus: bool = True,
+                  **kwargs) -> requests.Response:
+        """Sends a GET REST call.  See RestClient.get()."""
+        return await self.request('get', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def post(self, rest_url: str, checkstatus: bool = True,
+                   **kwargs) -> requests.Response:
+        """Sends a POST REST call.  See RestClient.post()."""
+        return await self.request('post', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def put(self, rest_url: str, checkstatus: bool = True,
+                  **kwargs) -> requests.Response:
+        """Sends a PUT REST call.  See RestClient.put()."""
+        return await self.request('put', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def patch(self, rest_url: str, checkstatus: bool = True,
+                    **kwargs) -> requests.Response:
+        """Sends a PATCH REST call.  See RestClient.patch()."""
+        return await self.request('patch', rest_url, checkstatus=checkstatus, **kwargs)
+
+    async def delete(self, rest_url: str, checkstatus: bool = True,
+                     **kwargs) -> requests.Response:
+        """Sends a DELETE REST call.  See RestClient.delete()."""
+        return await self.request('delete', rest_url, checkstatus=checkstatus, **kwargs)
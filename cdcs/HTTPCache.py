@@ -0,0 +1,351 @@
+# Standard library imports
+from email.utils import parsedate_to_datetime
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Optional, Union
+from urllib.parse import urlsplit
+
+# http://docs.python-requests.org
+import requests
+from requests.structures import CaseInsensitiveDict
+
+class HTTPCache(object):
+    """
+    Cache of GET responses that follows the HTTP caching headers.  Fresh
+    responses are reused without contacting the server, stale responses with
+    an ETag or Last-Modified header are revalidated with conditional requests,
+    and entries are invalidated when a mutating request is sent to the same
+    resource.  The cache is kept in memory or in an SQLite file.
+    """
+    def __init__(self,
+                 path: Union[str, Path, None] = None,
+                 default_ttl: float = 0,
+                 ttls: Optional[dict] = None,
+                 max_entries: Optional[int] = None,
+                 readonly_paths: tuple = ('/query/',),
+                 related: Optional[dict] = None):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        path : str or Path, optional
+            The SQLite file to store the cache in.  If not given (default), the
+            cache is kept in memory.
+        default_ttl : float, optional
+            The number of seconds that responses without Cache-Control or
+            Expires headers are considered fresh.  Default value of 0 always
+            revalidates such responses, and does not store them at all if they
+            have no ETag or Last-Modified header.
+        ttls : dict, optional
+            Per-endpoint freshness overrides, mapping URL path prefixes, e.g.
+            '/rest/workspace/', to the number of seconds that responses are
+            fresh.  The longest matching prefix is used, and overrides take
+            precedence over the response headers except for no-store.
+        max_entries : int, optional
+            The maximum number of responses to store.  The oldest entries are
+            removed first.  If None (default), the number is not limited.
+        readonly_paths : tuple, optional
+            URL path fragments of endpoints that use mutating methods to
+            perform searches, and therefore do not invalidate any entries.
+            Default value is ('/query/',).
+        related : dict, optional
+            Maps resource paths to other resource paths whose entries are also
+            invalidated by mutating requests.  Default value relates
+            '/rest/template/' and '/rest/template-version-manager/' as
+            uploading or changing templates changes both.
+        """
+        if related is None:
+            related = {
+                '/rest/template/': ['/rest/template-version-manager/'],
+                '/rest/template-version-manager/': ['/rest/template/'],
+            }
+        self.related = dict(related)
+        self.default_ttl = default_ttl
+        self.ttls = {} if ttls is None else dict(ttls)
+        self.max_entries = max_entries
+        self.readonly_paths = tuple(readonly_paths)
+
+        self.__path = None if path is None else Path(path)
+        self.__lock = threading.Lock()
+        if self.path is None:
+            self.__db = sqlite3.connect(':memory:', check_same_thread=False,
+                                        isolation_level=None)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.__db = sqlite3.connect(self.path, check_same_thread=False,
+                                        isolation_level=None, timeout=60)
+            self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                          'key TEXT PRIMARY KEY, path TEXT NOT NULL, '
+                          'url TEXT, status INTEGER, headers TEXT, '
+                          'content BLOB, stored REAL, expires REAL)')
+        self.__db.execute('CREATE INDEX IF NOT EXISTS responses_path '
+                          'ON responses (path)')
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Path or None: The SQLite file the cache is stored in, if any."""
+        return self.__path
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        """Closes the connection to the cache database."""
+        with self.__lock:
+            self.__db.close()
+
+    def ttl(self, path: str, headers: dict) -> Optional[float]:
+        """
+        Determines how long a response remains fresh.
+
+        Parameters
+        ----------
+        path : str
+            The URL path of the request.
+        headers : dict
+            The response headers.
+
+        Returns
+        -------
+        float or None
+            The number of seconds the response is fresh, or None if the
+            response must not be stored.
+        """
+        headers = CaseInsensitiveDict(headers)
+        directives = parse_cache_control(headers.get('Cache-Control', ''))
+        if 'no-store' in directives:
+            return None
+
+        # Per-endpoint overrides
+        prefixes = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        if len(prefixes) > 0:
+            return self.ttls[max(prefixes, key=len)]
+
+        if 'no-cache' in directives:
+            return 0
+        if 'max-age' in directives:
+            try:
+                return max(0, int(directives['max-age']))
+            except ValueError:
+                return 0
+        if 'Expires' in headers:
+            try:
+                expires = parsedate_to_datetime(headers['Expires']).timestamp()
+            except (TypeError, ValueError):
+                return 0
+            return max(0, expires - time.time())
+        return self.default_ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Retrieves a stored response entry.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the request.
+
+        Returns
+        -------
+        dict or None
+            The entry with fields url, status, headers, content, fresh and
+            validators, or None if no response is stored.
+        """
+        with self.__lock:
+            row = self.__db.execute('SELECT url, status, headers, content, expires '
+                                    'FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        url, status, headers, content, expires = row
+        headers = CaseInsensitiveDict(json.loads(headers))
+
+        validators = {}
+        if 'ETag' in headers:
+            validators['If-None-Match'] = headers['ETag']
+        if 'Last-Modified' in headers:
+            validators['If-Modified-Since'] = headers['Last-Modified']
+
+        return {'url': url, 'status': status, 'headers': headers,
+                'content': content, 'fresh': time.time() < expires,
+                'validators': validators}
+
+    def set(self, key: str, response: requests.Response):
+        """
+        Stores a response if its headers allow it.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the request.
+        response : requests.Response
+            The response to store.
+        """
+        path = urlsplit(response.url).path
+        ttl = self.ttl(path, response.headers)
+        if ttl is None:
+            return
+        if (ttl <= 0 and 'ETag' not in response.headers
+            and 'Last-Modified' not in response.headers):
+            return
+
+        now = time.time()
+        with self.__lock:
+            self.__db.execute('INSERT OR REPLACE INTO responses '
+                              '(key, path, url, status, headers, content, stored, expires) '
+                              'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                              (key, path, response.url, response.status_code,
+                               json.dumps(dict(response.headers)), response.content,
+                               now, now + ttl))
+
+            # Remove oldest entries
+            if self.max_entries is not None:
+                self.__db.execute('DELETE FROM responses WHERE key NOT IN '
+                                  '(SELECT key FROM responses ORDER BY stored DESC '
+                                  'LIMIT ?)', (self.max_entries,))
+
+    def refresh(self, key: str, response: requests.Response) -> Optional[requests.Response]:
+        """
+        Updates a stored entry after the server confirmed it is unchanged with
+        a 304 Not Modified response.
+
+        Parameters
+        ----------
+        key : str
+            The cache key of the request.
+        response : requests.Response
+            The 304 response.
+
+        Returns
+        -------
+        requests.Response or None
+            The stored response, or None if it is no longer stored.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        # Update stored headers with those sent with the 304
+        headers = entry['headers']
+        for name in ['Cache-Control', 'Expires', 'ETag', 'Last-Modified', 'Date']:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        path = urlsplit(entry['url']).path
+        ttl = self.ttl(path, headers)
+
+        with self.__lock:
+            if ttl is None:
+                self.__db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            else:
+                now = time.time()
+                self.__db.execute('UPDATE responses SET headers = ?, stored = ?, '
+                                  'expires = ? WHERE key = ?',
+                                  (json.dumps(dict(headers)), now, now + ttl, key))
+
+        entry['headers'] = headers
+        return build_response(entry)
+
+    def invalidate(self, url: str):
+        """
+        Removes the entries affected by a mutating request.  All entries for
+        the same REST resource, i.e. with the same path up to the first
+        segment after 'rest', and for any related resources are removed.
+
+        Parameters
+        ----------
+        url : str
+            The URL or URL path of the mutating request.
+        """
+        path = urlsplit(url).path
+        for fragment in self.readonly_paths:
+            if fragment in path:
+                return
+        prefix = resource_path(path)
+        prefixes = [prefix] + list(self.related.get(prefix, []))
+        with self.__lock:
+            for prefix in prefixes:
+                self.__db.execute('DELETE FROM responses WHERE substr(path, 1, ?) = ?',
+                                  (len(prefix), prefix))
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self.__lock:
+            self.__db.execute('DELETE FROM responses')
+
+def parse_cache_control(value: str) -> dict:
+    """
+    Parses a Cache-Control header value.
+
+    Parameters
+    ----------
+    value : str
+        The header value.
+
+    Returns
+    -------
+    dict
+        The lowercase directive names and their values, or None for
+        directives without values.
+    """
+    directives = {}
+    for directive in value.split(','):
+        directive = directive.strip()
+        if directive == '':
+            continue
+        name, _, arg = directive.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') if arg else None
+    return directives
+
+def resource_path(path: str) -> str:
+    """
+    Gives the REST resource that a URL path belongs to, i.e. the path up to
+    and including the first segment after 'rest'.  For example, both
+    '/rest/template-version-manager/global/' and
+    '/rest/template-version-manager/3/disable/' belong to
+    '/rest/template-version-manager/'.
+
+    Parameters
+    ----------
+    path : str
+        The URL path.
+
+    Returns
+    -------
+    str
+        The resource path.
+    """
+    segments = path.split('/')
+    if 'rest' in segments:
+        end = segments.index('rest') + 2
+        if end < len(segments):
+            return '/'.join(segments[:end]) + '/'
+    return path
+
+def build_response(entry: dict) -> requests.Response:
+    """
+    Builds a response object from a cache entry.
+
+    Parameters
+    ----------
+    entry : dict
+        The entry as returned by HTTPCache.get().
+
+    Returns
+    -------
+    requests.Response
+        The response, with an added from_cache attribute set to True.
+    """
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['content']
+    response.url = entry['url']
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.reason = 'OK'
+    response.from_cache = True
+    return response
@@ -0,0 +1,279 @@
+# Standard library imports
+from bisect import bisect_left
+from functools import lru_cache
+import re
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+class MetricsRegistry(object):
+    """
+    Collects counters and histograms of REST calls for each request method
+    and normalized route, i.e. the URL path with ids replaced by '{id}'.  The
+    registry receives the post_response and retry events of one or more
+    RestClients and can be exported as a dict or in the Prometheus text
+    format.
+    """
+    default_latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                               1, 2.5, 5, 10, 30, 60)
+    default_size_buckets = tuple(4 ** i for i in range(4, 15))
+
+    def __init__(self,
+                 latency_buckets: Optional[tuple] = None,
+                 size_buckets: Optional[tuple] = None):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        latency_buckets : tuple, optional
+            The upper bounds in seconds of the latency histogram buckets.
+            Default value ranges from 5 ms to 60 s.
+        size_buckets : tuple, optional
+            The upper bounds in bytes of the request and response size
+            histogram buckets.  Default value ranges from 256 B to 256 MiB in
+            powers of 4.
+        """
+        if latency_buckets is None:
+            latency_buckets = self.default_latency_buckets
+        if size_buckets is None:
+            size_buckets = self.default_size_buckets
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self.size_buckets = tuple(sorted(size_buckets))
+
+        self.__lock = threading.Lock()
+        self.__series = {}
+
+    def __series_for(self, method: str, url: str) -> dict:
+        """Gets or creates the series for a method and url.  Call with lock held"""
+        key = (method.upper(), normalize_route(url))
+        series = self.__series.get(key, None)
+        if series is None:
+            series = self.__series[key] = {
+                'calls': 0, 'errors': 0, 'statuses': {}, 'retries': {},
+                'latency': _Histogram(self.latency_buckets),
+                'request_bytes': _Histogram(self.size_buckets),
+                'response_bytes': _Histogram(self.size_buckets)}
+        return series
+
+    def post_response(self, event: dict):
+        """
+        Records a sent call.  Used as a RestClient post_response hook.
+
+        Parameters
+        ----------
+        event : dict
+            The event, with the method, url, response, error, latency and
+            stream fields.
+        """
+        response = event['response']
+        error = event['error']
+        if response is not None:
+            status = str(response.status_code)
+            failed = response.status_code >= 400
+            request_bytes = body_size(response.request)
+            if event.get('stream', False):
+                response_bytes = response.headers.get('Content-Length', None)
+                response_bytes = int(response_bytes) if response_bytes is not None else None
+            else:
+                response_bytes = len(response.content)
+        else:
+            status = type(error).__name__
+            failed = True
+            request_bytes = response_bytes = None
+
+        with self.__lock:
+            series = self.__series_for(event['method'], event['url'])
+            series['calls'] += 1
+            series['statuses'][status] = series['statuses'].get(status, 0) + 1
+            if failed:
+                series['errors'] += 1
+            series['latency'].observe(event['latency'])
+            if request_bytes is not None:
+                series['request_bytes'].observe(request_bytes)
+            if response_bytes is not None:
+                series['response_bytes'].observe(response_bytes)
+
+    def retry(self, event: dict):
+        """
+        Records a retried call.  Used as a RestClient retry hook.
+
+        Parameters
+        ----------
+        event : dict
+            The event, with the method, url, response and error fields.
+        """
+        if event['response'] is not None:
+            reason = str(event['response'].status_code)
+        else:
+            reason = type(event['error']).__name__
+
+        with self.__lock:
+            series = self.__series_for(event['method'], event['url'])
+            series['retries'][reason] = series['retries'].get(reason, 0) + 1
+
+    def reset(self):
+        """Removes all recorded values."""
+        with self.__lock:
+            self.__series = {}
+
+    def to_dict(self) -> dict:
+        """
+        Exports the recorded values.
+
+        Returns
+        -------
+        dict
+            Maps 'METHOD route' to dicts of the calls, errors and error_rate,
+            the statuses and retries counted by status code or exception name,
+            and the latency, request_bytes and response_bytes histograms.
+            Each histogram gives its count, sum, and cumulative counts of the
+            bucket upper bounds.
+        """
+        metrics = {}
+        with self.__lock:
+            for (method, route), series in sorted(self.__series.items()):
+                metrics[f'{method} {route}'] = {
+                    'method': method,
+                    'route': route,
+                    'calls': series['calls'],
+                    'errors': series['errors'],
+                    'error_rate': series['errors'] / series['calls'] if series['calls'] > 0 else 0.0,
+                    'statuses': dict(series['statuses']),
+                    'retries': dict(series['retries']),
+                    'latency': series['latency'].to_dict(),
+                    'request_bytes': series['request_bytes'].to_dict(),
+                    'response_bytes': series['response_bytes'].to_dict()}
+        return metrics
+
+    def to_prometheus(self, prefix: str = 'cdcs') -> str:
+        """
+        Exports the recorded values in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            The prefix of the metric names.  Default value is 'cdcs'.
+
+        Returns
+        -------
+        str
+            The metrics text.
+        """
+        metrics = self.to_dict()
+        lines = []
+
+        def labels(values: dict, **extra) -> str:
+            values = dict(values, **extra)
+            return ','.join(f'{name}="{escape(str(value))}"' for name, value in values.items())
+
+        lines.append(f'# HELP {prefix}_requests_total REST calls sent.')
+        lines.append(f'# TYPE {prefix}_requests_total counter')
+        for series in metrics.values():
+            base = {'method': series['method'], 'route': series['route']}
+            for status, count in series['statuses'].items():
+                lines.append(f'{prefix}_requests_total{{{labels(base, status=status)}}} {count}')
+
+        lines.append(f'# HELP {prefix}_request_errors_total REST calls that failed or returned an error status.')
+        lines.append(f'# TYPE {prefix}_request_errors_total counter')
+        for series in metrics.values():
+            base = {'method': series['method'], 'route': series['route']}
+            lines.append(f'{prefix}_request_errors_total{{{labels(base)}}} {series["errors"]}')
+
+        lines.append(f'# HELP {prefix}_request_retries_total REST calls retried.')
+        lines.append(f'# TYPE {prefix}_request_retries_total counter')
+        for series in metrics.values():
+            base = {'method': series['method'], 'route': series['route']}
+            for reason, count in series['retries'].items():
+                lines.append(f'{prefix}_request_retries_total{{{labels(base, reason=reason)}}} {count}')
+
+        for name, field, unit in [('request_duration_seconds', 'latency', 'REST call latency in seconds.'),
+                                  ('request_size_bytes', 'request_bytes', 'REST call request body sizes in bytes.'),
+                                  ('response_size_bytes', 'response_bytes', 'REST call response body sizes in bytes.')]:
+            lines.append(f'# HELP {prefix}_{name} {unit}')
+            lines.append(f'# TYPE {prefix}_{name} histogram')
+            for series in metrics.values():
+                base = {'method': series['method'], 'route': series['route']}
+                histogram = series[field]
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f'{prefix}_{name}_bucket{{{labels(base, le=bound)}}} {count}')
+                lines.append(f'{prefix}_{name}_sum{{{labels(base)}}} {histogram["sum"]}')
+                lines.append(f'{prefix}_{name}_count{{{labels(base)}}} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+class _Histogram(object):
+    """Fixed bucket histogram"""
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            buckets[format_bound(bound)] = total
+        buckets['+Inf'] = self.count
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+id_segment_pattern = re.compile(r'^(\d+|[0-9a-fA-F]{24}|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$')
+
+@lru_cache(maxsize=4096)
+def normalize_route(url: str) -> str:
+    """
+    Gives the route template of a REST call by removing the host and query
+    and replacing path segments that are ids with '{id}'.  Integers, 24
+    character hexadecimal ObjectIds and UUIDs are considered ids.
+
+    Parameters
+    ----------
+    url : str
+        The request URL or URL path.
+
+    Returns
+    -------
+    str
+        The route, e.g. '/rest/data/{id}/' for '/rest/data/5f3c2e.../'.
+    """
+    segments = urlsplit(url).path.split('/')
+    return '/'.join('{id}' if id_segment_pattern.match(segment) else segment
+                    for segment in segments)
+
+def body_size(request) -> Optional[int]:
+    """
+    Gives the size of a prepared request's body.
+
+    Parameters
+    ----------
+    request : requests.PreparedRequest or None
+        The sent request.
+
+    Returns
+    -------
+    int or None
+        The number of bytes, or None if unknown.
+    """
+    if request is None or request.body is None:
+        return 0 if request is not None else None
+    if isinstance(request.body, bytes):
+        return len(request.body)
+    if isinstance(request.body, str):
+        return len(request.body.encode('utf-8'))
+    length = request.headers.get('Content-Length', None)
+    return int(length) if length is not None else None
+
+def format_bound(bound: float) -> str:
+    """Formats a histogram bucket bound as a Prometheus le value"""
+    return repr(float(bound))
+
+def escape(value: str) -> str:
+    """Escapes a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+# Standard library imports
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import threading
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+# Local imports
+from .lazy_import import lazy_import
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
+
+class Profiler(object):
+    """
+    Records the time spent in each stage of high-level calls, such as the
+    HTTP wait, JSON decoding and DataFrame construction of CDCS.query(), and
+    optionally the peak memory allocated during each call.  Stages are named
+    by their nesting, e.g. 'build_query.get_templates.http', and the times of
+    nested stages are included in the times of the stages containing them.
+    Stages run in worker threads are summed, so their totals can exceed the
+    elapsed time of the call.
+    """
+    def __init__(self,
+                 callback: Optional[Callable[[dict], None]] = None,
+                 track_memory: bool = False,
+                 max_records: Optional[int] = 1000):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        callback : callable, optional
+            A function that is called with each completed call profile.
+        track_memory : bool, optional
+            If True, the peak memory allocated by Python during each call is
+            measured with tracemalloc.  This slows down calls considerably.
+            Memory allocated by concurrent calls in other threads is included.
+            Default value is False.
+        max_records : int, optional
+            The number of most recent call profiles to keep for summaries.  If
+            None, all profiles are kept.  Default value is 1000.
+        """
+        self.callback = callback
+        self.track_memory = track_memory
+        self.max_records = max_records
+
+        self.__lock = threading.Lock()
+        self.__records = []
+        self.__local = threading.local()
+
+    @property
+    def records(self) -> list:
+        """list: The kept call profiles, oldest first."""
+        with self.__lock:
+            return list(self.__records)
+
+    @property
+    def last(self) -> Optional[dict]:
+        """dict or None: The last call profile completed in the current thread."""
+        return getattr(self.__local, 'last', None)
+
+    def clear(self):
+        """Removes all kept call profiles."""
+        with self.__lock:
+            self.__records = []
+
+    def __state(self) -> tuple:
+        """Gives the current thread's active profile and stage names"""
+        return (getattr(self.__local, 'profile', None),
+                getattr(self.__local, 'names', ()))
+
+    def __set_state(self, profile: Optional[dict], names: tuple):
+        """Sets the current thread's active profile and stage names"""
+        self.__local.profile = profile
+        self.__local.names = names
+
+    @contextmanager
+    def call(self, name: str):
+        """
+        Profiles a high-level call.  If a call is already being profiled in
+        the current thread, this is recorded as a stage of it instead.
+
+        Parameters
+        ----------
+        name : str
+            The name of the call.
+
+        Yields
+        ------
+        dict or None
+            The new call profile, or None if recorded as a stage.
+        """
+        profile, names = self.__state()
+        if profile is not None:
+            with self.stage(name):
+                yield None
+            return
+
+        profile = {'call': name, 'start': time.time(), 'elapsed': None,
+                   'stages': {}, 'counts': {}, 'peak_memory': None,
+                   'error': None}
+
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+
+        self.__set_state(profile, ())
+        start = time.perf_counter()
+        try:
+            yield profile
+        except BaseException as err:
+            profile['error'] = type(err).__name__
+            raise
+        finally:
+            profile['elapsed'] = time.perf_counter() - start
+            self.__set_state(None, ())
+            if self.track_memory:
+                profile['peak_memory'] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            self.__finish(profile)
+
+    def __finish(self, profile: dict):
+        """Stores a completed call profile and sends it to the callback"""
+        self.__local.last = profile
+        with self.__lock:
+            self.__records.append(profile)
+            if self.max_records is not None and len(self.__records) > self.max_records:
+                del self.__records[:len(self.__records) - self.max_records]
+        if self.callback is not None:
+            self.callback(profile)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times a stage of the call being profiled in the current thread.  Does
+        nothing if no call is being profiled.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+        """
+        profile, names = self.__state()
+        if profile is None:
+            yield
+            return
+
+        names = names + (name,)
+        key = '.'.join(names)
+        self.__set_state(profile, names)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.__set_state(profile, names[:-1])
+            with self.__lock:
+                profile['stages'][key] = profile['stages'].get(key, 0) + elapsed
+                profile['counts'][key] = profile['counts'].get(key, 0) + 1
+
+    def bind(self, func: Callable) -> Callable:
+        """
+        Binds a function to the call being profiled in the current thread so
+        that stages it runs in worker threads are recorded for that call.
+
+        Parameters
+        ----------
+        func : callable
+            The function that will be called in another thread.
+
+        Returns
+        -------
+        callable
+            The bound function, or func if no call is being profiled.
+        """
+        profile, names = self.__state()
+        if profile is None:
+            return func
+
+        @wraps(func)
+        def bound(*args, **kwargs):
+            previous = self.__state()
+            self.__set_state(profile, names)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.__set_state(*previous)
+        return bound
+
+    def summary(self, call: Optional[str] = None) -> pd.DataFrame:
+        """
+        Summarizes the kept call profiles.
+
+        Parameters
+        ----------
+        call : str, optional
+            Limits the summary to the calls with this name.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row for the total of each call name followed by rows for each
+            of its stages, with the number of calls and stage runs, the total,
+            mean and maximum seconds per call, the fraction of the call's
+            elapsed time, and the maximum peak_memory for the totals.
+        """
+        records = [record for record in self.records
+                   if call is None or record['call'] == call]
+        columns = ['call', 'stage', 'calls', 'runs', 'total', 'mean', 'max',
+                   'fraction', 'peak_memory']
+        rows = []
+        for name in sorted(set(record['call'] for record in records)):
+            profiles = [record for record in records if record['call'] == name]
+            elapsed = [record['elapsed'] for record in profiles]
+            total = sum(elapsed)
+            memory = [record['peak_memory'] for record in profiles
+                      if record['peak_memory'] is not None]
+            rows.append([name, 'total', len(profiles), len(profiles), total,
+                         total / len(profiles), max(elapsed), 1.0,
+                         max(memory) if len(memory) > 0 else None])
+
+            stages = sorted(set(key for record in profiles for key in record['stages']))
+            for stage in stages:
+                times = [record['stages'].get(stage, 0) for record in profiles]
+                runs = sum(record['counts'].get(stage, 0) for record in profiles)
+                rows.append([name, stage, len(profiles), runs, sum(times),
+                             sum(times) / len(profiles), max(times),
+                             sum(times) / total if total > 0 else 0.0, None])
+
+        return pd.DataFrame(rows, columns=columns)
+
+    def report(self, call: Optional[str] = None) -> str:
+        """
+        Gives a text report of the summary of the kept call profiles.
+
+        Parameters
+        ----------
+        call : str, optional
+            Limits the report to the calls with this name.
+
+        Returns
+        -------
+        str
+            The report.
+        """
+        summary = self.summary(call=call)
+        if len(summary) == 0:
+            return 'No calls profiled'
+        summary = summary.drop(columns='peak_memory')
+        summary['fraction'] = summary['fraction'].map('{:.1%}'.format)
+        for column in ['total', 'mean', 'max']:
+            summary[column] = summary[column].map('{:.4f}'.format)
+        return summary.to_string(index=False)
+
+def profiled(func: Callable) -> Callable:
+    """
+    Decorator that profiles a method as a high-level call named after it when
+    its object has a profiler.
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = getattr(self, 'profiler', None)
+        if profiler is None:
+            return func(self, *args, **kwargs)
+        with profiler.call(func.__name__):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+def profile_stage(client, name: str):
+    """
+    Times a stage of the call being profiled by a client's profiler.
+
+    Parameters
+    ----------
+    client : cdcs.RestClient
+        The client, which may have a profiler attribute.
+    name : str
+        The name of the stage.
+
+    Returns
+    -------
+    context manager
+        The stage timer, or a context manager that does nothing if the client
+        has no profiler.
+    """
+    profiler = getattr(client, 'profiler', None)
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+def profile_bind(client, func: Callable) -> Callable:
+    """
+    Binds a function to the call being profiled by a client's profiler so
+    that it can be run in a worker thread.  See Profiler.bind().
+    """
+    profiler = getattr(client, 'profiler', None)
+    if profiler is None:
+        return func
+    return profiler.bind(func)
@@ -0,0 +1,353 @@
+# Standard library imports
+import math
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+# http://docs.python-requests.org
+import requests
+
+class RateLimiter(object):
+    """
+    Limits the rate of REST calls and the number of calls in progress at the
+    same time.  Separate limits are kept for each host and endpoint class,
+    i.e. 'query', 'write', 'blob' and 'read', and are shared by all threads
+    and clients using the same limiter.  The number of calls in progress can
+    be adapted automatically, shrinking when the server responds slowly or
+    with 429 or 503 statuses and slowly recovering afterwards.
+    """
+    endpoints = ('query', 'write', 'blob', 'read')
+
+    def __init__(self,
+                 rate: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 limits: Optional[dict] = None,
+                 hosts: Optional[dict] = None,
+                 adaptive: bool = True,
+                 slow_latency: Optional[float] = None,
+                 congested_statuses: tuple = (429, 503),
+                 decrease_factor: float = 0.5,
+                 min_in_flight: int = 1,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        rate : float, optional
+            The default number of calls per second allowed for each host and
+            endpoint class.  If None (default), the rate is not limited.
+        burst : int, optional
+            The default number of calls that can be sent at once after being
+            idle, i.e. the token bucket size.  Default value is the rate
+            rounded up, or 1 for rates below one call per second.
+        max_in_flight : int, optional
+            The default maximum number of calls in progress at the same time
+            for each host and endpoint class.  If None (default), the number is
+            only limited by adaptation.
+        limits : dict, optional
+            Per endpoint class settings, mapping 'query', 'write', 'blob' or
+            'read' to dicts with any of the keys 'rate', 'burst' and
+            'max_in_flight'.
+        hosts : dict, optional
+            Per host settings, mapping host URLs to dicts in the same format
+            as limits.  These take precedence over limits.
+        adaptive : bool, optional
+            If True (default), the number of calls allowed in progress is
+            halved when a congested response is received and increased by one
+            after each full round of good responses, up to max_in_flight.
+            Congested responses to calls sent before the last decrease do not
+            decrease it again, so a burst of congested responses only backs
+            off once.
+        slow_latency : float, optional
+            Responses that take longer than this number of seconds count as
+            congested.  If None (default), latency is not considered.
+        congested_statuses : tuple, optional
+            The response status codes that count as congested.  Default value
+            is (429, 503).
+        decrease_factor : float, optional
+            The factor applied to the number of calls allowed in progress for
+            congested responses.  Default value is 0.5.
+        min_in_flight : int, optional
+            The smallest number of calls allowed in progress after adapting.
+            Default value is 1.
+        sleep : callable, optional
+            The function used to wait for rate tokens.  Default value is
+            time.sleep.
+        """
+        if not 0 < decrease_factor < 1:
+            raise ValueError('decrease_factor must be between 0 and 1')
+        if min_in_flight < 1:
+            raise ValueError('min_in_flight must be at least 1')
+
+        self.defaults = {'rate': rate, 'burst': burst, 'max_in_flight': max_in_flight}
+        self.limits = {} if limits is None else dict(limits)
+        self.hosts = {} if hosts is None else {host.strip('/'): dict(value)
+                                               for host, value in hosts.items()}
+        for settings in [self.limits] + list(self.hosts.values()):
+            for endpoint in settings:
+                if endpoint not in self.endpoints:
+                    raise ValueError(f'unknown endpoint class {endpoint}')
+        self.adaptive = adaptive
+        self.slow_latency = slow_latency
+        self.congested_statuses = tuple(congested_statuses)
+        self.decrease_factor = decrease_factor
+        self.min_in_flight = min_in_flight
+        self.sleep = sleep
+
+        self.__lock = threading.Lock()
+        self.__gates = {}
+
+    def settings(self, host: str, endpoint: str) -> dict:
+        """
+        Gives the configured limits for a host and endpoint class.
+
+        Parameters
+        ----------
+        host : str
+            The host URL.
+        endpoint : str
+            The endpoint class.
+
+        Returns
+        -------
+        dict
+            The rate, burst and max_in_flight values.
+        """
+        settings = dict(self.defaults)
+        settings.update(self.limits.get(endpoint, {}))
+        settings.update(self.hosts.get(host.strip('/'), {}).get(endpoint, {}))
+        return settings
+
+    def __gate(self, host: str, endpoint: str) -> '_Gate':
+        """Gets or creates the shared gate for a host and endpoint class"""
+        key = (host.strip('/'), endpoint)
+        with self.__lock:
+            gate = self.__gates.get(key, None)
+            if gate is None:
+                gate = self.__gates[key] = _Gate(**self.settings(*key))
+            return gate
+
+    def state(self, host: str, endpoint: str) -> dict:
+        """
+        Gives the current state of the limits for a host and endpoint class.
+
+        Parameters
+        ----------
+        host : str
+            The host URL.
+        endpoint : str
+            The endpoint class.
+
+        Returns
+        -------
+        dict
+            The configured rate, burst and max_in_flight, the current adapted
+            limit on calls in progress, the number of calls in_flight, and the
+            number of congested responses seen.
+        """
+        gate = self.__gate(host, endpoint)
+        with gate.condition:
+            return {'rate': gate.rate, 'burst': gate.burst,
+                    'max_in_flight': gate.max_in_flight, 'limit': gate.limit,
+                    'in_flight': gate.in_flight, 'congested': gate.congested}
+
+    def acquire(self, host: str, method: str, url: str) -> 'Slot':
+        """
+        Waits until a call can be sent and reserves its place.
+
+        Parameters
+        ----------
+        host : str
+            The host URL.
+        method : str
+            The request method.
+        url : str
+            The request URL or URL path.
+
+        Returns
+        -------
+        Slot
+            The reservation, which must be released once the call is finished.
+        """
+        gate = self.__gate(host, endpoint_class(method, url))
+
+        # Wait for a free place
+        with gate.condition:
+            while gate.limit is not None and gate.in_flight >= gate.limit:
+                gate.condition.wait()
+            gate.in_flight += 1
+            gate.sent += 1
+            ticket = gate.sent
+
+            # Reserve a token and find how long until it is available
+            wait = 0
+            if gate.rate is not None:
+                now = time.monotonic()
+                gate.tokens = min(gate.burst, gate.tokens + (now - gate.updated) * gate.rate)
+                gate.updated = now
+                gate.tokens -= 1
+                if gate.tokens < 0:
+                    wait = -gate.tokens / gate.rate
+
+        if wait > 0:
+            try:
+                self.sleep(wait)
+            except BaseException:
+                gate.release(self, ticket)
+                raise
+
+        return Slot(self, gate, ticket)
+
+    def is_congested(self, status: Optional[int] = None,
+                     latency: Optional[float] = None) -> bool:
+        """
+        Checks if a response indicates that the server is congested.
+
+        Parameters
+        ----------
+        status : int, optional
+            The response status code, if any.
+        latency : float, optional
+            The number of seconds the server took to respond, if known.
+
+        Returns
+        -------
+        bool
+            True if the status is one of congested_statuses or the latency is
+            longer than slow_latency.
+        """
+        if status in self.congested_statuses:
+            return True
+        return (self.slow_latency is not None and latency is not None
+                and latency > self.slow_latency)
+
+class Slot(object):
+    """
+    Reservation of a place for one call returned by RateLimiter.acquire().
+    """
+    def __init__(self, limiter: RateLimiter, gate: '_Gate', ticket: int):
+        self.__limiter = limiter
+        self.__gate = gate
+        self.__ticket = ticket
+        self.__released = False
+        self.__lock = threading.Lock()
+
+    def release(self, status: Optional[int] = None,
+                latency: Optional[float] = None):
+        """
+        Frees the place.  Calling this more than once has no effect.
+
+        Parameters
+        ----------
+        status : int, optional
+            The response status code, if any.
+        latency : float, optional
+            The number of seconds the server took to respond, if known.
+        """
+        with self.__lock:
+            if self.__released:
+                return
+            self.__released = True
+        self.__gate.release(self.__limiter, self.__ticket, status=status,
+                            latency=latency)
+
+    def hold(self, response: requests.Response,
+             latency: Optional[float] = None):
+        """
+        Keeps the place until a streamed response is closed, so that the
+        transfer of the body counts as a call in progress.
+
+        Parameters
+        ----------
+        response : requests.Response
+            The streamed response.
+        latency : float, optional
+            The number of seconds the server took to respond.
+        """
+        close = response.close
+        def release_on_close():
+            try:
+                close()
+            finally:
+                self.release(response.status_code, latency)
+        response.close = release_on_close
+
+class _Gate(object):
+    """Shared state of the limits for one host and endpoint class"""
+    def __init__(self, rate: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 max_in_flight: Optional[int] = None):
+        if burst is None and rate is not None:
+            burst = max(1, math.ceil(rate))
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.max_in_flight = max_in_flight
+        self.limit = max_in_flight
+        self.in_flight = 0
+        self.sent = 0
+        self.decreased_at = 0
+        self.successes = 0
+        self.congested = 0
+        self.condition = threading.Condition()
+
+    def release(self, limiter: RateLimiter,
+                ticket: int,
+                status: Optional[int] = None,
+                latency: Optional[float] = None):
+        """Frees the place of the call with the ticket, i.e. acquire order number, and adapts the limit"""
+        congested = limiter.is_congested(status, latency)
+        with self.condition:
+            if congested:
+                self.congested += 1
+            if limiter.adaptive:
+                if congested:
+                    # Only decrease once for calls sent before the last decrease
+                    if ticket > self.decreased_at:
+                        current = self.limit if self.limit is not None else self.in_flight
+                        self.limit = max(limiter.min_in_flight,
+                                         int(current * limiter.decrease_factor))
+                        self.decreased_at = self.sent
+                    self.successes = 0
+
+                # Increase by one after a full round of good responses
+                elif status is not None and self.limit is not None:
+                    self.successes += 1
+                    if self.successes >= self.limit:
+                        self.successes = 0
+                        if self.max_in_flight is None or self.limit < self.max_in_flight:
+                            self.limit += 1
+
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+def endpoint_class(method: str, url: str) -> str:
+    """
+    Classifies a REST call for rate limiting.
+
+    Parameters
+    ----------
+    method : str
+        The request method.
+    url : str
+        The request URL or URL path.
+
+    Returns
+    -------
+    str
+        'blob' for blob uploads and downloads, 'query' for searches, 'write'
+        for other calls that change the database, and 'read' for everything
+        else.
+    """
+    path = urlsplit(url).path
+    if '/rest/blob/' in path or '/rest/upload-blob-pid' in path:
+        return 'blob'
+    if '/query/' in path:
+        return 'query'
+    if method.upper() not in ['GET', 'HEAD', 'OPTIONS']:
+        return 'write'
+    return 'read'
@@ -0,0 +1,304 @@
+# Standard library imports
+from contextlib import closing, contextmanager
+import json
+from pathlib import Path
+import sqlite3
+import time
+from typing import Iterable, Optional, Union
+
+class RecordCache(object):
+    """
+    On-disk SQLite store of data records that mirrors the records of
+    templates on one or more hosts.  The modification and change dates of the
+    stored records are compared during later syncs so that only new and
+    changed records are rewritten, and the time of the newest change seen is
+    kept for each host and template.
+    """
+    def __init__(self, path: Union[str, Path]):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        path : str or Path
+            The SQLite database file to store the records in.  Will be created
+            if it does not exist.
+        """
+        self.__path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self.__connect()) as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS records ('
+                       'host TEXT NOT NULL, template TEXT NOT NULL, '
+                       'id TEXT NOT NULL, title TEXT, record TEXT NOT NULL, '
+                       'PRIMARY KEY (host, id))')
+            db.execute('CREATE INDEX IF NOT EXISTS records_template '
+                       'ON records (host, template)')
+            db.execute('CREATE TABLE IF NOT EXISTS syncs ('
+                       'host TEXT NOT NULL, template TEXT NOT NULL, '
+                       'since TEXT, synced REAL NOT NULL, '
+                       'PRIMARY KEY (host, template))')
+
+    @property
+    def path(self) -> Path:
+        """Path: The SQLite database file the records are stored in."""
+        return self.__path
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens a new connection to the database"""
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    @contextmanager
+    def __transaction(self):
+        """Opens a connection and holds the write lock until finished"""
+        with closing(self.__connect()) as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            else:
+                db.execute('COMMIT')
+
+    def get_since(self, host: str, template: str) -> Optional[str]:
+        """
+        Gives the time of the newest record change seen for a template.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+
+        Returns
+        -------
+        str or None
+            The ISO 8601 UTC time, or None if the template has never been
+            synced.
+        """
+        with closing(self.__connect()) as db:
+            row = db.execute('SELECT since FROM syncs WHERE host = ? AND template = ?',
+                             (host, str(template))).fetchone()
+        return None if row is None else row[0]
+
+    def set_since(self, host: str, template: str, since: Optional[str]):
+        """
+        Records that a template has been synced.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+        since : str or None
+            The ISO 8601 UTC time of the newest record change seen.
+        """
+        with self.__transaction() as db:
+            db.execute('INSERT OR REPLACE INTO syncs (host, template, since, synced) '
+                       'VALUES (?, ?, ?, ?)', (host, str(template), since, time.time()))
+
+    def is_synced(self, host: str, template: str) -> bool:
+        """
+        Checks if a template has been synced.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+
+        Returns
+        -------
+        bool
+            True if the template has been synced at least once.
+        """
+        with closing(self.__connect()) as db:
+            row = db.execute('SELECT 1 FROM syncs WHERE host = ? AND template = ?',
+                             (host, str(template))).fetchone()
+        return row is not None
+
+    def update(self, host: str, template: str, records: Iterable[dict]) -> int:
+        """
+        Adds new records and replaces existing records with the same ids.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+        records : iterable of dict
+            The records as returned by the REST calls.
+
+        Returns
+        -------
+        int
+            The number of records stored.
+        """
+        rows = [(host, str(template), str(record['id']), record.get('title'),
+                 json.dumps(record)) for record in records]
+        with self.__transaction() as db:
+            db.executemany('INSERT OR REPLACE INTO records '
+                           '(host, template, id, title, record) '
+                           'VALUES (?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def delete(self, host: str, template: str, ids: Iterable[str]) -> int:
+        """
+        Removes records.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+        ids : iterable of str
+            The ids of the records to remove.
+
+        Returns
+        -------
+        int
+            The number of records removed.
+        """
+        rows = [(host, str(template), str(id)) for id in ids]
+        with self.__transaction() as db:
+            before = db.total_changes
+            db.executemany('DELETE FROM records WHERE host = ? AND template = ? '
+                           'AND id = ?', rows)
+            return db.total_changes - before
+
+    def ids(self, host: str, template: str) -> set:
+        """
+        Gives the ids of the stored records for a template.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+
+        Returns
+        -------
+        set of str
+            The record ids.
+        """
+        with closing(self.__connect()) as db:
+            rows = db.execute('SELECT id FROM records WHERE host = ? AND template = ?',
+                              (host, str(template))).fetchall()
+        return set(row[0] for row in rows)
+
+    def dates(self, host: str, template: str) -> dict:
+        """
+        Gives the modification and change dates of the stored records for a
+        template.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+
+        Returns
+        -------
+        dict
+            The (last_modification_date, last_change_date) tuples of the
+            records keyed by record id.
+        """
+        with closing(self.__connect()) as db:
+            rows = db.execute('SELECT id, record FROM records WHERE host = ? '
+                              'AND template = ?', (host, str(template))).fetchall()
+        dates = {}
+        for id, record in rows:
+            record = json.loads(record)
+            dates[id] = (record.get('last_modification_date'),
+                         record.get('last_change_date'))
+        return dates
+
+    def count(self, host: str, template: str) -> int:
+        """
+        Gives the number of stored records for a template.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        template : str
+            The template id.
+
+        Returns
+        -------
+        int
+            The number of records.
+        """
+        with closing(self.__connect()) as db:
+            return db.execute('SELECT COUNT(*) FROM records WHERE host = ? '
+                              'AND template = ?', (host, str(template))).fetchone()[0]
+
+    def get_records(self, host: str,
+                    templates: Optional[Iterable[str]] = None,
+                    title: Optional[str] = None) -> list:
+        """
+        Retrieves stored records.
+
+        Parameters
+        ----------
+        host : str
+            The host URL the records are from.
+        templates : iterable of str, optional
+            The template ids to limit the records by.  If not given, records
+            of all templates are returned.
+        title : str, optional
+            The record title to limit the records by.
+
+        Returns
+        -------
+        list of dict
+            The records as returned by the REST calls.
+        """
+        sql = 'SELECT record FROM records WHERE host = ?'
+        args = [host]
+        if templates is not None:
+            templates = [str(template) for template in templates]
+            sql += f' AND template IN ({", ".join("?" * len(templates))})'
+            args.extend(templates)
+        if title is not None:
+            sql += ' AND title = ?'
+            args.append(title)
+
+        with closing(self.__connect()) as db:
+            rows = db.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def clear(self, host: Optional[str] = None,
+              template: Optional[str] = None):
+        """
+        Removes stored records and sync information.
+
+        Parameters
+        ----------
+        host : str, optional
+            The host URL to limit the removal to.  If not given, everything is
+            removed.
+        template : str, optional
+            The template id to limit the removal to.  Requires host.
+        """
+        if host is None:
+            if template is not None:
+                raise ValueError('template requires host')
+            where, args = '', []
+        elif template is None:
+            where, args = ' WHERE host = ?', [host]
+        else:
+            where, args = ' WHERE host = ? AND template = ?', [host, str(template)]
+
+        with self.__transaction() as db:
+            db.execute('DELETE FROM records' + where, args)
+            db.execute('DELETE FROM syncs' + where, args)
@@ -1,19 +1,122 @@
 # Standard library imports
+from functools import lru_cache
 import getpass
+import hashlib
+from http import cookiejar
 from pathlib import Path
-from typing import Optional, Union, Tuple
+import time
+from typing import Callable, Optional, Union, Tuple
 
 # http://docs.python-requests.org
 import requests
+from requests.adapters import HTTPAdapter
 
-# Ignore certification warnings (for now)
-from requests.packages.urllib3.exceptions import InsecureRequestWarning 
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+# Local imports
+from .HTTPCache import HTTPCache, build_response
+from .RetryPolicy import RetryPolicy
+from .RateLimiter import RateLimiter
+from .MetricsRegistry import MetricsRegistry
+
+@lru_cache(maxsize=None)
+def disable_insecure_warnings():
+    """Ignores certification warnings (for now).  Only done once, when needed"""
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+def resolve_login(host: str,
+                  username: Optional[str] = None,
+                  password: Optional[str] = None,
+                  auth: Optional[Tuple[str]] = None,
+                  cert: Union[str, Tuple[str], None] = None,
+                  certification: Union[str, Tuple[str], None] = None) -> tuple:
+    """
+    Interprets access information, prompting for a missing username and
+    password.  See RestClient.login() for the parameters.
+
+    Returns
+    -------
+    host : str
+        The host URL without trailing slashes.
+    username : str or None
+        The username, or None for anonymous access.
+    auth : tuple or None
+        The auth tuple to send with calls.
+    cert : str, tuple or None
+        The checked client cert.
+    """
+    # Handle host
+    host = host.strip('/')
+
+    # Handle username and password
+    if auth is None:
+
+        # Handle username
+        if username is None:
+            username = input(f'Enter username for {host}:')
+
+        # Handle non-anonymous 
+        if username != '':
+
+            # Handle password
+            if password is None:
+                password = getpass.getpass(f'Enter password for {username} @ {host}:')
+            auth = (username, password)
+
+        # Handle anonymous
+        else:
+            username = None
+            auth = None
+
+    # Handle auth 
+    else:
+        assert username is None and password is None, 'auth cannot be given with username and password'
+        username = auth[0]
+
+    # Handle certification
+    if certification is not None:
+        if cert is not None:
+            raise ValueError('Both certification and cert given - they are aliases of each other')
+        cert = certification
+    if isinstance(cert, str):
+        cert = Path(cert)
+        if cert.is_file():
+            cert = str(cert.resolve())
+        else:
+            raise ValueError('Certification file not found!')
+    elif isinstance(cert, (list, tuple)):
+        assert len(cert) == 2
+        if not Path(cert[0]).is_file() or not Path(cert[1].is_file()):
+            raise ValueError('Certification file not found!')
+
+    return host, username, auth, cert
+
+class _BlockAllCookies(cookiejar.CookiePolicy):
+    """
+    Cookie policy that never stores or returns cookies.  Keeps the pooled
+    session stateless so that each REST call is authenticated in the same
+    manner as an independent requests.request() call.
+    """
+    netscape = True
+    rfc2965 = hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
 
 class RestClient(object):
     """
     Generic class for building REST calls to web databases in Python.
     """
+    hook_events = ('pre_request', 'post_response', 'retry')
+
     def __init__(self,
                  host: str,
                  username: Optional[str] = None,
@@ -23,7 +126,16 @@ class RestClient(object):
                  headers: Optional[dict] = None,
                  certification: Union[str, Tuple[str], None] = None,
                  verify: Optional[bool] = True,
-                 hidden: Optional[dict] = None):
+                 hidden: Optional[dict] = None,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 pool_block: bool = False,
+                 keep_alive: bool = True,
+                 adapter_kwargs: Optional[dict] = None,
+                 http_cache: Union[HTTPCache, str, Path, bool, None] = None,
+                 retry_policy: Union[RetryPolicy, bool, None] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 metrics: Union[MetricsRegistry, bool, None] = None):
         """
         Class initializer. Tests and stores access information.
         
@@ -56,7 +168,93 @@ class RestClient(object):
         hidden : dict or None, optional
             A dict containing values that may be contained in headers that
             should be hidden from view except when REST calls are made.
+        pool_connections : int, optional
+            The number of host connection pools to cache.  Default value is
+            10.
+        pool_maxsize : int, optional
+            The maximum number of connections to keep open in each host
+            connection pool.  Should be at least as large as the number of
+            threads making simultaneous calls.  Default value is 10.
+        pool_block : bool, optional
+            If True, calls will wait for a free pooled connection rather than
+            opening extra, unpooled connections when the pool is exhausted.
+            Default value is False.
+        keep_alive : bool, optional
+            If True (default), connections are kept open and reused between
+            calls.  If False, every call asks the server to close the
+            connection afterwards, i.e. the behavior before connection pooling
+            was added.
+        adapter_kwargs : dict, optional
+            Any extra keyword arguments to pass to the
+            requests.adapters.HTTPAdapter that manages the connection pools,
+            such as max_retries.
+        http_cache : cdcs.HTTPCache, str, Path or bool, optional
+            If given, GET responses will be cached according to their HTTP
+            caching headers and revalidated using ETag and Last-Modified.  True
+            creates an in-memory cache, and a str or Path value creates a
+            cache stored in that SQLite file.  Use an HTTPCache object to set
+            per-endpoint TTLs.  Default value of None does not cache
+            responses.
+        retry_policy : cdcs.RetryPolicy or bool, optional
+            Determines which failed calls are retried and how long to wait
+            between tries.  If None or True (default), a RetryPolicy with
+            default settings is used, which retries idempotent calls after
+            429, 502, 503 and 504 responses and connection errors with
+            exponential backoff.  False never retries calls.
+        rate_limiter : cdcs.RateLimiter, optional
+            If given, limits the rate of calls and the number of calls in
+            progress for each endpoint class of the host.  The same limiter
+            can be shared by multiple clients and threads.  Default value of
+            None does not limit calls.
+        metrics : cdcs.MetricsRegistry or bool, optional
+            If given, counters and histograms of the calls sent are recorded
+            for each method and route.  True creates a new registry.  The same
+            registry can be shared by multiple clients.  Default value of None
+            does not record metrics.
         """
+        # Build the pooled session used by all REST calls
+        if adapter_kwargs is None:
+            adapter_kwargs = {}
+        self.__session = requests.Session()
+        self.__session.cookies.set_policy(_BlockAllCookies())
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block, **adapter_kwargs)
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
+        if not keep_alive:
+            self.__session.headers['Connection'] = 'close'
+
+        # Set the HTTP response cache
+        if http_cache is True:
+            http_cache = HTTPCache()
+        elif http_cache is False:
+            http_cache = None
+        elif http_cache is not None and not isinstance(http_cache, HTTPCache):
+            http_cache = HTTPCache(http_cache)
+        self.__http_cache = http_cache
+
+        # Set the retry policy
+        if retry_policy is None or retry_policy is True:
+            retry_policy = RetryPolicy()
+        elif retry_policy is False:
+            retry_policy = None
+        elif not isinstance(retry_policy, RetryPolicy):
+            raise TypeError('retry_policy must be a RetryPolicy or bool')
+        self.__retry_policy = retry_policy
+        self.__rate_limiter = rate_limiter
+
+        # Set the event hooks and metrics registry
+        self.__hooks = {event: [] for event in self.hook_events}
+        if metrics is True:
+            metrics = MetricsRegistry()
+        elif metrics is False:
+            metrics = None
+        self.__metrics = metrics
+        if metrics is not None:
+            self.add_hook('post_response', metrics.post_response)
+            self.add_hook('retry', metrics.retry)
+
         # Add/init hidden dict
         if isinstance(hidden, dict):
             self.__hidden = hidden
@@ -71,6 +269,82 @@ class RestClient(object):
     def __str__(self) -> str:
         """str: String representation gives username and host info."""
         return f'RestClient for {self.username} @ {self.host}'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """requests.Session: The pooled session used for the REST calls."""
+        return self.__session
+
+    @property
+    def http_cache(self) -> Optional[HTTPCache]:
+        """cdcs.HTTPCache or None: The cache used for GET responses."""
+        return self.__http_cache
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        """cdcs.RetryPolicy or None: The policy used to retry failed calls."""
+        return self.__retry_policy
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """cdcs.RateLimiter or None: The limiter of the rate of calls."""
+        return self.__rate_limiter
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """cdcs.MetricsRegistry or None: The registry recording call metrics."""
+        return self.__metrics
+
+    def add_hook(self, event: str, hook: Callable[[dict], None]):
+        """
+        Adds a function to be called for an event of every REST call try.
+        Hooks receive a dict of the event's fields.
+
+        - 'pre_request' is sent before each try with method, url and attempt.
+        - 'post_response' is sent after each try with method, url, attempt,
+          response (None if sending failed), error (the exception raised, if
+          any), latency in seconds and stream.
+        - 'retry' is sent before waiting to retry with method, url, attempt,
+          response, error and delay in seconds.
+
+        Parameters
+        ----------
+        event : str
+            The event name: 'pre_request', 'post_response' or 'retry'.
+        hook : callable
+            The function to call.
+        """
+        if event not in self.hook_events:
+            raise ValueError(f'unknown event {event}: must be one of {self.hook_events}')
+        self.__hooks[event].append(hook)
+
+    def remove_hook(self, event: str, hook: Callable[[dict], None]):
+        """
+        Removes a function added with add_hook().
+
+        Parameters
+        ----------
+        event : str
+            The event name: 'pre_request', 'post_response' or 'retry'.
+        hook : callable
+            The function to remove.
+        """
+        if event not in self.hook_events:
+            raise ValueError(f'unknown event {event}: must be one of {self.hook_events}')
+        self.__hooks[event].remove(hook)
+
+    def close(self):
+        """
+        Closes all pooled connections.  The client can still be used
+        afterwards, in which case new connections will be opened as needed.
+        """
+        self.__session.close()
         
     @property
     def host(self) -> str:
@@ -131,50 +405,11 @@ class RestClient(object):
             server's TLS certificate, or a string, in which case it must be a
             path to a CA bundle to use. Defaults to True.
         """
-        # Handle host
-        host = host.strip('/')
-
-        # Handle username and password
-        if auth is None:
-
-            # Handle username
-            if username is None:
-                username = input(f'Enter username for {host}:')
-       
-            # Handle non-anonymous 
-            if username != '':
-
-                # Handle password
-                if password is None:
-                    password = getpass.getpass(f'Enter password for {username} @ {host}:')
-                auth = (username, password)
-            
-            # Handle anonymous
-            else:
-                username = None
-                auth = None
+        host, username, auth, cert = resolve_login(host, username=username,
+                                                   password=password, auth=auth,
+                                                   cert=cert,
+                                                   certification=certification)
 
-        # Handle auth 
-        else:
-            assert username is None and password is None, 'auth cannot be given with username and password'
-            username = auth[0]
-
-        # Handle certification
-        if certification is not None:
-            if cert is not None:
-                raise ValueError('Both certification and cert given - they are aliases of each other')
-            cert = certification
-        if isinstance(cert, str):
-            cert = Path(cert)
-            if cert.is_file():
-                cert = str(cert.resolve())
-            else:
-                raise ValueError('Certification file not found!')
-        elif isinstance(cert, (list, tuple)):
-            assert len(cert) == 2
-            if not Path(cert[0]).is_file() or not Path(cert[1].is_file()):
-                raise ValueError('Certification file not found!')
-            
         # Set object values
         self.__host = host
         self.__user = username
@@ -195,11 +430,13 @@ class RestClient(object):
     def request(self, method: str,
                 rest_url: str,
                 checkstatus: bool = True,
-                retry504: int = 5,
+                retry504: Optional[int] = None,
+                idempotent: bool = False,
                 **kwargs) -> requests.Response:
         """
         Wrapper around requests.request that automatically sets any access
-        parameters based on the stored login information.
+        parameters based on the stored login information.  Calls are sent
+        through the client's pooled session so that connections are reused.
         
         Parameters
         ----------
@@ -212,9 +449,14 @@ class RestClient(object):
             checked and an error thrown if bad.  Setting this to False will
             not automatically check the status.
         retry504 : int, optional
-            Number of times the request will be tried if a 504 gateway timeout
-            status is received.  Useful for finnicky databases.  Default value
-            is 5.
+            If given, overrides the maximum number of times the request will
+            be tried by the client's retry_policy.  Retained for
+            compatibility.
+        idempotent : bool, optional
+            Marks that the request can be safely repeated even though its
+            method is not idempotent, i.e. a POST or PATCH that only performs a
+            search.  Only such calls are retried for these methods.  Default
+            value is False.
         **kwargs : any, optional
             Any other arguments supported by requests.request() except for url.
             Default values for auth, verify, and cert will be used based on the
@@ -238,23 +480,122 @@ class RestClient(object):
         cert = kwargs.pop('cert', self.cert)
         verify = kwargs.pop('verify', self.verify)
         headers = self.__reveal_hidden(kwargs.pop('headers', self.headers))
+        if verify is False:
+            disable_insecure_warnings()
+
+        # Note the start of streamed bodies so they can be resent on retries
+        body = kwargs.get('data', None)
+        try:
+            bodystart = body.tell()
+        except (AttributeError, OSError):
+            bodystart = None
+
+        # Check the HTTP cache for GET requests
+        cache = self.http_cache
+        cachekey = None
+        revalidated = None
+        if (cache is not None and method.upper() == 'GET'
+            and not kwargs.get('stream', False)
+            and (headers is None or 'Range' not in headers)):
+            cachekey = self.__cache_key(url, kwargs.get('params', None), auth, headers)
+            entry = cache.get(cachekey)
+            if entry is not None:
+                if entry['fresh']:
+                    return build_response(entry)
+                
+                # Ask the server if the stored response is still valid
+                if len(entry['validators']) > 0:
+                    headers = dict(headers) if headers is not None else {}
+                    headers.update(entry['validators'])
+                    revalidated = entry
         
         # Loop to repeat request calls
-        count504 = 0
+        policy = self.retry_policy
+        limiter = self.rate_limiter
+        hooks = self.__hooks
+        method = method.upper()
+        attempt = 0
         while True:
-            # Send request
-            response = requests.request(method, url, auth=auth, verify=verify,
-                                        cert=cert, headers=headers, **kwargs)
-            
-            # Count 504 Gateway timeout errors
-            if response.status_code == 504:
-                count504 += 1
-                if count504 == retry504:
-                    break
+            # Rewind streamed bodies from previous tries
+            if attempt > 0 and bodystart is not None:
+                body.seek(bodystart)
+
+            # Wait for the rate limiter
+            slot = None
+            if limiter is not None:
+                slot = limiter.acquire(self.host, method, url)
             
-            # Break for all other status codes
-            else:
-                break
+            # Send request
+            if len(hooks['pre_request']) > 0:
+                self.__send_event('pre_request', method=method, url=url, attempt=attempt)
+            if policy is not None:
+                policy.count_attempt()
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, auth=auth, verify=verify,
+                                                cert=cert, headers=headers, **kwargs)
+                error = None
+            except requests.exceptions.RequestException as err:
+                response = None
+                error = err
+            except BaseException:
+                if slot is not None:
+                    slot.release()
+                raise
+            latency = time.monotonic() - start
+
+            retry = policy is not None and policy.should_retry(method, attempt,
+                                                               response=response,
+                                                               error=error,
+                                                               idempotent=idempotent,
+                                                               max_tries=retry504)
+
+            # Free the limiter slot, holding it for streamed bodies until closed
+            if slot is not None:
+                if response is None:
+                    slot.release(None, latency)
+                elif kwargs.get('stream', False) and not retry:
+                    slot.hold(response, latency)
+                else:
+                    slot.release(response.status_code, latency)
+
+            if len(hooks['post_response']) > 0:
+                self.__send_event('post_response', method=method, url=url,
+                                  attempt=attempt, response=response, error=error,
+                                  latency=latency, stream=kwargs.get('stream', False))
+
+            # Wait and retry if allowed by the policy
+            if retry:
+                delay = policy.delay(attempt, response)
+                if len(hooks['retry']) > 0:
+                    self.__send_event('retry', method=method, url=url,
+                                      attempt=attempt, response=response,
+                                      error=error, delay=delay)
+                policy.sleep(delay)
+                if response is not None:
+                    response.close()
+                attempt += 1
+                continue
+
+            if error is not None:
+                raise error
+            break
+
+        # Update the HTTP cache
+        if cachekey is not None:
+            if response.status_code == 304:
+                cached = cache.refresh(cachekey, response)
+
+                # Use the entry read before the request if it was since removed
+                if cached is None and revalidated is not None:
+                    cached = build_response(revalidated)
+                if cached is not None:
+                    response.close()
+                    response = cached
+            elif response.status_code == 200:
+                cache.set(cachekey, response)
+        elif cache is not None and method.upper() not in ['GET', 'HEAD', 'OPTIONS']:
+            cache.invalidate(url)
         
         # Check for errors
         if checkstatus and not response.ok:
@@ -262,10 +603,27 @@ class RestClient(object):
                 print(response.json())
             except:
                 print(response.text)
+            response.close()
             response.raise_for_status()
         
         return response
     
+    def __send_event(self, event: str, **fields):
+        """Calls the hooks of an event"""
+        fields['event'] = event
+        for hook in self.__hooks[event]:
+            hook(fields)
+
+    def __cache_key(self, url: str,
+                    params: Optional[dict],
+                    auth: Union[Tuple[str], None],
+                    headers: Optional[dict]) -> str:
+        """Builds the HTTP cache key for a GET request, which is kept separate for each set of credentials"""
+        url = requests.Request('GET', url, params=params).prepare().url
+        authorization = None if headers is None else headers.get('Authorization', None)
+        scope = hashlib.sha256(repr((auth, authorization)).encode('utf-8')).hexdigest()
+        return f'{scope}:{url}'
+
     def head(self, rest_url: str,
              **kwargs) -> requests.Response:
         """
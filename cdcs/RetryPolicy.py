@@ -0,0 +1,266 @@
+# Standard library imports
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# http://docs.python-requests.org
+import requests
+
+class RetryPolicy(object):
+    """
+    Decides when failed REST calls are retried and how long to wait before
+    each retry.  Waits grow exponentially with random jitter, and Retry-After
+    headers sent by the server are honored.  Counters of the attempts and
+    retries are kept and can be shared by multiple clients using the same
+    policy.
+    """
+    def __init__(self,
+                 total: int = 4,
+                 statuses: tuple = (429, 502, 503, 504),
+                 exceptions: tuple = (requests.exceptions.ConnectionError,
+                                      requests.exceptions.Timeout),
+                 excluded_exceptions: tuple = (requests.exceptions.SSLError,
+                                               requests.exceptions.ProxyError),
+                 methods: tuple = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+                 backoff_factor: float = 0.5,
+                 backoff_max: float = 60,
+                 jitter: bool = True,
+                 respect_retry_after: bool = True,
+                 retry_after_max: float = 300,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        total : int, optional
+            The maximum number of retries after the first try.  Default value
+            is 4.
+        statuses : tuple, optional
+            The response status codes that are retried.  Default value is
+            (429, 502, 503, 504).
+        exceptions : tuple, optional
+            The exception classes raised while sending that are retried.
+            Default value retries connection errors and timeouts.
+        excluded_exceptions : tuple, optional
+            Subclasses of the exceptions that are not retried as they will
+            fail again the same way.  Default value excludes certificate and
+            proxy errors, which are kinds of ConnectionError.
+        methods : tuple, optional
+            The idempotent request methods that are retried.  Other methods,
+            such as POST and PATCH, are only retried for calls marked as
+            idempotent.  Default value is ('GET', 'HEAD', 'OPTIONS', 'PUT',
+            'DELETE').
+        backoff_factor : float, optional
+            The wait in seconds before the first retry.  Each later retry
+            doubles the wait.  Default value is 0.5.
+        backoff_max : float, optional
+            The maximum wait in seconds between retries.  Default value is 60.
+        jitter : bool, optional
+            If True (default), each wait is randomly chosen between zero and
+            the backoff value so that many clients do not retry in lockstep.
+        respect_retry_after : bool, optional
+            If True (default), the wait given by a response's Retry-After
+            header is used when it is longer than the backoff.
+        retry_after_max : float, optional
+            The longest Retry-After wait in seconds that will be honored.
+            Default value is 300.
+        sleep : callable, optional
+            The function used to wait.  Default value is time.sleep.
+        """
+        if total < 0:
+            raise ValueError('total must be non-negative')
+        self.total = total
+        self.statuses = tuple(statuses)
+        self.exceptions = tuple(exceptions)
+        self.excluded_exceptions = tuple(excluded_exceptions)
+        self.methods = tuple(method.upper() for method in methods)
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_max = retry_after_max
+        self.sleep = sleep
+
+        self.__lock = threading.Lock()
+        self.reset()
+
+    @property
+    def counters(self) -> dict:
+        """
+        dict: Copy of the counters of attempts (all tries sent), retries,
+        failures (calls given up on after retrying), and the number of retries
+        for each status code and exception name.
+        """
+        with self.__lock:
+            counters = dict(self.__counters)
+            counters['statuses'] = dict(counters['statuses'])
+            counters['exceptions'] = dict(counters['exceptions'])
+        return counters
+
+    def reset(self):
+        """Sets all counters to zero."""
+        with self.__lock:
+            self.__counters = {'attempts': 0, 'retries': 0, 'failures': 0,
+                               'statuses': {}, 'exceptions': {}}
+
+    def count_attempt(self):
+        """Increments the attempts counter."""
+        with self.__lock:
+            self.__counters['attempts'] += 1
+
+    def is_retryable(self,
+                     method: str,
+                     response: Optional[requests.Response] = None,
+                     error: Optional[Exception] = None,
+                     idempotent: bool = False) -> bool:
+        """
+        Checks if a failed try is of a kind that can be retried.
+
+        Parameters
+        ----------
+        method : str
+            The request method.
+        response : requests.Response, optional
+            The response received, if any.
+        error : Exception, optional
+            The exception raised while sending, if any.
+        idempotent : bool, optional
+            If True, the request can be safely repeated regardless of its
+            method.  Default value is False.
+
+        Returns
+        -------
+        bool
+            True if the try can be retried.
+        """
+        if not idempotent and method.upper() not in self.methods:
+            return False
+        if error is not None:
+            return (isinstance(error, self.exceptions)
+                    and not isinstance(error, self.excluded_exceptions))
+        return response is not None and response.status_code in self.statuses
+
+    def should_retry(self,
+                     method: str,
+                     attempt: int,
+                     response: Optional[requests.Response] = None,
+                     error: Optional[Exception] = None,
+                     idempotent: bool = False,
+                     max_tries: Optional[int] = None) -> bool:
+        """
+        Decides if a failed try is retried and updates the counters.
+
+        Parameters
+        ----------
+        method : str
+            The request method.
+        attempt : int
+            The number of retries already done for the call.
+        response : requests.Response, optional
+            The response received, if any.
+        error : Exception, optional
+            The exception raised while sending, if any.
+        idempotent : bool, optional
+            If True, the request can be safely repeated regardless of its
+            method.  Default value is False.
+        max_tries : int, optional
+            Overrides the total number of tries allowed for the call.
+
+        Returns
+        -------
+        bool
+            True if the call should be tried again.
+        """
+        if not self.is_retryable(method, response=response, error=error,
+                                 idempotent=idempotent):
+            return False
+
+        if max_tries is None:
+            max_tries = self.total + 1
+        with self.__lock:
+            if attempt + 1 >= max_tries:
+                self.__counters['failures'] += 1
+                return False
+
+            self.__counters['retries'] += 1
+            if error is not None:
+                name = type(error).__name__
+                self.__counters['exceptions'][name] = self.__counters['exceptions'].get(name, 0) + 1
+            else:
+                code = response.status_code
+                self.__counters['statuses'][code] = self.__counters['statuses'].get(code, 0) + 1
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Gives the exponential backoff wait before a retry.
+
+        Parameters
+        ----------
+        attempt : int
+            The number of retries already done for the call.
+
+        Returns
+        -------
+        float
+            The wait in seconds.
+        """
+        wait = min(self.backoff_max, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            wait = random.uniform(0, wait)
+        return wait
+
+    def retry_after(self, response: Optional[requests.Response]) -> Optional[float]:
+        """
+        Reads the wait requested by a response's Retry-After header.
+
+        Parameters
+        ----------
+        response : requests.Response or None
+            The response.
+
+        Returns
+        -------
+        float or None
+            The wait in seconds, limited to retry_after_max, or None if no
+            valid Retry-After header was sent.
+        """
+        if response is None or 'Retry-After' not in response.headers:
+            return None
+        value = response.headers['Retry-After'].strip()
+        try:
+            wait = float(value)
+        except ValueError:
+            try:
+                wait = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(0, wait), self.retry_after_max)
+
+    def delay(self, attempt: int,
+              response: Optional[requests.Response] = None) -> float:
+        """
+        Gives the wait before a retry, using the longer of the backoff and any
+        Retry-After wait.
+
+        Parameters
+        ----------
+        attempt : int
+            The number of retries already done for the call.
+        response : requests.Response, optional
+            The response received, if any.
+
+        Returns
+        -------
+        float
+            The wait in seconds.
+        """
+        wait = self.backoff(attempt)
+        if self.respect_retry_after:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                wait = max(wait, retry_after)
+        return wait
@@ -0,0 +1,92 @@
+# Standard library imports
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+class TTLCache(object):
+    """
+    Simple thread-safe in-memory cache whose entries expire after a set time
+    to live (TTL).
+    """
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        Class initializer.
+
+        Parameters
+        ----------
+        ttl : float or None, optional
+            The number of seconds that cached values remain valid.  A value of
+            None (default) or 0 disables the cache.
+        """
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        self.ttl = ttl
+
+    @property
+    def ttl(self) -> Optional[float]:
+        """float or None: The number of seconds that cached values remain valid."""
+        return self.__ttl
+
+    @ttl.setter
+    def ttl(self, value: Optional[float]):
+        if value is not None and value < 0:
+            raise ValueError('ttl must be None or a non-negative number')
+        self.__ttl = value
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        """bool: Indicates if the cache is storing values."""
+        return self.ttl is not None and self.ttl > 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Retrieves a value from the cache.
+
+        Parameters
+        ----------
+        key : hashable
+            The key the value was stored under.
+
+        Returns
+        -------
+        any
+            The stored value, or None if the value is not cached or has
+            expired.
+        """
+        if not self.enabled:
+            return None
+        with self.__lock:
+            try:
+                expires, value = self.__entries[key]
+            except KeyError:
+                return None
+            if time.monotonic() >= expires:
+                del self.__entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores a value in the cache.  Does nothing if the cache is disabled.
+
+        Parameters
+        ----------
+        key : hashable
+            The key to store the value under.
+        value : any
+            The value to store.
+        """
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        """Removes all values from the cache."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
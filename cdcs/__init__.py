@@ -1,9 +1,26 @@
-from importlib.metadata import version
-__version__ = version('cdcs')
-
-from .date_parser import date_parser
+from .date_parser import date_parser, date_column_parser
 from .aslist import aslist, iaslist
+from .TTLCache import TTLCache
+from .BlobCache import BlobCache
+from .RecordCache import RecordCache
+from .HTTPCache import HTTPCache
+from .RetryPolicy import RetryPolicy
+from .RateLimiter import RateLimiter
+from .MetricsRegistry import MetricsRegistry
+from .Profiler import Profiler
 from .RestClient import RestClient
 from .CDCS import CDCS
+from .ExecutorRestClient import ExecutorRestClient
+from .ExecutorCDCS import ExecutorCDCS
+from .AsyncRestClient import AsyncRestClient
+from .AsyncCDCS import AsyncCDCS
+
+__all__ = ['__version__', 'date_parser', 'date_column_parser', 'aslist', 'iaslist', 'TTLCache', 'BlobCache', 'RecordCache', 'HTTPCache', 'RetryPolicy', 'RateLimiter', 'MetricsRegistry', 'Profiler', 'RestClient', 'CDCS', 'ExecutorRestClient', 'ExecutorCDCS', 'AsyncRestClient', 'AsyncCDCS']
 
-__all__ = ['__version__', 'date_parser', 'aslist', 'iaslist', 'RestClient', 'CDCS']
+def __getattr__(name):
+    # Look up the installed version only when asked for
+    if name == '__version__':
+        from importlib.metadata import version
+        globals()['__version__'] = version('cdcs')
+        return globals()['__version__']
+    raise AttributeError(f"module 'cdcs' has no attribute '{name}'")
@@ -1,8 +1,13 @@
+from __future__ import annotations
+
 # Standard library imports
 from typing import Any, Generator
 
-# https://pandas.pydata.org/
-import pandas as pd
+# Local imports
+from .lazy_import import lazy_import
+
+# https://pandas.pydata.org/, imported on first use
+pd = lazy_import('pandas')
 
 def iaslist(term: Any) -> Generator[Any, None, None]:
     """
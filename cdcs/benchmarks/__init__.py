@@ -0,0 +1,4 @@
+"""
+Benchmarks for measuring the performance of pycdcs against local stand-in
+servers.  Each benchmark module can be run directly using python -m.
+"""
@@ -0,0 +1,7 @@
+# Standard library imports
+import sys
+
+# Local imports
+from .suite import main
+
+sys.exit(main())
@@ -0,0 +1,113 @@
+# Standard library imports
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+from typing import Optional
+
+# Modules that should only be imported once they are used
+lazy_modules = ('pandas', 'numpy', 'tqdm', 'IPython', 'asyncio')
+
+# Default limit for the median seconds spent importing cdcs
+default_budget = 0.5
+
+def measure(module: str = 'cdcs') -> dict:
+    """
+    Times the import of a module in a fresh interpreter.
+
+    Parameters
+    ----------
+    module : str, optional
+        The module to import.  Default value is 'cdcs'.
+
+    Returns
+    -------
+    dict
+        The seconds spent importing the module, the lazy_modules that were
+        imported with it, and the ten slowest modules imported as (name,
+        cumulative seconds) pairs.
+    """
+    code = ('import sys, time, json\n'
+            'sys.stderr.write("start\\n")\n'
+            'sys.stderr.flush()\n'
+            'start = time.perf_counter()\n'
+            f'import {module}\n'
+            'seconds = time.perf_counter() - start\n'
+            f'lazy = [name for name in {lazy_modules!r} if name in sys.modules]\n'
+            'print(json.dumps({"seconds": seconds, "imported": lazy}))\n')
+
+    # Make sure the measured copy of cdcs is this one
+    env = dict(os.environ)
+    root = str(Path(__file__).resolve().parents[2])
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH', '')]))
+
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             capture_output=True, text=True, env=env, check=True)
+    result = json.loads(process.stdout)
+
+    # Parse "import time: self | cumulative | name" lines of -X importtime
+    modules = []
+    lines = process.stderr.splitlines()
+    for line in lines[lines.index('start') + 1:]:
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            modules.append((fields[2].strip(), int(fields[1]) / 1e6))
+    modules = [entry for entry in modules if entry[0] != module]
+    result['slowest'] = sorted(modules, key=lambda entry: entry[1], reverse=True)[:10]
+    return result
+
+def run(repeat: int = 5,
+        budget: Optional[float] = default_budget) -> dict:
+    """
+    Times repeated imports of cdcs and checks them against a budget.
+
+    Parameters
+    ----------
+    repeat : int, optional
+        The number of fresh interpreters to time the import in.  Default
+        value is 5.
+    budget : float, optional
+        The maximum median seconds allowed for importing cdcs.  If None, the
+        time is not checked.  Default value is 0.5.
+
+    Returns
+    -------
+    dict
+        The individual times, their median and min, the lazy_modules that
+        were imported, the slowest modules of the last import, and ok, which
+        is False if the median exceeds the budget or any lazy module was
+        imported.
+    """
+    results = [measure() for i in range(repeat)]
+    times = [result['seconds'] for result in results]
+    imported = sorted(set(name for result in results for name in result['imported']))
+    median = statistics.median(times)
+    return {'times': times, 'median': median, 'min': min(times),
+            'budget': budget, 'imported': imported,
+            'slowest': results[-1]['slowest'],
+            'ok': (budget is None or median <= budget) and len(imported) == 0}
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Time importing cdcs and check it against a budget')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters to time')
+    parser.add_argument('--budget', type=float, default=default_budget,
+                        help='maximum median import time in seconds')
+    args = parser.parse_args(argv)
+
+    result = run(repeat=args.repeat, budget=args.budget)
+    print(f"import cdcs: median {result['median']:.3f} s, min {result['min']:.3f} s "
+          f"(budget {result['budget']:.3f} s)")
+    if len(result['imported']) > 0:
+        print('modules that should be lazy: ' + ', '.join(result['imported']))
+    print('slowest imports:')
+    for name, seconds in result['slowest']:
+        print(f'  {seconds:.3f} s {name}')
+    return 0 if result['ok'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# Standard library imports
+import argparse
+import time
+
+# https://pandas.pydata.org/
+import pandas as pd
+
+# https://numpy.org/
+import numpy as np
+
+# Local imports
+from .. import date_parser
+from ..CDCS._query import format_query_records
+
+date_keys = ['creation_date', 'last_modification_date', 'last_change_date']
+
+def synthetic_records(nrows: int,
+                      ntemplates: int = 50,
+                      seed: int = 0):
+    """
+    Builds synthetic query results and templates.
+
+    Parameters
+    ----------
+    nrows : int
+        The number of records to generate.
+    ntemplates : int, optional
+        The number of templates that the records are spread across.  Default
+        value is 50.
+    seed : int, optional
+        Random seed for reproducible results.
+
+    Returns
+    -------
+    records : pandas.DataFrame
+        The raw records as they would be returned by the query REST call.
+    templates : pandas.DataFrame
+        The matching templates.
+    """
+    rng = np.random.default_rng(seed)
+    templates = pd.DataFrame({
+        'id': np.arange(1, ntemplates + 1),
+        'title': [f'template-{i}' for i in range(1, ntemplates + 1)],
+    })
+
+    base = pd.Timestamp('2021-01-01T00:00:00Z')
+    offsets = pd.to_timedelta(rng.integers(0, 10**9, nrows), unit='ms')
+    dates = (base + offsets).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    records = pd.DataFrame({
+        'id': np.arange(1, nrows + 1),
+        'template': rng.integers(1, ntemplates + 1, nrows),
+        'title': [f'record-{i}' for i in range(nrows)],
+    })
+    for key in date_keys:
+        records[key] = dates
+    return records, templates
+
+def legacy_format(records: pd.DataFrame,
+                  templates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Row-by-row post-processing as performed by query() prior to vectorization.
+    """
+    def set_template_titles(series, templates):
+        return templates[templates.id == series.template].iloc[0].title
+    records['template_title'] = records.apply(set_template_titles, args=[templates], axis=1)
+    for key in date_keys:
+        records[key] = records.apply(date_parser, args=[key], axis=1)
+    return records
+
+def run(sizes: tuple = (10000, 100000, 1000000),
+        legacy_max: int = 100000) -> list:
+    """
+    Times the post-processing of query results for different numbers of rows.
+
+    Parameters
+    ----------
+    sizes : tuple, optional
+        The numbers of rows to benchmark.  Default values are 10k, 100k and
+        1M.
+    legacy_max : int, optional
+        The largest number of rows to also time the legacy row-by-row
+        processing for, as it is very slow for large sizes.  Default value is
+        100k.
+
+    Returns
+    -------
+    list
+        One dict of timing results for each size.
+    """
+    results = []
+    for nrows in sizes:
+        records, templates = synthetic_records(nrows)
+        result = {'rows': nrows}
+
+        start = time.perf_counter()
+        format_query_records(records.copy(), templates)
+        result['vectorized'] = time.perf_counter() - start
+
+        if nrows <= legacy_max:
+            start = time.perf_counter()
+            legacy_format(records.copy(), templates)
+            result['legacy'] = time.perf_counter() - start
+
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time the post-processing of query results')
+    parser.add_argument('sizes', nargs='*', type=int,
+                        default=[10000, 100000, 1000000],
+                        help='numbers of rows to benchmark')
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help='largest size to time legacy processing for')
+    args = parser.parse_args()
+
+    for r in run(args.sizes, legacy_max=args.legacy_max):
+        line = f"{r['rows']:>9} rows: vectorized {r['vectorized']:.3f} s"
+        if 'legacy' in r:
+            line += f", legacy {r['legacy']:.3f} s ({r['legacy'] / r['vectorized']:.0f}x)"
+        print(line)
+
+if __name__ == '__main__':
+    main()
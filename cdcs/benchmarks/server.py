@@ -0,0 +1,1375 @@
+# Standard library imports
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from typing import Optional, Union
+import xml.etree.ElementTree as ET
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+class StandInStore(object):
+    """
+    In-memory store of the templates, records, workspaces, blobs, XSLTs and
+    PID settings served by a StandInServer.  All changes are made while
+    holding lock so that the store can be shared by the server's request
+    threads and the code setting up a benchmark or test.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.managers = {}
+        self.templates = {}
+        self.records = {}
+        self.dict_contents = {}
+        self.workspaces = {}
+        self.blobs = {}
+        self.blob_contents = {}
+        self.xslts = {}
+        self.pid_paths = {}
+        self.pid_settings = {'auto_set_pid': True, 'path': '',
+                             'format': '[a-zA-Z0-9_\\-]+',
+                             'system_name': 'local',
+                             'system_type': 'core_linked_records_app.utils.providers.local.LocalIdProvider',
+                             'prefixes': ['test']}
+        self.__next_ids = {}
+        self.add_workspace('Global Public Workspace', is_public=True)
+
+    def next_id(self, kind: str) -> int:
+        """Gives the next unused integer id for a kind of entry"""
+        with self.lock:
+            self.__next_ids[kind] = self.__next_ids.get(kind, 0) + 1
+            return self.__next_ids[kind]
+
+    def add_template(self, title: str,
+                     content: str = '<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"/>',
+                     versions: int = 1,
+                     is_disabled: bool = False,
+                     user: Optional[str] = None) -> dict:
+        """
+        Adds a template manager and its template versions.  The last version
+        is set as current.
+
+        Parameters
+        ----------
+        title : str
+            The template title.
+        content : str, optional
+            The XSD content of each version.
+        versions : int, optional
+            The number of template versions.  Default value is 1.
+        is_disabled : bool, optional
+            Sets if the template manager is disabled.  Default value is False.
+        user : str, optional
+            The id of the user owning the template.  Default value of None
+            makes it a global template.
+
+        Returns
+        -------
+        dict
+            The template manager.
+        """
+        with self.lock:
+            manager = {'id': self.next_id('manager'), 'title': title,
+                       'user': user, 'versions': [], 'current': None,
+                       'is_disabled': is_disabled, 'disabled_versions': [],
+                       '_cls': 'VersionManager.TemplateVersionManager',
+                       'creation_date': now(), 'display_rank': None}
+            self.managers[manager['id']] = manager
+            for i in range(versions):
+                self.add_template_version(manager, content)
+            return manager
+
+    def add_template_version(self, manager: dict, content: str,
+                             filename: Optional[str] = None,
+                             set_current: bool = True) -> dict:
+        """
+        Adds a new template version to a template manager.
+
+        Parameters
+        ----------
+        manager : dict
+            The template manager.
+        content : str
+            The XSD content.
+        filename : str, optional
+            The template file name.  Default value is the title with a .xsd
+            extension.
+        set_current : bool, optional
+            If True (default), the new version is set as current.
+
+        Returns
+        -------
+        dict
+            The template.
+        """
+        with self.lock:
+            template = {'id': self.next_id('template'), 'user': manager['user'],
+                        'filename': filename if filename is not None else f"{manager['title']}.xsd",
+                        'checksum': None, 'content': content,
+                        'hash': f"{abs(hash(content)):x}", 'dependencies': [],
+                        '_display_name': manager['title']}
+            self.templates[template['id']] = template
+            manager['versions'].append(str(template['id']))
+            if set_current or manager['current'] is None:
+                manager['current'] = str(template['id'])
+            return template
+
+    def template_manager(self, template: int) -> Optional[dict]:
+        """Gives the template manager of a template version"""
+        with self.lock:
+            for manager in self.managers.values():
+                if str(template) in manager['versions']:
+                    return manager
+        return None
+
+    def add_record(self, template: int, title: str, xml_content: str,
+                   workspace: Optional[int] = None) -> dict:
+        """
+        Adds a data record.
+
+        Parameters
+        ----------
+        template : int
+            The template id.
+        title : str
+            The record title.
+        xml_content : str
+            The XML content.
+        workspace : int, optional
+            The id of the workspace the record is assigned to.
+
+        Returns
+        -------
+        dict
+            The record.
+        """
+        with self.lock:
+            date = now()
+            record = {'id': self.next_id('record'), 'template': int(template),
+                      'workspace': workspace, 'user_id': '1', 'title': title,
+                      'xml_content': xml_content, 'creation_date': date,
+                      'last_modification_date': date, 'last_change_date': date}
+            self.records[record['id']] = record
+            return record
+
+    def update_record(self, id: int, xml_content: str) -> dict:
+        """
+        Changes the XML content of a data record.
+
+        Parameters
+        ----------
+        id : int
+            The record id.
+        xml_content : str
+            The new XML content.
+
+        Returns
+        -------
+        dict
+            The record.
+        """
+        with self.lock:
+            record = self.records[id]
+            record['xml_content'] = xml_content
+            record['last_modification_date'] = record['last_change_date'] = now()
+            self.dict_contents.pop(id, None)
+            return record
+
+    def dict_content(self, record: dict) -> Optional[dict]:
+        """
+        Gives the XML content of a record converted to a dict the way CDCS
+        stores it for mongo-style queries.  Conversions are cached until the
+        record is updated.
+
+        Parameters
+        ----------
+        record : dict
+            The record.
+
+        Returns
+        -------
+        dict or None
+            The converted content, or None if it is not well-formed XML.
+        """
+        content = self.dict_contents.get(record['id'], False)
+        if content is False:
+            try:
+                content = xml_to_dict(record['xml_content'])
+            except ET.ParseError:
+                content = None
+            self.dict_contents[record['id']] = content
+        return content
+
+    def add_records(self, template: int, count: int, size: int = 1024,
+                    prefix: str = 'record') -> list:
+        """
+        Adds synthetic data records whose XML content has roughly a given
+        size.
+
+        Parameters
+        ----------
+        template : int
+            The template id.
+        count : int
+            The number of records to add.
+        size : int, optional
+            The approximate size in bytes of each record's XML content.
+            Default value is 1024.
+        prefix : str, optional
+            The start of the record titles, which are followed by a number.
+            Default value is 'record'.
+
+        Returns
+        -------
+        list
+            The added records.
+        """
+        return [self.add_record(template, f'{prefix}-{i}',
+                                synthetic_xml(f'{prefix}-{i}', size))
+                for i in range(count)]
+
+    def add_workspace(self, title: str, is_public: bool = False) -> dict:
+        """
+        Adds a workspace.
+
+        Parameters
+        ----------
+        title : str
+            The workspace title.
+        is_public : bool, optional
+            Sets if the workspace is public.  Default value is False.
+
+        Returns
+        -------
+        dict
+            The workspace.
+        """
+        with self.lock:
+            workspace = {'id': self.next_id('workspace'), 'title': title,
+                         'owner': None, 'is_public': is_public}
+            self.workspaces[workspace['id']] = workspace
+            return workspace
+
+    def add_blob(self, filename: str, content: bytes,
+                 workspace: Optional[int] = None) -> dict:
+        """
+        Adds a blob.
+
+        Parameters
+        ----------
+        filename : str
+            The blob file name.
+        content : bytes
+            The blob contents.
+        workspace : int, optional
+            The id of the workspace the blob is assigned to.
+
+        Returns
+        -------
+        dict
+            The blob metadata.  The handle contains a '{host}' placeholder
+            that the server fills in.
+        """
+        with self.lock:
+            blob = {'id': self.next_id('blob'), 'user_id': '1',
+                    'filename': filename, 'workspace': workspace,
+                    'handle': None, 'upload_date': now(), 'pid': None}
+            blob['handle'] = '{host}' + f"/rest/blob/download/{blob['id']}/"
+            self.blobs[blob['id']] = blob
+            self.blob_contents[blob['id']] = bytes(content)
+            return blob
+
+    def add_xslt(self, name: str, content: str,
+                 filename: Optional[str] = None) -> dict:
+        """
+        Adds an XSLT.
+
+        Parameters
+        ----------
+        name : str
+            The XSLT name.
+        content : str
+            The XSLT content.
+        filename : str, optional
+            The XSLT file name.  Default value is the name with a .xsl
+            extension.
+
+        Returns
+        -------
+        dict
+            The XSLT.
+        """
+        with self.lock:
+            xslt = {'id': self.next_id('xslt'), 'name': name,
+                    'filename': filename if filename is not None else f'{name}.xsl',
+                    'content': content, '_cls': 'XslTransformation'}
+            self.xslts[xslt['id']] = xslt
+            return xslt
+
+    def add_pid_path(self, template: int, path: str) -> dict:
+        """
+        Assigns the PID path of a template.
+
+        Parameters
+        ----------
+        template : int
+            The template id.
+        path : str
+            The dot-separated path of the PID field in the records.
+
+        Returns
+        -------
+        dict
+            The PID path setting.
+        """
+        with self.lock:
+            pid_path = {'id': self.next_id('pid_path'), 'path': path,
+                        'template': int(template)}
+            self.pid_paths[pid_path['id']] = pid_path
+            return pid_path
+
+    def clear_records(self):
+        """Removes all data records."""
+        with self.lock:
+            self.records.clear()
+            self.dict_contents.clear()
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local HTTP server that implements the parts of the CDCS REST API used by
+    pycdcs on top of a StandInStore, so that connection reuse, concurrency,
+    streaming and retries can be exercised over real sockets.  A delay can be
+    added to every response, the transfer of request and response bodies can
+    be limited to a bandwidth, and error responses can be returned at random
+    or on demand to approximate network and server conditions.
+    """
+    daemon_threads = True
+
+    def __init__(self,
+                 store: Optional[StandInStore] = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0,
+                 bandwidth: Optional[float] = None,
+                 page_size: int = 10,
+                 error_rate: float = 0,
+                 error_statuses: tuple = (502, 503, 504, 429),
+                 retry_after: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """
+        Class initializer.  The server is started with start().
+
+        Parameters
+        ----------
+        store : StandInStore, optional
+            The store to serve.  If not given, an empty store is created.
+        host : str, optional
+            The interface to bind to.  Default value is '127.0.0.1'.
+        port : int, optional
+            The port to bind to.  Default value of 0 picks a free port.
+        latency : float, optional
+            The number of seconds to wait before handling each request.
+            Default value is 0.
+        bandwidth : float, optional
+            The maximum number of bytes per second for reading request bodies
+            and writing response bodies of each connection.  If None
+            (default), transfers are not limited.
+        page_size : int, optional
+            The number of results in each page of paginated responses.
+            Default value is 10, which is the CDCS default.
+        error_rate : float, optional
+            The fraction of requests that are answered with an error status
+            chosen at random from error_statuses.  Default value is 0.
+        error_statuses : tuple, optional
+            The statuses of random error responses.  Default value is
+            (502, 503, 504, 429).
+        retry_after : float, optional
+            If given, 429 and 503 error responses include a Retry-After
+            header with this many seconds.
+        seed : int, optional
+            Random seed for reproducible error responses.
+        """
+        super().__init__((host, port), StandInHandler)
+        self.store = store if store is not None else StandInStore()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.__random = random.Random(seed)
+        self.__thread = None
+
+        self.__lock = threading.Lock()
+        self.__injected = []
+        self.__log = []
+        self.__in_flight = 0
+        self.__max_in_flight = 0
+        self.__connections = set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def url(self) -> str:
+        """str: The host URL of the server."""
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def start(self) -> 'StandInServer':
+        """
+        Starts serving requests in a daemon thread.
+
+        Returns
+        -------
+        StandInServer
+            The server itself.
+        """
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def close(self):
+        """Stops the server and closes its socket."""
+        if self.__thread is not None:
+            self.shutdown()
+            self.__thread = None
+        self.server_close()
+
+    def inject_errors(self, status: int, count: int = 1,
+                      path: Optional[str] = None):
+        """
+        Answers the next requests with an error status.
+
+        Parameters
+        ----------
+        status : int
+            The error status.
+        count : int, optional
+            The number of requests to answer with the error.  Default value
+            is 1.
+        path : str, optional
+            A regular expression that the URL path of the requests must
+            match.  Default value matches all requests.
+        """
+        with self.__lock:
+            self.__injected.append([status, count, path])
+
+    def error_status(self, path: str) -> Optional[int]:
+        """
+        Chooses if a request is answered with an error.
+
+        Parameters
+        ----------
+        path : str
+            The URL path of the request.
+
+        Returns
+        -------
+        int or None
+            The error status, or None if the request is handled normally.
+        """
+        with self.__lock:
+            for injected in self.__injected:
+                if injected[2] is None or re.search(injected[2], path):
+                    injected[1] -= 1
+                    if injected[1] <= 0:
+                        self.__injected.remove(injected)
+                    return injected[0]
+            if self.error_rate > 0 and self.__random.random() < self.error_rate:
+                return self.__random.choice(self.error_statuses)
+        return None
+
+    def begin_request(self, handler: 'StandInHandler'):
+        """Counts a request being handled"""
+        with self.__lock:
+            self.__in_flight += 1
+            self.__max_in_flight = max(self.__max_in_flight, self.__in_flight)
+            self.__connections.add(handler.client_address)
+
+    def end_request(self, method: str, path: str, status: int):
+        """Counts a handled request"""
+        with self.__lock:
+            self.__in_flight -= 1
+            self.__log.append((method, path, status))
+
+    @property
+    def requests(self) -> list:
+        """list: The (method, path, status) of each handled request."""
+        with self.__lock:
+            return list(self.__log)
+
+    @property
+    def stats(self) -> dict:
+        """
+        dict: The number of handled requests, the number of requests being
+        handled and the most handled at once, and the number of distinct
+        client connections.
+        """
+        with self.__lock:
+            return {'requests': len(self.__log),
+                    'in_flight': self.__in_flight,
+                    'max_in_flight': self.__max_in_flight,
+                    'connections': len(self.__connections)}
+
+    def wait_idle(self, timeout: float = 5) -> bool:
+        """
+        Waits until no requests are being handled.  Requests are counted as
+        handled until after their responses are sent, so this is useful
+        before reading or resetting the stats.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The maximum number of seconds to wait.  Default value is 5.
+
+        Returns
+        -------
+        bool
+            True if the server is idle, False if the timeout was reached.
+        """
+        end = time.monotonic() + timeout
+        while self.stats['in_flight'] > 0:
+            if time.monotonic() > end:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def reset_stats(self):
+        """Clears the request log and counts."""
+        with self.__lock:
+            self.__log = []
+            self.__max_in_flight = self.__in_flight
+            self.__connections = set()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of StandInServer.  Requests are dispatched to the
+    route_* methods according to routes.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    chunk_size = 65536
+
+    routes = [
+        ('GET', r'/rest/core-settings/', 'core_settings'),
+        ('GET', r'/rest/data/', 'get_records'),
+        ('POST', r'/rest/data/', 'post_record'),
+        ('GET', r'/rest/data/(\d+)/', 'get_record'),
+        ('PATCH', r'/rest/data/(\d+)/', 'update_record'),
+        ('DELETE', r'/rest/data/(\d+)/', 'delete_record'),
+        ('POST', r'/rest/data/query/', 'query'),
+        ('POST', r'/rest/data/query/keyword/', 'keyword_query'),
+        ('PATCH', r'/rest/(data|blob)/(\d+)/assign/(\d+)/?', 'assign'),
+        ('GET', r'/rest/template-version-manager/(global|user)/', 'get_managers'),
+        ('POST', r'/rest/template-version-manager/(\d+)/version/', 'post_template_version'),
+        ('PATCH', r'/rest/template-version-manager/(\d+)/(disable|restore)/', 'set_manager'),
+        ('GET', r'/rest/template/(\d+)/', 'get_template'),
+        ('POST', r'/rest/template/(global|user)/', 'post_template'),
+        ('PATCH', r'/rest/template/version/(\d+)/(disable|restore|current)/', 'set_template_version'),
+        ('GET', r'/rest/workspace/', 'get_workspaces'),
+        ('GET', r'/rest/blob/', 'get_blobs'),
+        ('POST', r'/rest/blob/', 'post_blob'),
+        ('GET', r'/rest/blob/(\d+)/?', 'get_blob'),
+        ('DELETE', r'/rest/blob/(\d+)/?', 'delete_blob'),
+        ('GET', r'/rest/blob/download/(\d+)/?', 'download_blob'),
+        ('GET', r'/rest/xslt/', 'get_xslts'),
+        ('POST', r'/rest/xslt/', 'post_xslt'),
+        ('POST', r'/rest/xslt/transform/', 'transform'),
+        ('PATCH', r'/rest/xslt/(\d+)/', 'update_xslt'),
+        ('DELETE', r'/rest/xslt/(\d+)/', 'delete_xslt'),
+        ('GET', r'/pid/rest/settings/', 'get_pid_settings'),
+        ('PATCH', r'/pid/rest/settings/', 'update_pid_settings'),
+        ('GET', r'/pid/rest/settings/(path|xpath)/', 'get_pid_paths'),
+        ('POST', r'/pid/rest/settings/(path|xpath)/', 'post_pid_path'),
+        ('PATCH', r'/pid/rest/settings/(path|xpath)/(\d+)/', 'update_pid_path'),
+        ('DELETE', r'/pid/rest/settings/(path|xpath)/(\d+)/', 'delete_pid_path'),
+        ('POST', r'/pid/rest/upload-blob-pid/?', 'post_blob'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self) -> StandInStore:
+        """StandInStore: The store being served."""
+        return self.server.store
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method: str):
+        """Reads the request and calls the matching route method"""
+        url = urlsplit(self.path)
+        self.params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.status = None
+        self.server.begin_request(self)
+        try:
+            self.body = self.read_body()
+
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+
+            status = self.server.error_status(url.path)
+            if status is not None:
+                self.send_error_status(status)
+                return
+
+            for route_method, pattern, name in self.routes:
+                if route_method != method:
+                    continue
+                match = re.fullmatch(pattern, url.path)
+                if match is not None:
+                    getattr(self, f'route_{name}')(*match.groups())
+                    return
+            self.send_json({'message': f'{method} {url.path} not found'}, 404)
+        finally:
+            self.server.end_request(method, url.path, self.status)
+
+    def send_error_status(self, status: int):
+        """Sends an injected error response"""
+        headers = {}
+        if status in (429, 503) and self.server.retry_after is not None:
+            headers['Retry-After'] = f'{self.server.retry_after:g}'
+        self.send_bytes(json.dumps({'message': 'injected error'}).encode('utf-8'),
+                        status=status, content_type='application/json',
+                        headers=headers)
+
+    def throttle(self, nbytes: int):
+        """Waits long enough to limit a transfer to the server bandwidth"""
+        if self.server.bandwidth is not None and nbytes > 0:
+            time.sleep(nbytes / self.server.bandwidth)
+
+    def read_body(self) -> bytes:
+        """Reads the request body in chunks"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            return self.read_chunked_body()
+
+        length = int(self.headers.get('Content-Length', 0))
+        chunks = []
+        while length > 0:
+            chunk = self.rfile.read(min(length, self.chunk_size))
+            if len(chunk) == 0:
+                break
+            self.throttle(len(chunk))
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b''.join(chunks)
+
+    def read_chunked_body(self) -> bytes:
+        """Reads a request body sent with chunked transfer encoding"""
+        chunks = []
+        while True:
+            length = int(self.rfile.readline().split(b';')[0], 16)
+            if length == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            chunk = self.rfile.read(length)
+            self.rfile.readline()
+            self.throttle(len(chunk))
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def form(self) -> dict:
+        """Parses a urlencoded request body"""
+        values = parse_qs(self.body.decode('utf-8'), keep_blank_values=True)
+        return {key: value[-1] for key, value in values.items()}
+
+    def send_bytes(self, content: Union[bytes, memoryview],
+                   status: int = 200,
+                   content_type: str = 'application/octet-stream',
+                   headers: Optional[dict] = None):
+        """Sends a response whose body is written in throttled chunks"""
+        self.status = status
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        if headers is not None:
+            for name, value in headers.items():
+                self.send_header(name, value)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        content = memoryview(content)
+        for start in range(0, len(content), self.chunk_size):
+            chunk = content[start:start + self.chunk_size]
+            self.wfile.write(chunk)
+            self.throttle(len(chunk))
+
+    def send_json(self, content, status: int = 200):
+        """Sends a JSON response"""
+        self.send_bytes(json.dumps(content).encode('utf-8'), status=status,
+                        content_type='application/json')
+
+    def send_page(self, results: list):
+        """Sends one page of a paginated response"""
+        page = int(self.params.get('page', 1))
+        size = self.server.page_size
+        count = len(results)
+        url = urlsplit(self.path)
+
+        def page_url(number):
+            params = dict(self.params, page=number)
+            return f'{self.server.url}{url.path}?{urlencode(params)}'
+
+        self.send_json({
+            'count': count,
+            'next': page_url(page + 1) if page * size < count else None,
+            'previous': page_url(page - 1) if page > 1 else None,
+            'results': results[(page - 1) * size:page * size]})
+
+    def blob_json(self, blob: dict) -> dict:
+        """Fills in the host of a blob's metadata"""
+        blob = dict(blob, handle=blob['handle'].replace('{host}', self.server.url))
+        if blob['pid'] is not None:
+            blob['pid'] = blob['pid'].replace('{host}', self.server.url)
+        return blob
+
+    def route_core_settings(self):
+        self.send_json({'core_version': '2.10.0'})
+
+    def route_get_records(self):
+        template = self.params.get('template', None)
+        title = self.params.get('title', None)
+        with self.store.lock:
+            records = [record for record in self.store.records.values()
+                       if (template is None or str(record['template']) == template)
+                       and (title is None or record['title'] == title)]
+        self.send_page(records)
+
+    def route_post_record(self):
+        form = self.form()
+        if int(form.get('template', 0)) not in self.store.templates:
+            self.send_json({'message': 'template not found'}, 400)
+            return
+        record = self.store.add_record(form['template'], form['title'],
+                                       form['xml_content'])
+        self.send_json(record, 201)
+
+    def route_get_record(self, id):
+        record = self.store.records.get(int(id), None)
+        if record is None:
+            self.send_json({'message': 'record not found'}, 404)
+        else:
+            self.send_json(record)
+
+    def route_update_record(self, id):
+        form = self.form()
+        if int(id) not in self.store.records:
+            self.send_json({'message': 'record not found'}, 404)
+            return
+        self.send_json(self.store.update_record(int(id), form['xml_content']))
+
+    def route_delete_record(self, id):
+        with self.store.lock:
+            record = self.store.records.pop(int(id), None)
+            self.store.dict_contents.pop(int(id), None)
+        if record is None:
+            self.send_json({'message': 'record not found'}, 404)
+        else:
+            self.send_bytes(b'', 204)
+
+    def query_records(self, form: dict, match) -> list:
+        """Gives the records of the templates and title in a query form that match"""
+        templates = None
+        if 'templates' in form:
+            templates = set(int(template['id']) for template in json.loads(form['templates']))
+        title = form.get('title', None)
+        with self.store.lock:
+            return [record for record in self.store.records.values()
+                    if (templates is None or record['template'] in templates)
+                    and (title is None or record['title'] == title)
+                    and match(record)]
+
+    def route_query(self):
+        form = self.form()
+        try:
+            query = json.loads(form.get('query', '{}') or '{}')
+            if not isinstance(query, dict):
+                raise ValueError('query must be a JSON object')
+
+            def match(record):
+                if len(query) == 0:
+                    return True
+                document = dict(record, dict_content=self.store.dict_content(record))
+                return mongo_match(document, query)
+
+            records = self.query_records(form, match)
+        except ValueError as err:
+            self.send_json({'message': str(err)}, 400)
+            return
+        self.send_page(records)
+
+    def route_keyword_query(self):
+        form = self.form()
+        terms = [term.lower() for term in form.get('query', '').split()]
+
+        def match(record):
+            content = record['xml_content'].lower()
+            return len(terms) == 0 or any(term in content for term in terms)
+
+        self.send_page(self.query_records(form, match))
+
+    def route_assign(self, kind, id, workspace):
+        entries = self.store.records if kind == 'data' else self.store.blobs
+        with self.store.lock:
+            entry = entries.get(int(id), None)
+            if entry is None or int(workspace) not in self.store.workspaces:
+                self.send_json({'message': 'not found'}, 404)
+                return
+            entry['workspace'] = int(workspace)
+        self.send_json({})
+
+    def route_get_managers(self, scope):
+        title = self.params.get('title', None)
+        is_disabled = self.params.get('is_disabled', 'false').lower() == 'true'
+        with self.store.lock:
+            managers = [manager for manager in self.store.managers.values()
+                        if (manager['user'] is None) == (scope == 'global')
+                        and (title is None or manager['title'] == title)
+                        and manager['is_disabled'] == is_disabled]
+        self.send_json(managers)
+
+    def route_post_template_version(self, id):
+        form = self.form()
+        manager = self.store.managers.get(int(id), None)
+        if manager is None:
+            self.send_json({'message': 'template manager not found'}, 404)
+            return
+        template = self.store.add_template_version(manager, form['content'],
+                                                   filename=form.get('filename', None),
+                                                   set_current=False)
+        self.send_json(template, 201)
+
+    def route_set_manager(self, id, action):
+        manager = self.store.managers.get(int(id), None)
+        if manager is None:
+            self.send_json({'message': 'template manager not found'}, 404)
+            return
+        with self.store.lock:
+            manager['is_disabled'] = action == 'disable'
+        self.send_json({})
+
+    def route_get_template(self, id):
+        template = self.store.templates.get(int(id), None)
+        if template is None:
+            self.send_json({'message': 'template not found'}, 404)
+        else:
+            self.send_json(template)
+
+    def route_post_template(self, scope):
+        form = self.form()
+        with self.store.lock:
+            if any(manager['title'] == form['title'] for manager in self.store.managers.values()):
+                self.send_json({'message': 'a template with the same title exists'}, 400)
+                return
+            manager = self.store.add_template(form['title'], versions=0,
+                                              user='1' if scope == 'user' else None)
+            template = self.store.add_template_version(manager, form['content'],
+                                                       filename=form.get('filename', None))
+        self.send_json(template, 201)
+
+    def route_set_template_version(self, id, action):
+        manager = self.store.template_manager(id)
+        if manager is None:
+            self.send_json({'message': 'template not found'}, 404)
+            return
+        with self.store.lock:
+            if action == 'current':
+                if id in manager['disabled_versions']:
+                    self.send_json({'message': 'disabled versions cannot be current'}, 400)
+                    return
+                manager['current'] = id
+            elif action == 'disable':
+                if manager['current'] == id:
+                    self.send_json({'message': 'the current version cannot be disabled'}, 400)
+                    return
+                if id not in manager['disabled_versions']:
+                    manager['disabled_versions'].append(id)
+            elif id in manager['disabled_versions']:
+                manager['disabled_versions'].remove(id)
+        self.send_json({})
+
+    def route_get_workspaces(self):
+        with self.store.lock:
+            workspaces = list(self.store.workspaces.values())
+        self.send_json(workspaces)
+
+    def route_get_blobs(self):
+        filename = self.params.get('filename', None)
+        with self.store.lock:
+            blobs = [self.blob_json(blob) for blob in self.store.blobs.values()
+                     if filename is None or blob['filename'] == filename]
+        self.send_json(blobs)
+
+    def route_post_blob(self):
+        fields, files = parse_multipart(self.body, self.headers.get('Content-Type', ''))
+        if 'blob' not in files:
+            self.send_json({'message': 'blob is required'}, 400)
+            return
+        filename = fields.get('filename', files['blob'][0])
+        blob = self.store.add_blob(filename, files['blob'][1])
+        if 'pid' in fields:
+            prefix = self.store.pid_settings['prefixes'][0]
+            blob['pid'] = '{host}' + f"/pid/rest/local/{prefix}/{fields['pid']}"
+        self.send_json(self.blob_json(blob), 201)
+
+    def route_get_blob(self, id):
+        blob = self.store.blobs.get(int(id), None)
+        if blob is None:
+            self.send_json({'message': 'blob not found'}, 404)
+        else:
+            self.send_json(self.blob_json(blob))
+
+    def route_delete_blob(self, id):
+        with self.store.lock:
+            blob = self.store.blobs.pop(int(id), None)
+            self.store.blob_contents.pop(int(id), None)
+        if blob is None:
+            self.send_json({'message': 'blob not found'}, 404)
+        else:
+            self.send_bytes(b'', 204)
+
+    def route_download_blob(self, id):
+        content = self.store.blob_contents.get(int(id), None)
+        if content is None:
+            self.send_json({'message': 'blob not found'}, 404)
+            return
+
+        # Support single byte ranges
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+        if match is None or match.groups() == ('', ''):
+            self.send_bytes(memoryview(content), headers={'Accept-Ranges': 'bytes'})
+            return
+        first, last = match.groups()
+        size = len(content)
+        if first == '':
+            first, last = max(0, size - int(last)), size - 1
+        else:
+            first = int(first)
+            last = min(int(last), size - 1) if last != '' else size - 1
+        if first >= size or first > last:
+            self.send_bytes(b'', 416, headers={'Content-Range': f'bytes */{size}'})
+            return
+        self.send_bytes(memoryview(content)[first:last + 1], 206,
+                        headers={'Content-Range': f'bytes {first}-{last}/{size}',
+                                 'Accept-Ranges': 'bytes'})
+
+    def route_get_xslts(self):
+        with self.store.lock:
+            xslts = list(self.store.xslts.values())
+        self.send_json(xslts)
+
+    def route_post_xslt(self):
+        form = self.form()
+        with self.store.lock:
+            if any(xslt['name'] == form['name'] for xslt in self.store.xslts.values()):
+                self.send_json({'message': 'an XSLT with the same name exists'}, 400)
+                return
+            xslt = self.store.add_xslt(form['name'], form['content'],
+                                       filename=form.get('filename', None))
+        self.send_json(xslt, 201)
+
+    def route_update_xslt(self, id):
+        form = self.form()
+        with self.store.lock:
+            xslt = self.store.xslts.get(int(id), None)
+            if xslt is not None:
+                for key in ['name', 'filename', 'content']:
+                    if form.get(key, '') != '':
+                        xslt[key] = form[key]
+                xslt = dict(xslt)
+        if xslt is None:
+            self.send_json({'message': 'XSLT not found'}, 404)
+        else:
+            self.send_json(xslt)
+
+    def route_delete_xslt(self, id):
+        with self.store.lock:
+            xslt = self.store.xslts.pop(int(id), None)
+        if xslt is None:
+            self.send_json({'message': 'XSLT not found'}, 404)
+        else:
+            self.send_bytes(b'', 204)
+
+    def route_transform(self):
+        # Transformations are not applied: the record content is returned
+        form = self.form()
+        with self.store.lock:
+            found = any(xslt['name'] == form.get('xslt_name', None)
+                        for xslt in self.store.xslts.values())
+        if not found:
+            self.send_json({'message': 'XSLT not found'}, 404)
+        else:
+            self.send_bytes(form.get('xml_content', '').encode('utf-8'),
+                            content_type='text/html; charset=utf-8')
+
+    def route_get_pid_settings(self):
+        with self.store.lock:
+            settings = dict(self.store.pid_settings)
+        self.send_json(settings)
+
+    def route_update_pid_settings(self):
+        form = self.form()
+        with self.store.lock:
+            if 'auto_set_pid' in form:
+                self.store.pid_settings['auto_set_pid'] = form['auto_set_pid'].lower() == 'true'
+            settings = dict(self.store.pid_settings)
+        self.send_json(settings)
+
+    def pid_path_json(self, pid_path: dict, key: str) -> dict:
+        """Names the path field of a PID path setting as the client expects"""
+        return {'id': pid_path['id'], key: pid_path['path'],
+                'template': pid_path['template']}
+
+    def route_get_pid_paths(self, key):
+        with self.store.lock:
+            pid_paths = [self.pid_path_json(pid_path, key)
+                         for pid_path in self.store.pid_paths.values()]
+        self.send_json(pid_paths)
+
+    def route_post_pid_path(self, key):
+        form = self.form()
+        with self.store.lock:
+            if any(pid_path['template'] == int(form['template'])
+                   for pid_path in self.store.pid_paths.values()):
+                self.send_json({'message': 'the template has a PID path'}, 400)
+                return
+            pid_path = self.store.add_pid_path(form['template'], form[key])
+        self.send_json(self.pid_path_json(pid_path, key), 201)
+
+    def route_update_pid_path(self, key, id):
+        form = self.form()
+        with self.store.lock:
+            pid_path = self.store.pid_paths.get(int(id), None)
+            if pid_path is not None:
+                pid_path['path'] = form[key]
+                pid_path = self.pid_path_json(pid_path, key)
+        if pid_path is None:
+            self.send_json({'message': 'PID path not found'}, 404)
+        else:
+            self.send_json(pid_path)
+
+    def route_delete_pid_path(self, key, id):
+        with self.store.lock:
+            pid_path = self.store.pid_paths.pop(int(id), None)
+        if pid_path is None:
+            self.send_json({'message': 'PID path not found'}, 404)
+        else:
+            self.send_bytes(b'', 204)
+
+def now() -> str:
+    """Gives the current UTC time in the format used by CDCS"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def synthetic_xml(title: str, size: int = 1024) -> str:
+    """
+    Builds synthetic XML record content.
+
+    Parameters
+    ----------
+    title : str
+        The record title, which is included as the name element.
+    size : int, optional
+        The approximate size in bytes of the content.  Default value is 1024.
+
+    Returns
+    -------
+    str
+        The XML content.
+    """
+    head = f'<?xml version="1.0" encoding="utf-8"?><record><name>{title}</name><value>'
+    tail = '</value></record>'
+    fill = max(0, size - len(head) - len(tail))
+    return head + 'x' * fill + tail
+
+def xml_to_dict(content: Union[str, bytes]) -> dict:
+    """
+    Converts XML content to a dict in the way CDCS does for storing records:
+    elements become keys, repeated elements become lists, attributes are
+    prefixed with '@', and element text that is numeric is converted to int
+    or float.
+
+    Parameters
+    ----------
+    content : str or bytes
+        The XML content.
+
+    Returns
+    -------
+    dict
+        The root element name mapped to its converted content.
+
+    Raises
+    ------
+    xml.etree.ElementTree.ParseError
+        If the content is not well-formed XML.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    root = ET.fromstring(content)
+    return {local_name(root.tag): element_to_value(root)}
+
+def local_name(tag: str) -> str:
+    """Removes the namespace from an element tag"""
+    return tag.rsplit('}', 1)[-1]
+
+def element_to_value(element: ET.Element):
+    """Converts an element to a dict, text value or None"""
+    value = {f'@{local_name(key)}': convert_text(text)
+             for key, text in element.attrib.items()}
+    for child in element:
+        name = local_name(child.tag)
+        child_value = element_to_value(child)
+        if name not in value:
+            value[name] = child_value
+        elif isinstance(value[name], list):
+            value[name].append(child_value)
+        else:
+            value[name] = [value[name], child_value]
+
+    text = element.text.strip() if element.text is not None else ''
+    if len(value) == 0:
+        return convert_text(text) if text != '' else None
+    if text != '':
+        value['#text'] = convert_text(text)
+    return value
+
+def convert_text(text: str):
+    """Converts numeric text to int or float"""
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def mongo_match(document: dict, query: dict) -> bool:
+    """
+    Checks if a document matches a mongo-style query.  Fields are given as
+    dot-separated paths that pass through lists, and the comparison ($eq,
+    $ne, $gt, $gte, $lt, $lte, $in, $nin), element ($exists), evaluation
+    ($regex), array ($all, $size, $elemMatch) and logical ($and, $or, $nor,
+    $not) operators are supported.
+
+    Parameters
+    ----------
+    document : dict
+        The document, e.g. a record with its dict_content.
+    query : dict
+        The query.
+
+    Returns
+    -------
+    bool
+        True if the document matches.
+
+    Raises
+    ------
+    ValueError
+        If the query uses an unsupported operator.
+    """
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(mongo_match(document, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(mongo_match(document, sub) for sub in condition):
+                return False
+        elif key == '$nor':
+            if any(mongo_match(document, sub) for sub in condition):
+                return False
+        elif key.startswith('$'):
+            raise ValueError(f'unsupported query operator {key}')
+        elif not match_condition(resolve_path(document, key.split('.')), condition):
+            return False
+    return True
+
+missing = object()
+
+def resolve_path(value, keys: list) -> list:
+    """Gives the values found at a dot-separated path, descending into lists"""
+    if len(keys) == 0:
+        return [value]
+    if isinstance(value, dict):
+        if keys[0] not in value:
+            return [missing]
+        return resolve_path(value[keys[0]], keys[1:])
+    if isinstance(value, list):
+        if keys[0].isdigit():
+            index = int(keys[0])
+            return resolve_path(value[index], keys[1:]) if index < len(value) else [missing]
+        values = []
+        for item in value:
+            values.extend(found for found in resolve_path(item, keys)
+                          if found is not missing)
+        return values if len(values) > 0 else [missing]
+    return [missing]
+
+def candidates(values: list) -> list:
+    """Gives the found values and the items of found lists to compare against"""
+    flat = []
+    for value in values:
+        flat.append(value)
+        if isinstance(value, list):
+            flat.extend(value)
+    return flat
+
+def parse_date(value) -> Optional[datetime]:
+    """Converts an ISO 8601 str or epoch milliseconds to a UTC datetime"""
+    try:
+        if isinstance(value, str):
+            date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            date = datetime.fromtimestamp(value / 1000, timezone.utc)
+        else:
+            return None
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+def query_value(arg):
+    """Converts extended JSON {"$date": ...} query values to datetimes"""
+    if isinstance(arg, dict) and list(arg) == ['$date']:
+        date = arg['$date']
+        if isinstance(date, dict) and list(date) == ['$numberLong']:
+            date = int(date['$numberLong'])
+        date = parse_date(date)
+        if date is None:
+            raise ValueError(f'invalid $date value {arg["$date"]}')
+        return date
+    return arg
+
+def equal_values(value, other) -> bool:
+    """Checks if two values are equal, comparing stored date strs to datetimes"""
+    if isinstance(other, datetime):
+        return parse_date(value) == other
+    return value == other
+
+def compare_values(value, other, op: str) -> bool:
+    """Compares two values, treating mismatched types as not comparable"""
+    if isinstance(other, datetime):
+        value = parse_date(value)
+    try:
+        if op == '$gt':
+            return value > other
+        if op == '$gte':
+            return value >= other
+        if op == '$lt':
+            return value < other
+        return value <= other
+    except TypeError:
+        return False
+
+def match_condition(values: list, condition) -> bool:
+    """Checks if any of the values at a path satisfies a condition"""
+    condition = query_value(condition)
+    if not (isinstance(condition, dict) and len(condition) > 0
+            and all(key.startswith('$') for key in condition)):
+        return any(equal_values(value, condition) for value in candidates(values)
+                   if value is not missing)
+
+    present = [value for value in values if value is not missing]
+    for op, arg in condition.items():
+        arg = query_value(arg)
+        if op == '$eq':
+            result = any(equal_values(value, arg) for value in candidates(present))
+        elif op == '$ne':
+            result = not match_condition(values, arg)
+        elif op in ('$gt', '$gte', '$lt', '$lte'):
+            result = any(compare_values(value, arg, op) for value in candidates(present))
+        elif op == '$in':
+            result = any(match_condition(values, item) for item in arg)
+        elif op == '$nin':
+            result = not any(match_condition(values, item) for item in arg)
+        elif op == '$exists':
+            result = (len(present) > 0) == bool(arg)
+        elif op == '$regex':
+            flags = 0
+            for option in condition.get('$options', ''):
+                flags |= {'i': re.IGNORECASE, 'm': re.MULTILINE,
+                          's': re.DOTALL, 'x': re.VERBOSE}[option]
+            pattern = re.compile(arg, flags)
+            result = any(isinstance(value, str) and pattern.search(value) is not None
+                         for value in candidates(present))
+        elif op == '$options':
+            continue
+        elif op == '$not':
+            result = not match_condition(values, arg)
+        elif op == '$all':
+            result = all(match_condition(values, item) for item in arg)
+        elif op == '$size':
+            result = any(isinstance(value, list) and len(value) == arg
+                         for value in present)
+        elif op == '$elemMatch':
+            result = any(isinstance(item, dict) and mongo_match(item, arg)
+                         or not isinstance(item, dict) and match_condition([item], arg)
+                         for value in present if isinstance(value, list)
+                         for item in value)
+        else:
+            raise ValueError(f'unsupported query operator {op}')
+        if not result:
+            return False
+    return True
+
+def parse_multipart(body: bytes, content_type: str) -> tuple:
+    """
+    Parses a multipart/form-data request body.
+
+    Parameters
+    ----------
+    body : bytes
+        The request body.
+    content_type : str
+        The Content-Type header, which contains the boundary.
+
+    Returns
+    -------
+    fields : dict
+        The values of the parts without file names.
+    files : dict
+        The (filename, content) of the parts with file names.
+    """
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if match is None:
+        return {}, {}
+    delimiter = b'--' + match.group(1).encode('latin-1')
+
+    fields = {}
+    files = {}
+    for part in body.split(delimiter)[1:-1]:
+        head, _, content = part[2:].partition(b'\r\n\r\n')
+        content = content[:-2]
+        disposition = ''
+        for line in head.decode('utf-8').split('\r\n'):
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-disposition':
+                disposition = value
+        name = re.search(r'\bname="([^"]*)"', disposition)
+        filename = re.search(r'\bfilename="([^"]*)"', disposition)
+        if name is None:
+            continue
+        if filename is None:
+            fields[name.group(1)] = content.decode('utf-8')
+        else:
+            files[name.group(1)] = (filename.group(1), content)
+    return fields, files
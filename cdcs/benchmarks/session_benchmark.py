@@ -0,0 +1,94 @@
+# Standard library imports
+import argparse
+import time
+from typing import Optional
+
+# http://docs.python-requests.org
+import requests
+
+# Local imports
+from .. import RestClient
+from .server import StandInServer, StandInStore
+
+def time_calls(call, ncalls: int) -> dict:
+    """
+    Times repeated calls to a function.
+
+    Parameters
+    ----------
+    call : callable
+        Function taking no arguments that performs one REST call.
+    ncalls : int
+        The number of times to perform the call.
+
+    Returns
+    -------
+    dict
+        The total, mean and min per-call times in seconds.
+    """
+    times = []
+    for i in range(ncalls):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return {
+        'total': sum(times),
+        'mean': sum(times) / ncalls,
+        'min': min(times),
+    }
+
+def run(ncalls: int = 500,
+        url: Optional[str] = None) -> dict:
+    """
+    Compares per-call latency of unpooled requests.request() calls, i.e. the
+    behavior before RestClient had a session, to RestClient's pooled session.
+
+    Parameters
+    ----------
+    ncalls : int, optional
+        The number of calls to time for each case.  Default value is 500.
+    url : str, optional
+        The host url to benchmark against.  If not given, a local stand-in
+        server will be started and used.
+
+    Returns
+    -------
+    dict
+        The timing results for the 'unpooled' and 'pooled' cases.
+    """
+    server = None
+    if url is None:
+        server = StandInServer(StandInStore()).start()
+        url = server.url
+    rest_url = '/rest/data/'
+
+    try:
+        results = {}
+        results['unpooled'] = time_calls(
+            lambda: requests.request('get', url + rest_url), ncalls)
+        with RestClient(url, username='') as client:
+            results['pooled'] = time_calls(
+                lambda: client.get(rest_url), ncalls)
+    finally:
+        if server is not None:
+            server.close()
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare pooled and unpooled RestClient call latency')
+    parser.add_argument('-n', '--ncalls', type=int, default=500,
+                        help='number of calls per case')
+    parser.add_argument('--url', default=None,
+                        help='host to benchmark against instead of a local server')
+    args = parser.parse_args()
+
+    results = run(ncalls=args.ncalls, url=args.url)
+    for case, r in results.items():
+        print(f"{case:>10}: mean {1000*r['mean']:.3f} ms, min {1000*r['min']:.3f} ms, total {r['total']:.3f} s")
+    speedup = results['unpooled']['mean'] / results['pooled']['mean']
+    print(f'speedup: {speedup:.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+# Standard library imports
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+# Local imports
+from .. import CDCS
+from ..CDCS._query import format_query_records
+from .import_benchmark import measure as measure_import
+from .postprocess_benchmark import synthetic_records
+from .server import StandInServer, StandInStore, synthetic_xml
+
+MiB = 1048576
+
+# Problem sizes of the quick and full runs
+sizes = {
+    'quick': {
+        'query_records': (100, 1000),
+        'record_sizes': (1024,),
+        'template_versions': (50,),
+        'upload_records': (50,),
+        'assign_records': (50,),
+        'blob_sizes': (1 * MiB, 16 * MiB),
+        'postprocess_rows': (10000,),
+        'max_workers': (1, 8),
+    },
+    'full': {
+        'query_records': (1000, 10000),
+        'record_sizes': (1024, 32768),
+        'template_versions': (50, 500),
+        'upload_records': (500,),
+        'assign_records': (500,),
+        'blob_sizes': (1 * MiB, 64 * MiB, 512 * MiB),
+        'postprocess_rows': (10000, 100000, 1000000),
+        'max_workers': (1, 8),
+    },
+}
+
+benchmarks = {}
+
+def register(name: str) -> Callable:
+    """
+    Decorator that adds a benchmark function to the suite.  Benchmark
+    functions take the run config dict and return a list of case results.
+    """
+    def decorator(func):
+        benchmarks[name] = func
+        return func
+    return decorator
+
+def stand_in(config: dict, store: StandInStore) -> StandInServer:
+    """Creates a stand-in server for a store using the run config"""
+    return StandInServer(store, latency=config['latency'],
+                         bandwidth=config['bandwidth'],
+                         page_size=config['page_size'])
+
+def client(server: StandInServer) -> CDCS:
+    """Creates a CDCS client for a stand-in server"""
+    return CDCS(server.url, username='')
+
+def measure(name: str,
+            params: dict,
+            func: Callable,
+            repeat: int,
+            setup: Optional[Callable] = None,
+            items: Optional[int] = None,
+            nbytes: Optional[int] = None) -> dict:
+    """
+    Times repeated calls to a function.
+
+    Parameters
+    ----------
+    name : str
+        The benchmark name.
+    params : dict
+        The parameters of the benchmark case.
+    func : callable
+        The function to time, called without arguments.
+    repeat : int
+        The number of times to call func.
+    setup : callable, optional
+        A function that is called before each call to func and not timed.
+    items : int, optional
+        The number of items, e.g. records, handled by each call.
+    nbytes : int, optional
+        The number of bytes transferred by each call.
+
+    Returns
+    -------
+    dict
+        The case name, params, individual times and their min, median and
+        mean, and the items and bytes per second based on the median.
+    """
+    times = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarize(name, params, times, items=items, nbytes=nbytes)
+
+def summarize(name: str,
+              params: dict,
+              times: list,
+              items: Optional[int] = None,
+              nbytes: Optional[int] = None) -> dict:
+    """
+    Builds the result of a benchmark case from its times.  See measure() for
+    parameter and return descriptions.
+    """
+    median = statistics.median(times)
+    case = name + '[' + ','.join(f'{key}={value}' for key, value in params.items()) + ']'
+    result = {'benchmark': name, 'case': case, 'params': params,
+              'times': times, 'min': min(times), 'median': median,
+              'mean': statistics.mean(times),
+              'items': items, 'items_per_second': None,
+              'bytes': nbytes, 'bytes_per_second': None}
+    if items is not None and median > 0:
+        result['items_per_second'] = items / median
+    if nbytes is not None and median > 0:
+        result['bytes_per_second'] = nbytes / median
+    return result
+
+@register('query')
+def query_benchmark(config: dict) -> list:
+    """Paginated query() for different record counts, sizes and workers"""
+    results = []
+    for size in config['sizes']['record_sizes']:
+        for count in config['sizes']['query_records']:
+            store = StandInStore()
+            manager = store.add_template('benchmark')
+            store.add_records(int(manager['current']), count, size=size)
+            with stand_in(config, store) as server:
+                curator = client(server)
+                for workers in config['sizes']['max_workers']:
+                    def call():
+                        records = curator.query(template='benchmark',
+                                                progress_bar=False,
+                                                max_workers=workers)
+                        assert len(records) == count
+                    results.append(measure(
+                        'query', {'records': count, 'size': size,
+                                  'max_workers': workers},
+                        call, config['repeat'], items=count,
+                        nbytes=count * size))
+    return results
+
+@register('get_templates')
+def get_templates_benchmark(config: dict) -> list:
+    """get_templates() of all versions of templates with many versions"""
+    results = []
+    for versions in config['sizes']['template_versions']:
+        store = StandInStore()
+        for i in range(5):
+            store.add_template(f'benchmark-{i}', versions=versions)
+        with stand_in(config, store) as server:
+            curator = client(server)
+            for workers in config['sizes']['max_workers']:
+                def call():
+                    templates = curator.get_templates(current=False,
+                                                      use_cache=False,
+                                                      max_workers=workers)
+                    assert len(templates) == 5 * versions
+                results.append(measure(
+                    'get_templates', {'versions': 5 * versions,
+                                      'max_workers': workers},
+                    call, config['repeat'], items=5 * versions))
+    return results
+
+@register('upload_records')
+def upload_records_benchmark(config: dict) -> list:
+    """Bulk upload_records() with duplicate checking"""
+    results = []
+    for count in config['sizes']['upload_records']:
+        store = StandInStore()
+        store.add_template('benchmark')
+        records = [(f'record-{i}', synthetic_xml(f'record-{i}'))
+                   for i in range(count)]
+        with stand_in(config, store) as server:
+            curator = client(server)
+            for workers in config['sizes']['max_workers']:
+                def call():
+                    uploaded = curator.upload_records('benchmark', records,
+                                                      max_workers=workers,
+                                                      progress_bar=False)
+                    assert (uploaded.status == 'uploaded').all()
+                results.append(measure(
+                    'upload_records', {'records': count, 'max_workers': workers},
+                    call, config['repeat'], setup=store.clear_records, items=count))
+    return results
+
+@register('assign_records')
+def assign_records_benchmark(config: dict) -> list:
+    """assign_records() of many records by id"""
+    results = []
+    for count in config['sizes']['assign_records']:
+        store = StandInStore()
+        manager = store.add_template('benchmark')
+        ids = [record['id'] for record in
+               store.add_records(int(manager['current']), count, size=256)]
+        workspace = store.add_workspace('benchmark')
+        with stand_in(config, store) as server:
+            curator = client(server)
+            for workers in config['sizes']['max_workers']:
+                def call():
+                    assigned = curator.assign_records('benchmark', ids=ids,
+                                                      max_workers=workers)
+                    assert len(assigned) == count
+                results.append(measure(
+                    'assign_records', {'records': count, 'max_workers': workers},
+                    call, config['repeat'], items=count))
+    return results
+
+@register('blobs')
+def blobs_benchmark(config: dict) -> list:
+    """upload_blob() and download_blob() of files of different sizes"""
+    results = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        for size in config['sizes']['blob_sizes']:
+            filename = Path(tempdir, f'blob-{size}.bin')
+            write_blob_file(filename, size)
+
+            store = StandInStore()
+            with stand_in(config, store) as server:
+                curator = client(server)
+                results.append(measure(
+                    'upload_blob', {'size': size},
+                    lambda: curator.upload_blob(filename), config['repeat'],
+                    nbytes=size))
+
+                blob = store.add_blob(filename.name, filename.read_bytes())
+                savedir = Path(tempdir, 'downloads')
+                savedir.mkdir(exist_ok=True)
+                for workers in (1, 4):
+                    def call():
+                        path = curator.download_blob(id=blob['id'],
+                                                     savedir=savedir,
+                                                     use_cache=False,
+                                                     range_workers=workers)
+                        path.unlink()
+                    results.append(measure(
+                        'download_blob', {'size': size, 'range_workers': workers},
+                        call, config['repeat'], nbytes=size))
+            filename.unlink()
+    return results
+
+@register('postprocess')
+def postprocess_benchmark(config: dict) -> list:
+    """DataFrame post-processing of query results"""
+    results = []
+    for rows in config['sizes']['postprocess_rows']:
+        records, templates = synthetic_records(rows)
+        results.append(measure(
+            'postprocess', {'rows': rows},
+            lambda: format_query_records(records.copy(), templates),
+            config['repeat'], items=rows))
+    return results
+
+@register('import')
+def import_benchmark(config: dict) -> list:
+    """Importing cdcs in a fresh interpreter"""
+    times = [measure_import()['seconds'] for i in range(config['repeat'])]
+    return [summarize('import', {'module': 'cdcs'}, times)]
+
+def write_blob_file(filename: Path, size: int):
+    """Writes a file of pseudo-random bytes without holding it all in memory"""
+    block = os.urandom(min(size, MiB))
+    with open(filename, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+def pycdcs_version() -> str:
+    """Gives the installed pycdcs version, or 'unknown' for uninstalled source trees"""
+    try:
+        from .. import __version__
+    except ImportError:
+        return 'unknown'
+    return __version__
+
+def run(names: Optional[list] = None,
+        quick: bool = False,
+        latency: float = 0,
+        bandwidth: Optional[float] = None,
+        repeat: int = 3,
+        page_size: int = 10,
+        blob_sizes: Optional[list] = None,
+        verbose: bool = False) -> dict:
+    """
+    Runs benchmarks of pycdcs against local stand-in servers.
+
+    Parameters
+    ----------
+    names : list, optional
+        The names of the benchmarks to run.  Default value runs all of them.
+    quick : bool, optional
+        If True, smaller problem sizes are used.  Default value is False.
+    latency : float, optional
+        The seconds the stand-in servers wait before handling each request.
+        Default value is 0.
+    bandwidth : float, optional
+        The bytes per second that the stand-in servers limit the transfer of
+        each request and response body to.  Default value of None does not
+        limit transfers.
+    repeat : int, optional
+        The number of times each case is timed.  Default value is 3.
+    page_size : int, optional
+        The page size of paginated responses.  Default value is 10.
+    blob_sizes : list, optional
+        The blob sizes in bytes to use instead of the default ones.  The
+        largest default size is 512 MiB since the stand-in server holds blobs
+        in memory; use this to time 1-2 GiB transfers on machines with the
+        memory for them.
+    verbose : bool, optional
+        If True, each case result is printed as it completes.
+
+    Returns
+    -------
+    dict
+        The run metadata and config, and the list of case results.
+    """
+    if names is None:
+        names = list(benchmarks)
+    for name in names:
+        if name not in benchmarks:
+            raise ValueError(f'unknown benchmark {name}')
+
+    config = {'quick': quick, 'latency': latency, 'bandwidth': bandwidth,
+              'repeat': repeat, 'page_size': page_size,
+              'sizes': dict(sizes['quick' if quick else 'full'])}
+    if blob_sizes is not None:
+        config['sizes']['blob_sizes'] = tuple(blob_sizes)
+
+    results = []
+    for name in names:
+        for result in benchmarks[name](config):
+            if verbose:
+                print(format_result(result), flush=True)
+            results.append(result)
+
+    return {'metadata': {'pycdcs': pycdcs_version(),
+                         'python': platform.python_version(),
+                         'platform': platform.platform(),
+                         'timestamp': datetime.now(timezone.utc).isoformat()},
+            'config': config,
+            'results': results}
+
+def compare(base: dict, new: dict, threshold: float = 0.1) -> list:
+    """
+    Compares the median times of the cases of two benchmark runs.
+
+    Parameters
+    ----------
+    base : dict
+        The results of the reference run.
+    new : dict
+        The results of the run to check.
+    threshold : float, optional
+        The relative change of the median time above which a case is
+        considered a regression or an improvement.  Default value is 0.1.
+
+    Returns
+    -------
+    list
+        One dict for each case in both runs with the case name, the base and
+        new median times, their ratio and the status 'regression',
+        'improvement' or 'unchanged'.
+    """
+    base_cases = {result['case']: result for result in base['results']}
+    comparisons = []
+    for result in new['results']:
+        if result['case'] not in base_cases:
+            continue
+        old = base_cases[result['case']]['median']
+        ratio = result['median'] / old if old > 0 else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'unchanged'
+        comparisons.append({'case': result['case'], 'base': old,
+                            'new': result['median'], 'ratio': ratio,
+                            'status': status})
+    return comparisons
+
+def format_result(result: dict) -> str:
+    """Formats a case result as one line of text"""
+    line = f"{result['case']:<60} median {result['median']:9.4f} s"
+    if result['items_per_second'] is not None:
+        line += f", {result['items_per_second']:12.1f} items/s"
+    if result['bytes_per_second'] is not None:
+        line += f", {result['bytes_per_second'] / MiB:9.2f} MiB/s"
+    return line
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark pycdcs against local stand-in CDCS servers')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('names', nargs='*',
+                            help='benchmarks to run, default runs all')
+    run_parser.add_argument('--quick', action='store_true',
+                            help='use smaller problem sizes')
+    run_parser.add_argument('--latency', type=float, default=0,
+                            help='seconds of server latency per request')
+    run_parser.add_argument('--bandwidth', type=float, default=None,
+                            help='server bandwidth limit in MiB/s')
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='times to run each case')
+    run_parser.add_argument('--page-size', type=int, default=10,
+                            help='page size of paginated responses')
+    run_parser.add_argument('--blob-sizes', type=float, nargs='+', default=None,
+                            help='blob sizes in MiB, e.g. 1024 2048 for GiB transfers')
+    run_parser.add_argument('--output', '-o', default=None,
+                            help='JSON file to save the results to')
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='compare two saved runs, exits with 1 on regressions')
+    compare_parser.add_argument('base', help='JSON results of the reference run')
+    compare_parser.add_argument('new', help='JSON results of the run to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='relative change counted as a regression')
+
+    subparsers.add_parser('list', help='list the benchmarks')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, func in benchmarks.items():
+            print(f'{name:<16} {func.__doc__}')
+        return 0
+
+    if args.command == 'compare':
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        comparisons = compare(base, new, threshold=args.threshold)
+        for c in comparisons:
+            print(f"{c['case']:<60} {c['base']:9.4f} s -> {c['new']:9.4f} s "
+                  f"({c['ratio']:5.2f}x) {c['status']}")
+        return 1 if any(c['status'] == 'regression' for c in comparisons) else 0
+
+    bandwidth = args.bandwidth * MiB if args.bandwidth is not None else None
+    blob_sizes = None
+    if args.blob_sizes is not None:
+        blob_sizes = [int(size * MiB) for size in args.blob_sizes]
+    results = run(args.names if len(args.names) > 0 else None,
+                  quick=args.quick, latency=args.latency, bandwidth=bandwidth,
+                  repeat=args.repeat, page_size=args.page_size,
+                  blob_sizes=blob_sizes, verbose=True)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
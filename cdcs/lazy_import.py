@@ -0,0 +1,37 @@
+# Standard library imports
+import importlib
+import sys
+from types import ModuleType
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a module that is imported the first time one of its
+    attributes is accessed.  The attributes of the imported module are then
+    copied so that later lookups are as fast as for the module itself.
+    """
+    def __getattr__(self, name: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Gives a module that is only imported when first used.  This keeps
+    heavy dependencies from slowing down the import of cdcs.  Note that
+    annotations using the module must not be evaluated at definition time,
+    i.e. modules using it should import annotations from __future__.
+
+    Parameters
+    ----------
+    name : str
+        The full name of the module.
+
+    Returns
+    -------
+    module
+        The module if it has already been imported, otherwise a LazyModule.
+    """
+    module = sys.modules.get(name, None)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -50,9 +50,18 @@ def blob_responses(host, version=3):
     responses.add(responses.PATCH, f'{host}/rest/blob/2/assign/1',
                   json={}, status=200)
 
-    # Get blob contents
-    responses.add(responses.GET, f'{host}/rest/blob/download/1',
-                  body=blob_content, status=200)
+    # Get blob contents, supporting Range headers
+    def download_callback(request):
+        byterange = request.headers.get('Range')
+        if byterange is None:
+            return (200, {}, blob_content)
+        first, last = byterange[len('bytes='):].split('-')
+        first = int(first)
+        last = int(last) if last != '' else len(blob_content) - 1
+        headers = {'Content-Range': f'bytes {first}-{last}/{len(blob_content)}'}
+        return (206, headers, blob_content[first:last + 1])
+    responses.add_callback(responses.GET, f'{host}/rest/blob/download/1',
+                           callback=download_callback)
 
     # Delete blob contents
     responses.add(responses.DELETE, f'{host}/rest/blob/1',
@@ -0,0 +1,67 @@
+import hashlib
+from multiprocessing import Pool
+from pathlib import Path
+
+from cdcs import BlobCache
+
+def store(args):
+    path, i = args
+    cache = BlobCache(path)
+    cache.set(f'key{i % 4}', f'contents {i % 4}'.encode())
+    return cache.get(f'key{i % 4}')
+
+def test_blob_cache(tmpdir):
+
+    cache = BlobCache(Path(tmpdir, 'cache'), max_size=20)
+    assert cache.get('a') is None
+
+    # Test contents are stored by hash and shared between keys
+    path = cache.set('a', b'0123456789')
+    assert path.name == hashlib.sha256(b'0123456789').hexdigest()
+    cache.set('b', [b'01234', b'56789'])
+    assert cache.get('a') == cache.get('b') == b'0123456789'
+    assert len(cache) == 2
+    assert cache.size == 10
+
+    # Test least recently used entries are evicted
+    cache.set('c', b'abcdefghij')
+    cache.get('a')
+    cache.set('d', b'ABCDEFGHIJ')
+    assert cache.get('c') is None
+    assert cache.get('a') == b'0123456789'
+    assert cache.size == 20
+
+    # Test link methods
+    for method in ['copy', 'hardlink', 'reflink']:
+        target = Path(tmpdir, method)
+        assert cache.link('d', target, method=method) == target
+        assert target.read_bytes() == b'ABCDEFGHIJ'
+    assert cache.link('c', Path(tmpdir, 'missing')) is None
+
+    # Test validation removes corrupted contents
+    objpath = cache.get_path('d')
+    objpath.chmod(0o644)
+    objpath.write_bytes(b'corrupted!')
+    assert cache.validate() == 1
+    assert cache.get('d') is None
+    assert cache.get('a') == b'0123456789'
+
+    # Test expiration
+    cache.max_age = 0
+    assert cache.get('a') is None
+    cache.max_age = None
+    cache.set('a', b'0123456789')
+    cache.max_age = 0
+    assert cache.expire() == 1
+    assert len(cache) == 0
+
+def test_blob_cache_processes(tmpdir):
+
+    # Test that multiple processes can share a cache
+    path = Path(tmpdir, 'cache')
+    BlobCache(path)
+    with Pool(4) as pool:
+        results = pool.map(store, [(path, i) for i in range(16)])
+    for i, result in enumerate(results):
+        assert result == f'contents {i % 4}'.encode()
+    assert len(BlobCache(path)) == 4
@@ -0,0 +1,68 @@
+import requests
+import responses
+from pytest import raises
+
+from cdcs import MetricsRegistry, RestClient, RetryPolicy
+from cdcs.MetricsRegistry import normalize_route
+
+host = 'https://fakeurl.fake'
+
+def test_normalize_route():
+    assert normalize_route(f'{host}/rest/data/5f3c2e1a9b8d7c6e5f4a3b2c/') == '/rest/data/{id}/'
+    assert normalize_route('/rest/blob/download/12/?page=2') == '/rest/blob/download/{id}/'
+    assert normalize_route('/rest/template-version-manager/global/') == '/rest/template-version-manager/global/'
+    assert normalize_route('/rest/workspace/123e4567-e89b-12d3-a456-426614174000/') == '/rest/workspace/{id}/'
+
+@responses.activate
+def test_metrics():
+    metrics = MetricsRegistry(latency_buckets=(1, 60), size_buckets=(10, 1000))
+    policy = RetryPolicy(sleep=lambda seconds: None)
+    client = RestClient(host=host, username='', metrics=metrics,
+                        retry_policy=policy)
+    assert client.metrics is metrics
+
+    events = []
+    client.add_hook('pre_request', events.append)
+    client.add_hook('retry', events.append)
+    with raises(ValueError):
+        client.add_hook('response', events.append)
+
+    responses.add(responses.GET, f'{host}/rest/data/1/', status=503)
+    responses.add(responses.GET, f'{host}/rest/data/1/', json={'id': 1})
+    responses.add(responses.GET, f'{host}/rest/data/2/', json={'id': 2})
+    responses.add(responses.POST, f'{host}/rest/data/', body='created', status=201)
+    client.get('rest/data/1/')
+    client.get('rest/data/2/')
+    client.post('rest/data/', data=b'<a>1</a>')
+
+    assert [event['event'] for event in events] == ['pre_request', 'retry',
+                                                    'pre_request', 'pre_request',
+                                                    'pre_request']
+    assert events[1]['response'].status_code == 503
+
+    values = metrics.to_dict()
+    assert list(values) == ['GET /rest/data/{id}/', 'POST /rest/data/']
+    get = values['GET /rest/data/{id}/']
+    assert get['calls'] == 3
+    assert get['errors'] == 1
+    assert get['statuses'] == {'503': 1, '200': 2}
+    assert get['retries'] == {'503': 1}
+    assert get['latency']['buckets'] == {'1.0': 3, '60.0': 3, '+Inf': 3}
+    post = values['POST /rest/data/']
+    assert post['request_bytes']['sum'] == 8
+    assert post['response_bytes']['buckets'] == {'10.0': 1, '1000.0': 1, '+Inf': 1}
+
+    text = metrics.to_prometheus()
+    assert 'cdcs_requests_total{method="GET",route="/rest/data/{id}/",status="200"} 2' in text
+    assert 'cdcs_request_retries_total{method="GET",route="/rest/data/{id}/",reason="503"} 1' in text
+    assert 'cdcs_request_duration_seconds_count{method="POST",route="/rest/data/"} 1' in text
+
+    # Hooks can be removed and errors are recorded by exception name
+    client.remove_hook('pre_request', events.append)
+    with raises(requests.ConnectionError):
+        client.post('rest/missing/')
+    assert len(events) == 5
+    assert metrics.to_dict()['POST /rest/missing/']['statuses'] == {'ConnectionError': 1}
+
+    metrics.reset()
+    assert metrics.to_dict() == {}
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import requests
+import responses
+from pytest import raises
+
+from cdcs import RateLimiter, RestClient
+from cdcs.RateLimiter import endpoint_class
+
+host = 'https://fakeurl.fake'
+
+def test_endpoint_class():
+    assert endpoint_class('get', f'{host}/rest/blob/download/1/') == 'blob'
+    assert endpoint_class('post', '/rest/blob/') == 'blob'
+    assert endpoint_class('post', f'{host}/pid/rest/upload-blob-pid') == 'blob'
+    assert endpoint_class('post', f'{host}/rest/data/query/') == 'query'
+    assert endpoint_class('patch', '/rest/data/1/') == 'write'
+    assert endpoint_class('get', '/rest/data/1/') == 'read'
+
+def test_settings():
+    limiter = RateLimiter(rate=10, max_in_flight=4,
+                          limits={'blob': {'max_in_flight': 2}},
+                          hosts={f'{host}/': {'blob': {'rate': 1}}})
+    assert limiter.settings(host, 'read') == {'rate': 10, 'burst': None, 'max_in_flight': 4}
+    assert limiter.settings(host, 'blob') == {'rate': 1, 'burst': None, 'max_in_flight': 2}
+    assert limiter.settings('https://other.fake', 'blob')['rate'] == 10
+    assert limiter.state(host, 'read')['burst'] == 10
+
+def test_rate():
+    waits = []
+    limiter = RateLimiter(rate=2, burst=2, sleep=waits.append)
+    for i in range(4):
+        limiter.acquire(host, 'get', '/rest/data/').release(200)
+
+    # The burst is sent at once, later calls wait for tokens
+    assert waits[0] > 0.4
+    assert waits[1] > 0.9
+    assert len(waits) == 2
+
+def test_max_in_flight():
+    limiter = RateLimiter(max_in_flight=2, adaptive=False)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def call(i):
+        slot = limiter.acquire(host, 'get', '/rest/data/')
+        with lock:
+            active.append(i)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(i)
+        slot.release(200)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(call, range(12)))
+    assert max(peak) == 2
+    assert limiter.state(host, 'read')['in_flight'] == 0
+
+def test_adaptive():
+    limiter = RateLimiter(max_in_flight=8, slow_latency=1)
+    slot = limiter.acquire(host, 'post', '/rest/data/query/')
+    slot.release(503)
+    slot.release(503)
+    state = limiter.state(host, 'query')
+    assert state['limit'] == 4
+    assert state['congested'] == 1
+    assert state['in_flight'] == 0
+
+    # Slow responses shrink, full rounds of good responses grow
+    limiter.acquire(host, 'post', '/rest/data/query/').release(200, latency=2)
+    assert limiter.state(host, 'query')['limit'] == 2
+    for i in range(2):
+        limiter.acquire(host, 'post', '/rest/data/query/').release(200, latency=0.1)
+    assert limiter.state(host, 'query')['limit'] == 3
+
+    # Other endpoint classes are not affected
+    assert limiter.state(host, 'read')['limit'] == 8
+
+def test_adaptive_burst():
+    limiter = RateLimiter(max_in_flight=8)
+    slots = [limiter.acquire(host, 'get', '/rest/data/') for i in range(8)]
+
+    # Concurrent congested responses only back off once
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda slot: slot.release(429), slots))
+    state = limiter.state(host, 'read')
+    assert state['limit'] == 4
+    assert state['congested'] == 8
+
+    # Calls sent after the decrease can decrease it again
+    limiter.acquire(host, 'get', '/rest/data/').release(429)
+    assert limiter.state(host, 'read')['limit'] == 2
+
+@responses.activate
+def test_rest_client():
+    limiter = RateLimiter(max_in_flight=4)
+    client = RestClient(host=host, username='', rate_limiter=limiter,
+                        retry_policy=False)
+    assert client.rate_limiter is limiter
+
+    responses.add(responses.GET, f'{host}/rest/data/', status=429)
+    responses.add(responses.GET, f'{host}/rest/blob/download/1/', body=b'contents')
+    assert client.get('rest/data/', checkstatus=False).status_code == 429
+    assert limiter.state(host, 'read')['limit'] == 2
+
+    # Streamed responses keep their slot until closed
+    response = client.get('rest/blob/download/1/', stream=True)
+    assert limiter.state(host, 'blob')['in_flight'] == 1
+    with response:
+        assert response.content == b'contents'
+    assert limiter.state(host, 'blob')['in_flight'] == 0
+
+    # Slots are freed when sending fails
+    with raises(requests.ConnectionError):
+        client.get('rest/missing/')
+    assert limiter.state(host, 'read')['in_flight'] == 0
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from cdcs import date_parser, date_column_parser
+
+def test_date_column_parser():
+
+    df = pd.DataFrame({'date': ['2021-08-26T13:44:21.922000Z',
+                                '2021-08-26T13:44:22Z',
+                                '2022-02-18 15:48:26+00:00']})
+
+    # Test values match parsing row by row
+    expected = df.apply(date_parser, args=['date'], axis=1)
+    parsed = date_column_parser(df.date)
+    for i in range(len(df)):
+        assert parsed[i] == expected[i]
+        assert isinstance(parsed[i], pd.Timestamp)
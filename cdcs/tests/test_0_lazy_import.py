@@ -0,0 +1,16 @@
+import sys
+
+from cdcs.lazy_import import LazyModule, lazy_import
+
+def test_lazy_import():
+    # Already imported modules are returned as is
+    assert lazy_import('sys') is sys
+
+    sys.modules.pop('colorsys', None)
+    module = lazy_import('colorsys')
+    assert isinstance(module, LazyModule)
+    assert 'colorsys' not in sys.modules
+
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert 'colorsys' in sys.modules
+    assert module.rgb_to_hsv is sys.modules['colorsys'].rgb_to_hsv
@@ -0,0 +1,71 @@
+import asyncio
+import responses
+from cdcs import CDCS, ExecutorCDCS, ExecutorRestClient
+from pytest import raises
+
+from mock_database import *
+
+class TestExecutorCDCS():
+    
+    @property
+    def host(self):
+        """str: A fake host url for testing"""
+        return 'https://fakeurl.fake'
+
+    def test_executor_rest_client(self):
+        """Tests ExecutorRestClient calls and concurrency limits"""
+
+        async def main():
+            async with ExecutorRestClient(host=self.host, username='',
+                                       max_concurrency=2) as client:
+                assert client.client.session.get_adapter(self.host)._pool_maxsize == 2
+                responses_ = await asyncio.gather(*[client.get('rest/data/')
+                                                    for i in range(5)])
+                return [r.json() for r in responses_]
+
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, f'{self.host}/rest/data/', json={'value': 'good!'})
+            assert asyncio.run(main()) == [{'value': 'good!'}] * 5
+            assert len(rsps.calls) == 5
+
+        with raises(TypeError):
+            ExecutorRestClient(self.host, client=CDCS(self.host, username='',
+                                                   cdcsversion='3.0.0'))
+
+    @responses.activate
+    def test_executor_cdcs(self, tmpdir):
+        """Tests that ExecutorCDCS methods match CDCS methods"""
+
+        # Add Mock responses
+        template_manager_responses(self.host, 3)
+        template_responses(self.host, 3)
+        query_responses(self.host, 3)
+        record_responses(self.host, 3)
+        blob_responses(self.host, 3)
+        workspace_responses(self.host, 3)
+        cdcs = CDCS(self.host, username='', cdcsversion='3.0.0')
+
+        async def main():
+            async with ExecutorCDCS(client=cdcs, max_concurrency=4) as acdcs:
+                assert acdcs.cdcsversion == (3, 0, 0)
+                templates = await acdcs.get_templates()
+                records, first, blob = await asyncio.gather(
+                    acdcs.query(progress_bar=False),
+                    acdcs.get_records(template='first', progress_bar=False),
+                    acdcs.get_blob(filename='test_blob.txt'))
+                pages = [page async for page in acdcs.iter_query(by_page=True)]
+                contents = b''.join([chunk async for chunk in
+                                     acdcs.iter_blob_contents(blob=blob, chunk_size=5)])
+                titles, workspace = await asyncio.gather(acdcs.template_titles(),
+                                                         acdcs.global_workspace())
+                return templates, records, first, pages, contents, titles, workspace
+
+        templates, records, first, pages, contents, titles, workspace = asyncio.run(main())
+        assert templates.equals(cdcs.get_templates())
+        assert records.equals(cdcs.query(progress_bar=False))
+        assert first.equals(cdcs.get_records(template='first', progress_bar=False))
+        assert sum(len(page) for page in pages) == 12
+        assert contents == b'This is my blob for testing'
+        assert titles == cdcs.template_titles
+        assert workspace.equals(cdcs.global_workspace)
+        assert ExecutorCDCS.query.__doc__ == CDCS.query.__doc__
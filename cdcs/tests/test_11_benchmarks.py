@@ -0,0 +1,70 @@
+import json
+
+from pytest import raises
+
+from cdcs.benchmarks import import_benchmark, session_benchmark, suite
+from cdcs.benchmarks.server import StandInServer, StandInStore
+
+def test_stand_in_server():
+    store = StandInStore()
+    manager = store.add_template('bench', versions=3)
+    store.add_records(int(manager['current']), 15, size=200)
+    blob = store.add_blob('file.bin', bytes(range(256)))
+
+    with StandInServer(store, page_size=4) as server:
+        curator = suite.client(server)
+        assert curator.cdcsversion[0] == 3
+        assert len(curator.query(template='bench', progress_bar=False)) == 15
+        assert len(curator.get_templates(current=False)) == 3
+        assert curator.get_blob(id=blob['id']).handle.startswith(server.url)
+
+        response = curator.get(f"/rest/blob/download/{blob['id']}/",
+                               headers={'Range': 'bytes=10-19'})
+        assert response.status_code == 206
+        assert response.content == bytes(range(10, 20))
+
+def test_suite(tmp_path, capsys):
+    results = suite.run(['postprocess', 'assign_records'], quick=True, repeat=1)
+    assert [r['case'] for r in results['results']] == [
+        'postprocess[rows=10000]',
+        'assign_records[records=50,max_workers=1]',
+        'assign_records[records=50,max_workers=8]']
+    with raises(ValueError):
+        suite.run(['missing'])
+
+    # Slower runs are flagged as regressions
+    slower = json.loads(json.dumps(results))
+    for result in slower['results']:
+        result['median'] *= 2
+    comparisons = suite.compare(results, slower, threshold=0.5)
+    assert set(c['status'] for c in comparisons) == {'regression'}
+
+    base = tmp_path / 'base.json'
+    new = tmp_path / 'new.json'
+    base.write_text(json.dumps(results))
+    new.write_text(json.dumps(slower))
+    assert suite.main(['compare', str(base), str(new)]) == 1
+    assert suite.main(['compare', str(base), str(base)]) == 0
+    assert 'unchanged' in capsys.readouterr().out
+
+def test_pycdcs_version(monkeypatch):
+    import importlib.metadata
+    import cdcs
+
+    # Uninstalled source trees have no package metadata
+    def version(name):
+        raise importlib.metadata.PackageNotFoundError(name)
+    monkeypatch.delattr(cdcs, '__version__', raising=False)
+    monkeypatch.setattr(importlib.metadata, 'version', version)
+    assert suite.pycdcs_version() == 'unknown'
+
+def test_import_benchmark():
+    result = import_benchmark.run(repeat=1, budget=None)
+    assert result['ok']
+    assert result['imported'] == []
+    assert len(result['slowest']) > 0
+
+def test_session_benchmark():
+    results = session_benchmark.run(ncalls=5)
+    assert set(results) == {'unpooled', 'pooled'}
+    assert results['pooled']['min'] > 0
@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import requests
+from pytest import raises
+
+from cdcs import CDCS, RateLimiter, RetryPolicy
+from cdcs.benchmarks.server import (StandInServer, StandInStore, mongo_match,
+                                    xml_to_dict)
+
+def content(name, value, extra=''):
+    return f'<root><name>{name}</name><value>{value}</value>{extra}</root>'
+
+def populated_store():
+    store = StandInStore()
+    manager = store.add_template('first', versions=2)
+    store.add_template('second')
+    for i in range(25):
+        store.add_record(int(manager['current']), f'record-{i}',
+                         content(f'record-{i}', i, '<tag>a</tag><tag>b</tag>' if i % 5 == 0 else ''))
+    return store
+
+def test_mongo_match():
+    document = {'title': 'doc', 'dict_content': xml_to_dict(
+        '<root id="7"><name>x</name><value>2.5</value><tag>a</tag><tag>b</tag></root>')}
+    assert document['dict_content'] == {'root': {'@id': 7, 'name': 'x', 'value': 2.5,
+                                                 'tag': ['a', 'b']}}
+    assert mongo_match(document, {})
+    assert mongo_match(document, {'dict_content.root.tag': 'b'})
+    assert mongo_match(document, {'dict_content.root.tag': {'$all': ['a', 'b'], '$size': 2}})
+    assert mongo_match(document, {'dict_content.root.value': {'$gte': 2, '$lt': 3}})
+    assert mongo_match(document, {'dict_content.root.@id': {'$in': [6, 7]}})
+    assert mongo_match(document, {'$or': [{'title': 'other'},
+                                          {'dict_content.root.name': {'$regex': '^X', '$options': 'i'}}]})
+    assert not mongo_match(document, {'dict_content.root.missing': {'$exists': True}})
+    assert not mongo_match(document, {'title': 'doc', 'dict_content.root.value': {'$ne': 2.5}})
+    with raises(ValueError):
+        mongo_match(document, {'$where': 'true'})
+
+    # Extended JSON dates are compared with the stored date strs
+    document = {'last_modification_date': '2024-05-01T12:00:00.000000Z'}
+    assert mongo_match(document, {'last_modification_date': {'$gt': {'$date': '2024-05-01T11:59:59Z'}}})
+    assert mongo_match(document, {'last_modification_date': {'$gte': {'$date': '2024-05-01T12:00:00Z'}}})
+    assert not mongo_match(document, {'last_modification_date': {'$gt': {'$date': '2024-05-01T12:00:00Z'}}})
+    assert mongo_match(document, {'last_modification_date': {'$date': '2024-05-01T12:00:00+00:00'}})
+    assert mongo_match(document, {'last_modification_date': {'$lt': {'$date': {'$numberLong': '1714600000000'}}}})
+    with raises(ValueError):
+        mongo_match(document, {'last_modification_date': {'$gt': {'$date': 'yesterday'}}})
+
+def test_records_and_queries():
+    with StandInServer(populated_store(), page_size=4) as server:
+        curator = CDCS(server.url, username='')
+
+        # Pagination over real sockets with parallel page fetching
+        records = curator.query(template='first', progress_bar=False, max_workers=4)
+        assert len(records) == 25
+        assert len(curator.query(template='first', page=7, progress_bar=False)) == 1
+        assert server.stats['connections'] <= 5
+
+        # Mongo-style and keyword queries
+        records = curator.query(template='first', progress_bar=False,
+                                mongoquery={'dict_content.root.value': {'$lt': 3}})
+        assert sorted(records.title) == ['record-0', 'record-1', 'record-2']
+        records = curator.query(template='first', progress_bar=False,
+                                mongoquery={'dict_content.root.tag': 'b'})
+        assert len(records) == 5
+        records = curator.query(template='first', keyword='record-24',
+                                progress_bar=False)
+        assert list(records.title) == ['record-24']
+        with raises(requests.HTTPError):
+            curator.query(mongoquery='{"$where": "1"}', progress_bar=False)
+
+        # Record updates and deletes
+        record = curator.get_record(title='record-3')
+        curator.update_record(record, content=content('record-3', 100))
+        records = curator.query(template='first', progress_bar=False,
+                                mongoquery={'dict_content.root.value': 100})
+        assert list(records.title) == ['record-3']
+        curator.delete_record(record)
+        assert len(curator.get_records(progress_bar=False)) == 24
+
+def test_sync_records(tmp_path):
+    store = populated_store()
+    with StandInServer(store, page_size=4) as server:
+        curator = CDCS(server.url, username='', record_cache=tmp_path / 'records.sqlite')
+        summary = curator.sync_records(template='first')
+        assert summary.updated.tolist() == [25]
+        assert summary['count'].tolist() == [25]
+
+        # Unchanged syncs store nothing
+        summary = curator.sync_records(template='first')
+        assert summary.updated.tolist() == [0]
+        assert summary.deleted.tolist() == [0]
+
+        # Changed and deleted records are found without the count changing
+        record = curator.get_record(title='record-3')
+        curator.update_record(record, content=content('record-3', 100))
+        curator.delete_record(curator.get_record(title='record-4'))
+        curator.upload_record(template='first', title='record-25',
+                              content=content('record-25', 25))
+        summary = curator.sync_records(template='first')
+        assert summary.updated.tolist() == [2]
+        assert summary.deleted.tolist() == [1]
+        assert summary['count'].tolist() == [25]
+
+        local = curator.query(template='first', local=True, parse_dates=False)
+        assert sorted(local.title) == sorted(record['title'] for record in store.records.values())
+        changed = curator.get_records(template='first', title='record-3', local=True)
+        assert changed.xml_content[0] == content('record-3', 100)
+
+def test_templates_xslts_and_pids():
+    with StandInServer(populated_store()) as server:
+        curator = CDCS(server.url, username='')
+
+        curator.upload_template(title='third', content='<xs:schema/>', filename='third.xsd')
+        assert sorted(curator.get_templates().title) == ['first', 'second', 'third']
+        curator.update_template(title='third', content='<xs:schema a="1"/>',
+                                filename='third.xsd')
+        assert curator.get_template(title='third').content == '<xs:schema a="1"/>'
+        assert len(curator.get_templates(title='third', current=False)) == 2
+
+        curator.upload_xslt(name='html', content='<xsl:stylesheet/>', filename='html.xsl')
+        assert list(curator.get_xslts().name) == ['html']
+        assert curator.transform_record(record_content='<a/>', xslt_name='html') == '<a/>'
+        curator.delete_xslt(name='html')
+        assert len(curator.get_xslts()) == 0
+
+        assert curator.auto_set_pid is True
+        with curator.auto_set_pid_off():
+            assert curator.auto_set_pid is False
+        curator.upload_pid_path('first', 'root.name')
+        assert curator.get_pid_path('first').path == 'root.name'
+        curator.delete_pid_path('first')
+        assert len(curator.get_pid_paths()) == 0
+
+def test_injected_errors_and_retries():
+    store = populated_store()
+    with StandInServer(store, retry_after=0.01) as server:
+        policy = RetryPolicy(backoff_factor=0.001)
+        curator = CDCS(server.url, username='', retry_policy=policy)
+
+        # Transient errors are retried, honoring Retry-After
+        server.inject_errors(503, count=2, path='/rest/data/query/')
+        assert len(curator.query(template='first', progress_bar=False)) == 25
+        server.wait_idle()
+        statuses = [status for method, path, status in server.requests
+                    if path == '/rest/data/query/']
+        assert statuses[:3] == [503, 503, 200]
+
+        # Writes are not retried unless idempotent
+        server.inject_errors(502, path='^/rest/data/$')
+        with raises(requests.HTTPError):
+            curator.upload_record('first', content=content('new', 1), title='new',
+                                  duplicatecheck=False)
+        assert 'new' not in [record['title'] for record in store.records.values()]
+
+    # Random errors at a given rate
+    with StandInServer(store, error_rate=0.5, error_statuses=(429,), seed=1) as server:
+        policy = RetryPolicy(total=10, backoff_factor=0.001)
+        curator = CDCS(server.url, username='', retry_policy=policy)
+        assert len(curator.get_records(progress_bar=False)) == 25
+        assert policy.counters['statuses'].get(429, 0) > 0
+
+def test_concurrency_and_bandwidth():
+    store = populated_store()
+    blob = store.add_blob('data.bin', bytes(200000))
+    with StandInServer(store, latency=0.02, bandwidth=1000000) as server:
+        limiter = RateLimiter(max_in_flight=2, adaptive=False)
+        curator = CDCS(server.url, username='', rate_limiter=limiter)
+        server.wait_idle()
+        server.reset_stats()
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda i: curator.get(f'/rest/data/{i + 1}/'), range(12)))
+        assert server.stats['max_in_flight'] == 2
+        assert server.stats['requests'] == 12
+
+        # Streamed downloads are limited by the bandwidth
+        start = time.perf_counter()
+        with curator.get(f"/rest/blob/download/{blob['id']}/", stream=True) as response:
+            assert sum(len(chunk) for chunk in response.iter_content(65536)) == 200000
+        assert time.perf_counter() - start >= 0.2
+        assert server.wait_idle()
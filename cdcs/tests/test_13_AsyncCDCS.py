@@ -0,0 +1,92 @@
+import asyncio
+from pytest import importorskip, raises
+
+from cdcs import AsyncCDCS, AsyncRestClient, CDCS, RetryPolicy
+from cdcs.benchmarks.server import StandInServer, StandInStore
+
+httpx = importorskip('httpx')
+
+def content(name, value):
+    return f'<root><name>{name}</name><value>{value}</value></root>'
+
+def populated_store():
+    store = StandInStore()
+    manager = store.add_template('first', versions=2)
+    old = manager['versions'][0]
+    store.add_template('second')
+    for i in range(23):
+        store.add_record(int(manager['current']), f'record-{i}', content(f'record-{i}', i))
+    for i in range(3):
+        store.add_record(int(old), f'old-record-{i}', content(f'old-record-{i}', i))
+    return store
+
+def test_async_rest_client():
+    with StandInServer(StandInStore()) as server:
+
+        async def main():
+            policy = RetryPolicy(exceptions=(httpx.TransportError,), backoff_factor=0)
+            async with AsyncRestClient(server.url, username='', max_concurrency=2,
+                                       retry_policy=policy) as client:
+                responses = await asyncio.gather(*[client.get('rest/core-settings/')
+                                                   for i in range(6)])
+                assert isinstance(client.client, httpx.AsyncClient)
+
+                # Failed calls are retried by the policy
+                server.inject_errors(503, count=2)
+                retried = await client.get('rest/core-settings/')
+
+                with raises(httpx.HTTPStatusError):
+                    await client.get('rest/missing/')
+                missing = await client.get('rest/missing/', checkstatus=False)
+            assert client.client is None
+            return responses, retried, missing, policy.counters
+
+        responses, retried, missing, counters = asyncio.run(main())
+        assert [r.status_code for r in responses] == [200] * 6
+        assert retried.json() == responses[0].json()
+        assert counters['statuses'] == {503: 2}
+        assert missing.status_code == 404
+        assert server.stats['max_in_flight'] <= 2
+        assert server.stats['connections'] <= 2
+
+def test_async_cdcs():
+    with StandInServer(populated_store(), page_size=5) as server:
+        curator = CDCS(server.url, username='')
+
+        async def main():
+            async with AsyncCDCS(server.url, username='', max_concurrency=3) as acdcs:
+                assert acdcs.cdcsversion == curator.cdcsversion
+                templates = await acdcs.get_templates()
+                records, first, older, count, mine = await asyncio.gather(
+                    acdcs.query(),
+                    acdcs.query(template='first', mongoquery={'dict_content.root.value': {'$lt': 10}}),
+                    acdcs.query(current=False),
+                    acdcs.query_count(template='first'),
+                    acdcs.get_records(template='first'))
+                pages = [page async for page in acdcs.iter_query(by_page=True)]
+                titles = [record['title'] async for record in acdcs.iter_query(template='first')]
+            return templates, records, first, older, count, mine, pages, titles
+
+        server.reset_stats()
+        templates, records, first, older, count, mine, pages, titles = asyncio.run(main())
+        assert server.stats['max_in_flight'] <= 3
+
+        # The results match the CDCS class
+        assert templates.equals(curator.get_templates())
+        assert records.equals(curator.query(progress_bar=False))
+        assert len(records) == 23
+        assert first.equals(curator.query(template='first', progress_bar=False,
+                                          mongoquery={'dict_content.root.value': {'$lt': 10}}))
+        assert older.equals(curator.query(current=False, progress_bar=False))
+        assert len(older) == 26
+        assert count == 23
+        assert mine.equals(curator.get_records(template='first', progress_bar=False))
+        assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+        assert titles == records.title.tolist()
+
+    # The version must be known before calls that depend on it
+    acdcs = AsyncCDCS('https://fakeurl.fake', username='')
+    with raises(ValueError):
+        acdcs.cdcsversion
+    acdcs = AsyncCDCS('https://fakeurl.fake', username='', cdcsversion='3.0.0')
+    assert acdcs.cdcsversion == (3, 0, 0)
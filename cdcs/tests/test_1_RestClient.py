@@ -1,9 +1,10 @@
+import io
 import requests
 import responses
 from pytest import raises
 from pathlib import Path
 
-from cdcs import RestClient
+from cdcs import RestClient, HTTPCache, RetryPolicy
 
 class TestRestClient():
 
@@ -136,4 +137,180 @@ class TestRestClient():
         with responses.RequestsMock() as rsps:
             rsps.add(responses.DELETE, f'{self.host}/{rest_url}', status=200,
                      json={'value':"good!"})
-            r = client.delete(rest_url)
\ No newline at end of file
+            r = client.delete(rest_url)
+
+    def test_session(self):
+        """Test that calls are made through a reusable pooled session"""
+        client = RestClient(host=self.host, username='', pool_maxsize=4,
+                            keep_alive=False)
+        assert isinstance(client.session, requests.Session)
+        adapter = client.session.get_adapter(self.host)
+        assert adapter._pool_maxsize == 4
+        assert client.session.headers['Connection'] == 'close'
+        rest_url = 'some/url/'
+
+        # Check that the same session handles multiple calls
+        with client:
+            with responses.RequestsMock() as rsps:
+                rsps.add(responses.GET, f'{self.host}/{rest_url}', status=200,
+                         json={'value':"good!"})
+                client.get(rest_url)
+                client.get(rest_url)
+                assert len(rsps.calls) == 2
+
+    def test_retry_stream_body(self):
+        """Test that streamed bodies are resent in full on 504 retries"""
+        policy = RetryPolicy(sleep=lambda seconds: None)
+        client = RestClient(host=self.host, username='', retry_policy=policy)
+        rest_url = 'some/url/'
+        received = []
+        def callback(request):
+            body = request.body
+            received.append(body if isinstance(body, bytes) else body.read())
+            if len(received) == 1:
+                return (504, {}, '')
+            return (201, {}, '{"value": "good!"}')
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.POST, f'{self.host}/{rest_url}',
+                              callback=callback)
+            body = io.BytesIO(b'streamed body')
+            r = client.post(rest_url, data=body, idempotent=True)
+            assert r.status_code == 201
+            assert received == [b'streamed body', b'streamed body']
+
+    def test_retry_policy(self):
+        """Test backoff, Retry-After and method rules of the retry policy"""
+        waits = []
+        policy = RetryPolicy(total=3, backoff_factor=1, jitter=False,
+                             sleep=waits.append)
+        client = RestClient(host=self.host, username='', retry_policy=policy)
+        assert client.retry_policy is policy
+        rest_url = 'some/url/'
+
+        with responses.RequestsMock() as rsps:
+            # Retried statuses wait with exponential backoff or Retry-After
+            rsps.add(responses.GET, f'{self.host}/{rest_url}', status=503)
+            rsps.add(responses.GET, f'{self.host}/{rest_url}', status=429,
+                     headers={'Retry-After': '7'})
+            rsps.add(responses.GET, f'{self.host}/{rest_url}', status=502)
+            rsps.add(responses.GET, f'{self.host}/{rest_url}', json={'value': 1})
+            assert client.get(rest_url).json() == {'value': 1}
+            assert waits == [1, 7, 4]
+
+        # POST is only retried when marked idempotent
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, f'{self.host}/{rest_url}', status=503)
+            r = client.post(rest_url, checkstatus=False)
+            assert r.status_code == 503
+            assert len(rsps.calls) == 1
+
+        # Connection errors are retried until the tries run out
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, f'{self.host}/{rest_url}',
+                     body=requests.exceptions.ConnectionError('refused'))
+            with raises(requests.exceptions.ConnectionError):
+                client.get(rest_url, retry504=2)
+            assert len(rsps.calls) == 2
+
+        # Certificate and proxy errors are not retried
+        for error in [requests.exceptions.SSLError('bad certificate'),
+                      requests.exceptions.ProxyError('bad proxy')]:
+            with responses.RequestsMock() as rsps:
+                rsps.add(responses.GET, f'{self.host}/{rest_url}', body=error)
+                with raises(type(error)):
+                    client.get(rest_url)
+                assert len(rsps.calls) == 1
+
+        counters = policy.counters
+        assert counters['attempts'] == 9
+        assert counters['retries'] == 4
+        assert counters['failures'] == 1
+        assert counters['statuses'] == {503: 1, 429: 1, 502: 1}
+        assert counters['exceptions'] == {'ConnectionError': 1}
+
+        # Retries can be turned off
+        client = RestClient(host=self.host, username='', retry_policy=False)
+        assert client.retry_policy is None
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, f'{self.host}/{rest_url}', status=504)
+            assert client.get(rest_url, checkstatus=False).status_code == 504
+
+    def test_http_cache(self):
+        """Test caching, revalidation and invalidation of GET responses"""
+        cache = HTTPCache(ttls={'/rest/ttl/': 60})
+        client = RestClient(host=self.host, username='', http_cache=cache)
+        assert client.http_cache is cache
+
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            # Fresh responses are reused
+            rsps.add(responses.GET, f'{self.host}/rest/fresh/', json={'value': 1},
+                     headers={'Cache-Control': 'max-age=60'})
+            assert client.get('rest/fresh/').json() == {'value': 1}
+            r = client.get('rest/fresh/')
+            assert r.json() == {'value': 1}
+            assert r.from_cache is True
+            assert len(rsps.calls) == 1
+
+            # Different params are cached separately
+            client.get('rest/fresh/', params={'a': 1})
+            assert len(rsps.calls) == 2
+
+            # Stale responses are revalidated with the ETag
+            def callback(request):
+                if request.headers.get('If-None-Match') == '"v1"':
+                    return (304, {'ETag': '"v1"'}, '')
+                return (200, {'ETag': '"v1"', 'Cache-Control': 'no-cache'}, '{"value": 2}')
+            rsps.add_callback(responses.GET, f'{self.host}/rest/etag/', callback=callback)
+            assert client.get('rest/etag/').json() == {'value': 2}
+            r = client.get('rest/etag/')
+            assert r.status_code == 200
+            assert r.json() == {'value': 2}
+            assert rsps.calls[-1].response.status_code == 304
+
+            # Entries removed while being revalidated are still returned
+            def evicting_callback(request):
+                cache.clear()
+                return callback(request)
+            rsps.remove(responses.GET, f'{self.host}/rest/etag/')
+            rsps.add_callback(responses.GET, f'{self.host}/rest/etag/',
+                              callback=evicting_callback)
+            r = client.get('rest/etag/')
+            assert rsps.calls[-1].response.status_code == 304
+            assert r.status_code == 200
+            assert r.json() == {'value': 2}
+
+            # Per-endpoint TTLs override headers
+            rsps.add(responses.GET, f'{self.host}/rest/ttl/1/', json={'value': 3},
+                     headers={'Cache-Control': 'no-cache'})
+            client.get('rest/ttl/1/')
+            ncalls = len(rsps.calls)
+            client.get('rest/ttl/1/')
+            assert len(rsps.calls) == ncalls
+
+            # Mutating requests invalidate the resource
+            rsps.add(responses.PATCH, f'{self.host}/rest/ttl/1/assign/2', json={})
+            client.patch('rest/ttl/1/assign/2')
+            client.get('rest/ttl/1/')
+            assert len(rsps.calls) == ncalls + 2
+
+            # no-store responses are never cached
+            rsps.add(responses.GET, f'{self.host}/rest/nostore/', json={'value': 4},
+                     headers={'Cache-Control': 'no-store', 'ETag': '"x"'})
+            client.get('rest/nostore/')
+            client.get('rest/nostore/')
+            assert len(rsps.calls) == ncalls + 4
+
+    def test_http_cache_disk(self, tmpdir):
+        """Test that on-disk HTTP caches persist between clients"""
+        path = Path(tmpdir, 'http.sqlite')
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, f'{self.host}/rest/fresh/', json={'value': 1},
+                     headers={'Cache-Control': 'max-age=60'})
+            client = RestClient(host=self.host, username='', http_cache=path)
+            client.get('rest/fresh/')
+            client.http_cache.close()
+            
+            client = RestClient(host=self.host, username='', http_cache=path)
+            assert client.get('rest/fresh/').json() == {'value': 1}
+            assert len(rsps.calls) == 1
@@ -66,11 +66,59 @@ class TestCDCS():
         assert templates.title.tolist() == ['first', 'second', 'second']
         assert templates.id.tolist() == [1, 2, 3]
 
+        # Test concurrent fetching without content
+        templates = self.cdcs_v3.get_templates(current=False, max_workers=3,
+                                               include_content=False)
+        assert templates.title.tolist() == ['first', 'second', 'second']
+        assert templates.id.tolist() == [1, 2, 3]
+        assert 'content' not in templates
+
         # Test templates with is_disabled=True
         templates = self.cdcs_v3.get_templates(is_disabled=True)
         assert templates.title.tolist() == ['third']
         assert templates.id.tolist() == [4]
 
+    @responses.activate
+    def test_template_cache_v3(self):
+        """Tests caching of template information"""
+
+        # Add Mock responses
+        responses.add(responses.GET, f'{self.host}/rest/core-settings/', status=200,
+                      json={'core_version':'2.0.1'})
+        template_manager_responses(self.host, 3)
+        template_responses(self.host, 3)
+        cdcs = CDCS(host=self.host, username='', template_cache_ttl=60)
+        
+        # Test that repeated calls use the cache
+        ncalls = len(responses.calls)
+        templates = cdcs.get_templates()
+        assert len(responses.calls) == ncalls + 3
+        templates = cdcs.get_templates()
+        assert len(responses.calls) == ncalls + 3
+        assert templates.title.tolist() == ['first', 'second']
+        assert templates.id.tolist() == [1, 3]
+
+        # Test that the cache can be bypassed
+        templates = cdcs.get_templates(use_cache=False)
+        assert len(responses.calls) == ncalls + 6
+
+        # Test that query and query_count can bypass the cache
+        query_responses(self.host, 3)
+        cdcs.query(template='first', progress_bar=False)
+        ncalls = len(responses.calls)
+        cdcs.query(template='first', progress_bar=False)
+        assert len(responses.calls) == ncalls + 1
+        cdcs.query(template='first', progress_bar=False, use_cache=False)
+        assert len(responses.calls) == ncalls + 4
+        assert cdcs.query_count(template='first') == 8
+        assert len(responses.calls) == ncalls + 5
+        assert cdcs.query_count(template='first', use_cache=False) == 8
+        assert len(responses.calls) == ncalls + 8
+
+        # Test that template changes clear the cache
+        cdcs.set_current_template('second', version=1)
+        assert len(cdcs.template_cache) == 0
+
     @responses.activate
     def test_get_template_v3(self):
         """Tests get_template"""
@@ -36,6 +36,10 @@ class TestCDCS():
         records = self.cdcs_v2.query()
         assert len(records) == 12
 
+        records = self.cdcs_v2.query(max_workers=4)
+        assert len(records) == 12
+        assert records.title.tolist() == self.cdcs_v2.query().title.tolist()
+
         records = self.cdcs_v2.query(template='first')
         assert len(records) == 8
 
@@ -60,3 +64,27 @@ class TestCDCS():
         with raises(ValueError):
             records = self.cdcs_v2.query(mongoquery={"first.name": "first-record-7"},
                                       keyword='first-record-3')
+
+    @responses.activate
+    def test_iter_query_v2(self):
+        """Tests iter_query"""
+
+        # Add Mock responses
+        template_manager_responses(self.host, 2)
+        template_responses(self.host, 2)
+        query_responses(self.host, 2)
+
+        records = list(self.cdcs_v2.iter_query())
+        assert len(records) == 12
+        assert records[9]['template_title'] == 'second'
+
+        pages = list(self.cdcs_v2.iter_query(by_page=True))
+        assert len(pages) == 2
+        assert len(pages[0]) == 10
+        assert len(pages[1]) == 2
+
+        pages = list(self.cdcs_v2.iter_query(by_page=True, prefetch=False))
+        assert len(pages) == 2
+
+        records = list(self.cdcs_v2.iter_query(template='first'))
+        assert len(records) == 8
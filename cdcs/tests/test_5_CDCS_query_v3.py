@@ -1,7 +1,12 @@
+import json
+import time
+from urllib.parse import parse_qs
+import pandas as pd
 from pathlib import Path
 import requests
 import responses
-from cdcs import CDCS
+from cdcs import CDCS, Profiler
+from cdcs.CDCS._paging import get_all_pages
 from pytest import raises
 
 from mock_database import *
@@ -37,6 +42,10 @@ class TestCDCS():
         records = self.cdcs_v3.query()
         assert len(records) == 12
 
+        records = self.cdcs_v3.query(max_workers=4)
+        assert len(records) == 12
+        assert records.title.tolist() == self.cdcs_v3.query().title.tolist()
+
         records = self.cdcs_v3.query(template='first')
         assert len(records) == 8
 
@@ -61,3 +70,188 @@ class TestCDCS():
         with raises(ValueError):
             records = self.cdcs_v3.query(mongoquery={"first.name": "first-record-7"},
                                       keyword='first-record-3')
+
+        # Test query_count() matches query()
+        assert self.cdcs_v3.query_count() == 12
+        assert parse_qs(responses.calls[-1].request.body)['templates'] == ['[{"id": 1}, {"id": 3}]']
+        assert self.cdcs_v3.query_count(template='first') == 8
+        assert self.cdcs_v3.query_count(title='second-record-2') == 1
+        assert self.cdcs_v3.query_count(keyword='first-record-3') == 1
+        with raises(ValueError):
+            self.cdcs_v3.query_count(mongoquery={"first.name": "first-record-7"},
+                                     keyword='first-record-3')
+
+        # Test query_count() only limits by template version when current
+        responses.add(responses.POST, f'{self.host}/rest/data/query/',
+                      match=[responses.matchers.urlencoded_params_matcher({'query': '{}'})],
+                      json={'count': 14, 'next': None, 'previous': None, 'results': []})
+        assert self.cdcs_v3.query_count(current=False) == 14
+
+    @responses.activate
+    def test_profile_query_v3(self):
+        """Tests profiling the stages of query"""
+
+        # Add Mock responses
+        template_manager_responses(self.host, 3)
+        template_responses(self.host, 3)
+        query_responses(self.host, 3)
+
+        profiles = []
+        profiler = Profiler(callback=profiles.append, track_memory=True)
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add(responses.GET, f'{self.host}/rest/core-settings/', status=200,
+                     json={'core_version':'2.0.1'})
+            cdcs = CDCS(host=self.host, username='', profiler=profiler)
+        assert cdcs.profiler is profiler
+
+        records = cdcs.query(max_workers=2, progress_bar=False)
+        assert len(records) == 12
+        profile = profiler.last
+        assert profiles == [profile]
+        assert profile['call'] == 'query'
+        assert profile['error'] is None
+        assert profile['peak_memory'] > 0
+        for stage in ['build_query', 'http', 'json', 'pages', 'pages.http',
+                      'pages.json', 'pages.extend', 'dataframe',
+                      'template_titles', 'parse_dates']:
+            assert stage in profile['stages']
+        assert profile['counts']['pages.http'] == 1
+        assert profile['stages']['pages'] <= profile['elapsed']
+
+        # Nested high-level calls are recorded as stages
+        cdcs.get_templates()
+        assert 'template_managers' in profiler.last['stages']
+        assert 'build_query.get_templates' not in profiler.last['stages']
+
+        summary = profiler.summary()
+        assert summary.call.unique().tolist() == ['get_templates', 'query']
+        total = summary[(summary.call == 'query') & (summary.stage == 'total')]
+        assert total.calls.tolist() == [1]
+        assert 'pages.http' in profiler.report(call='query')
+
+        # Profiling is off by default
+        assert self.cdcs_v3.profiler is None
+
+    @responses.activate
+    def test_iter_query_v3(self):
+        """Tests iter_query"""
+
+        # Add Mock responses
+        template_manager_responses(self.host, 3)
+        template_responses(self.host, 3)
+        query_responses(self.host, 3)
+
+        records = list(self.cdcs_v3.iter_query())
+        assert len(records) == 12
+        assert records[9]['template_title'] == 'second'
+
+        pages = list(self.cdcs_v3.iter_query(by_page=True))
+        assert len(pages) == 2
+        assert len(pages[0]) == 10
+        assert len(pages[1]) == 2
+
+        pages = list(self.cdcs_v3.iter_query(by_page=True, prefetch=False))
+        assert len(pages) == 2
+
+        records = list(self.cdcs_v3.iter_query(template='first'))
+        assert len(records) == 8
+
+    def test_get_all_pages(self):
+        """Tests get_all_pages edge cases with concurrent page requests"""
+        
+        class Response():
+            def __init__(self, content):
+                self.content = content
+            def json(self):
+                return self.content
+
+        class Client():
+            profiler = None
+            def __init__(self, pages, fail=None):
+                self.pages = pages
+                self.fail = fail
+                self.requested = []
+            def request(self, method, rest_url, params=None, data=None,
+                        idempotent=False):
+                page = params.get('page', 1)
+                self.requested.append(page)
+                if page == self.fail:
+                    raise requests.ConnectionError('page failed')
+                time.sleep(0.05)
+                return Response(self.pages[page - 1])
+
+        # Test an empty first page falls back to following next
+        pages = [{'count': 2, 'next': 'p2', 'results': []},
+                 {'count': 2, 'next': None, 'results': [1, 2]}]
+        records = get_all_pages(Client(pages), 'get', 'rest/data/', pages[0],
+                                max_workers=4, progress_bar=False)
+        assert records == [1, 2]
+
+        # Test the first failed page stops the remaining requests
+        pages = [{'count': 40, 'next': 'next', 'results': [i]} for i in range(40)]
+        client = Client(pages, fail=2)
+        with raises(requests.ConnectionError):
+            get_all_pages(client, 'get', 'rest/data/', pages[0],
+                          max_workers=2, progress_bar=False)
+        time.sleep(0.1)
+        assert len(client.requested) < 10
+
+    @responses.activate
+    def test_sync_records_v3(self, tmpdir):
+        """Tests sync_records and local queries"""
+
+        # Add Mock responses
+        template_manager_responses(self.host, 3)
+        template_responses(self.host, 3)
+        
+        from mock_database.data import records
+        server = [dict(record) for record in records[:8]]
+        def callback(request):
+            return (200, {}, json.dumps({'count': len(server), 'next': None,
+                                         'previous': None, 'results': server}))
+        responses.add_callback(responses.POST, f'{self.host}/rest/data/query/',
+                               callback=callback)
+
+        cdcs = CDCS(self.host, username='', cdcsversion='3.0.0',
+                    record_cache=Path(tmpdir, 'records.sqlite'))
+        
+        # Local queries need synced templates
+        with raises(ValueError):
+            cdcs.query(template='first', local=True)
+        
+        # Test first sync retrieves everything
+        summary = cdcs.sync_records(template='first')
+        assert summary.updated.tolist() == [8]
+        assert summary.deleted.tolist() == [0]
+        assert summary['count'].tolist() == [8]
+
+        local = cdcs.query(template='first', local=True)
+        assert sorted(local.title.tolist()) == sorted(r['title'] for r in server)
+        assert local.template_title.unique().tolist() == ['first']
+        local = cdcs.get_records(template='first', title='first-record-2', local=True)
+        assert local.id.tolist() == [2]
+        
+        # Test later syncs store only changed records and find deletions
+        server[3] = dict(server[3], title='changed',
+                         last_change_date='2030-01-01T00:00:00Z')
+        del server[5]
+        summary = cdcs.sync_records(template='first')
+        assert summary.updated.tolist() == [1]
+        assert summary.deleted.tolist() == [1]
+        assert summary['count'].tolist() == [7]
+        local = cdcs.query(template='first', local=True, parse_dates=False)
+        assert sorted(local.id.tolist()) == sorted(r['id'] for r in server)
+        assert 'changed' in local.title.tolist()
+        
+        # Test unchanged syncs store nothing
+        summary = cdcs.sync_records(template='first')
+        assert summary.updated.tolist() == [0]
+        assert summary.deleted.tolist() == [0]
+        assert summary['count'].tolist() == [7]
+
+        # Test full syncs store everything
+        summary = cdcs.sync_records(template='first', full=True)
+        assert summary.updated.tolist() == [7]
+        
+        with raises(ValueError):
+            cdcs.query(template='first', keyword='first', local=True)
@@ -51,6 +51,30 @@ class TestCDCS():
         assert len(records) == 1
         assert records.title[0] == 'first-record-4' 
 
+    @responses.activate
+    def test_iter_records_v2(self):
+        """Tests iter_records()"""
+
+        # Add Mock responses
+        record_responses(self.host, 2)
+        template_responses(self.host, 2)
+        template_manager_responses(self.host, 2)
+
+        # Test individual records
+        records = list(self.cdcs_v2.iter_records())
+        assert len(records) == 12
+        assert records[3]['title'] == 'first-record-4'
+
+        # Test pages with and without prefetching
+        pages = list(self.cdcs_v2.iter_records(by_page=True))
+        assert sum(len(page) for page in pages) == 12
+        pages = list(self.cdcs_v2.iter_records(by_page=True, prefetch=False))
+        assert sum(len(page) for page in pages) == 12
+
+        # Test template
+        records = list(self.cdcs_v2.iter_records(template='first'))
+        assert len(records) == 8
+
     @responses.activate
     def test_get_record_v2(self):
         """Tests get_record()"""
@@ -99,6 +123,13 @@ class TestCDCS():
         self.cdcs_v2.assign_records(workspace, ids=records.id.tolist())
         self.cdcs_v2.assign_records(workspace, ids=record.id)
 
+        # Test concurrent assign with failures collected
+        results = self.cdcs_v2.assign_records(workspace, ids=[1, 2, 99],
+                                             max_workers=3, raise_errors=False)
+        assert results.status.tolist() == ['assigned', 'assigned', 'failed']
+        with raises(Exception):
+            self.cdcs_v2.assign_records(workspace, ids=[1, 99], max_workers=2)
+
         # Test assign by template
         self.cdcs_v2.assign_records(workspace, template='first')
         
@@ -171,6 +202,74 @@ class TestCDCS():
         with raises(TypeError):
             self.cdcs_v2.upload_record(template, title=title, content=23746)
 
+    @responses.activate
+    def test_index_record_titles_v2(self):
+        """Tests index_record_titles()"""
+
+        # Add Mock responses
+        record_responses(self.host, 2)
+        query_responses(self.host, 2)
+        template_responses(self.host, 2)
+        template_manager_responses(self.host, 2)
+
+        # Test building the index
+        titles = self.cdcs_v2.index_record_titles('second')
+        assert titles == {'second-record-1', 'second-record-2',
+                          'second-record-3', 'second-record-4'}
+        assert self.cdcs_v2.index_record_titles('second') is titles
+
+        # Test upload_record uses the index
+        title = 'second-record-4'
+        content = '<?xml version="1.0" encoding="utf-8"?><second><name>second-record-4</name></second>'
+        with raises(ValueError):
+            self.cdcs_v2.upload_record('second', title=title, content=content)
+        
+        # Test uploads update the index
+        titles.discard(title)
+        self.cdcs_v2.upload_record('second', title=title, content=content)
+        assert title in titles
+
+        # Test clearing the index
+        self.cdcs_v2.clear_record_title_index()
+        assert len(self.cdcs_v2.title_index) == 0
+        self.cdcs_v2.upload_record('second', title=title, content=content)
+
+    @responses.activate
+    def test_upload_records_v2(self, tmpdir):
+        """Tests upload_records()"""
+
+        # Add Mock responses
+        record_responses(self.host, 2)
+        query_responses(self.host, 2)
+        template_responses(self.host, 2)
+        template_manager_responses(self.host, 2)
+        workspace_responses(self.host, 2)
+
+        # Specify content and save to a file
+        title = 'second-record-4'
+        content = '<?xml version="1.0" encoding="utf-8"?><second><name>second-record-4</name></second>'
+        filename = Path(tmpdir, f'{title}.xml')
+        with open(filename, 'w') as f:
+            f.write(content)
+
+        # Test duplicates in the database and in the batch are skipped
+        results = self.cdcs_v2.upload_records('second', [(title, content), filename])
+        assert results.status.tolist() == ['duplicate', 'duplicate']
+
+        # Test concurrent uploads with workspace
+        results = self.cdcs_v2.upload_records('second', [(title, content), filename],
+                                             workspace='Global Public Workspace',
+                                             duplicatecheck=False, max_workers=2)
+        assert results.status.tolist() == ['uploaded', 'uploaded']
+        assert results.id.tolist() == ['12', '12']
+        assert results.title.tolist() == [title, title]
+
+        # Test invalid items are reported
+        results = self.cdcs_v2.upload_records('second', [(title, 23746)],
+                                             duplicatecheck=False)
+        assert results.status[0] == 'failed'
+        assert results.error[0] == 'content must be str or bytes'
+
     @responses.activate
     def test_update_record_v2(self, tmpdir):
         """Tests update_record()"""
@@ -38,6 +38,11 @@ class TestCDCS():
         records = self.cdcs_v3.get_records()
         assert len(records) == 12
 
+        # Test concurrent page retrieval
+        records = self.cdcs_v3.get_records(max_workers=4)
+        assert len(records) == 12
+        assert records.id.tolist() == list(range(1, 13))
+
         # Test template
         records = self.cdcs_v3.get_records(template='first')
         assert len(records) == 8
@@ -52,6 +57,30 @@ class TestCDCS():
         assert len(records) == 1
         assert records.title[0] == 'first-record-4' 
 
+    @responses.activate
+    def test_iter_records_v3(self):
+        """Tests iter_records()"""
+
+        # Add Mock responses
+        record_responses(self.host, 3)
+        template_responses(self.host, 3)
+        template_manager_responses(self.host, 3)
+
+        # Test individual records
+        records = list(self.cdcs_v3.iter_records())
+        assert len(records) == 12
+        assert records[3]['title'] == 'first-record-4'
+
+        # Test pages with and without prefetching
+        pages = list(self.cdcs_v3.iter_records(by_page=True))
+        assert sum(len(page) for page in pages) == 12
+        pages = list(self.cdcs_v3.iter_records(by_page=True, prefetch=False))
+        assert sum(len(page) for page in pages) == 12
+
+        # Test template
+        records = list(self.cdcs_v3.iter_records(template='first'))
+        assert len(records) == 8
+
     @responses.activate
     def test_get_record_v3(self):
         """Tests get_record()"""
@@ -100,6 +129,13 @@ class TestCDCS():
         self.cdcs_v3.assign_records(workspace, ids=records.id.tolist())
         self.cdcs_v3.assign_records(workspace, ids=record.id)
 
+        # Test concurrent assign with failures collected
+        results = self.cdcs_v3.assign_records(workspace, ids=[1, 2, 99],
+                                             max_workers=3, raise_errors=False)
+        assert results.status.tolist() == ['assigned', 'assigned', 'failed']
+        with raises(Exception):
+            self.cdcs_v3.assign_records(workspace, ids=[1, 99], max_workers=2)
+
         # Test assign by template
         self.cdcs_v3.assign_records(workspace, template='first')
         
@@ -172,6 +208,85 @@ class TestCDCS():
         with raises(TypeError):
             self.cdcs_v3.upload_record(template, title=title, content=23746)
 
+    @responses.activate
+    def test_index_record_titles_v3(self):
+        """Tests index_record_titles()"""
+
+        # Add Mock responses
+        record_responses(self.host, 3)
+        query_responses(self.host, 3)
+        template_responses(self.host, 3)
+        template_manager_responses(self.host, 3)
+
+        # Test building the index
+        titles = self.cdcs_v3.index_record_titles('second')
+        assert titles == {'second-record-1', 'second-record-2',
+                          'second-record-3', 'second-record-4'}
+        assert self.cdcs_v3.index_record_titles('second') is titles
+
+        # Test upload_record uses the index
+        title = 'second-record-4'
+        content = '<?xml version="1.0" encoding="utf-8"?><second><name>second-record-4</name></second>'
+        with raises(ValueError):
+            self.cdcs_v3.upload_record('second', title=title, content=content)
+        
+        # Test uploads update the index
+        titles.discard(title)
+        self.cdcs_v3.upload_record('second', title=title, content=content)
+        assert title in titles
+
+        # Test clearing the index
+        self.cdcs_v3.clear_record_title_index()
+        assert len(self.cdcs_v3.title_index) == 0
+        self.cdcs_v3.upload_record('second', title=title, content=content)
+
+    @responses.activate
+    def test_upload_records_v3(self, tmpdir):
+        """Tests upload_records()"""
+
+        # Add Mock responses
+        record_responses(self.host, 3)
+        query_responses(self.host, 3)
+        template_responses(self.host, 3)
+        template_manager_responses(self.host, 3)
+        workspace_responses(self.host, 3)
+
+        # Specify content and save to a file
+        title = 'second-record-4'
+        content = '<?xml version="1.0" encoding="utf-8"?><second><name>second-record-4</name></second>'
+        filename = Path(tmpdir, f'{title}.xml')
+        with open(filename, 'w') as f:
+            f.write(content)
+
+        # Test duplicates in the database and in the batch are skipped
+        results = self.cdcs_v3.upload_records('second', [(title, content), filename])
+        assert results.status.tolist() == ['duplicate', 'duplicate']
+        assert len(self.cdcs_v3.title_index) == 0
+
+        # Test concurrent uploads with workspace
+        results = self.cdcs_v3.upload_records('second', [(title, content), filename],
+                                             workspace='Global Public Workspace',
+                                             duplicatecheck=False, max_workers=2)
+        assert results.status.tolist() == ['uploaded', 'uploaded']
+        assert results.id.tolist() == [12, 12]
+        assert results.title.tolist() == [title, title]
+
+        # Test invalid items are reported
+        results = self.cdcs_v3.upload_records('second', [(title, 23746)],
+                                             duplicatecheck=False)
+        assert results.status[0] == 'failed'
+        assert results.error[0] == 'content must be str or bytes'
+
+        # Test failed workspace assignments are reported separately
+        responses.replace(responses.PATCH, f'{self.host}/rest/data/12/assign/1',
+                          status=403)
+        results = self.cdcs_v3.upload_records('second', [filename],
+                                             workspace='Global Public Workspace',
+                                             duplicatecheck=False)
+        assert results.status[0] == 'unassigned'
+        assert results.id[0] == 12
+        assert results.title[0] == title
+
     @responses.activate
     def test_update_record_v3(self, tmpdir):
         """Tests update_record()"""
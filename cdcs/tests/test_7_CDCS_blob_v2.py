@@ -51,6 +51,33 @@ class TestCDCS():
                                        workspace='Global Public Workspace')
         assert handle == f'{self.host}/rest/blob/download/1/'
 
+    @responses.activate
+    def test_bulk_blobs_v2(self, tmpdir):
+        """Tests upload_blobs() and download_blobs()"""
+
+        # Add Mock responses
+        blob_responses(self.host, 2)
+        workspace_responses(self.host, 2)
+
+        # Test upload_blobs() with an existing blob
+        filename = Path(tmpdir, 'test_blob.txt')
+        with open(filename, 'w') as f:
+            f.write('This is my blob for testing')
+        results = self.cdcs_v2.upload_blobs([filename], max_workers=2,
+                                            workspace='Global Public Workspace',
+                                            progress_bar=False)
+        assert results.status.tolist() == ['exists']
+
+        # Test download_blobs() into a new directory
+        savedir = Path(tmpdir, 'downloads')
+        savedir.mkdir()
+        blob = self.cdcs_v2.get_blob(filename='test_blob.txt')
+        results = self.cdcs_v2.download_blobs(blob, savedir=savedir,
+                                              progress_bar=False)
+        assert results.status.tolist() == ['downloaded']
+        with open(Path(savedir, 'test_blob.txt')) as f:
+            assert f.read() == 'This is my blob for testing'
+
     @responses.activate
     def test_get_blobs_v2(self):
         """Tests get_blobs()"""
@@ -112,6 +139,15 @@ class TestCDCS():
         self.cdcs_v2.assign_blobs(workspace='Global Public Workspace',
                                blobs=blob)
 
+        # Test concurrent assign_blobs() with failures collected
+        results = self.cdcs_v2.assign_blobs(workspace='Global Public Workspace',
+                                           ids=[1, 2, 99], max_workers=3,
+                                           raise_errors=False)
+        assert results.status.tolist() == ['assigned', 'assigned', 'failed']
+        with raises(Exception):
+            self.cdcs_v2.assign_blobs(workspace='Global Public Workspace',
+                                     ids=[1, 99], max_workers=2)
+
         # Test assign_blobs() with invalid inputs
         with raises(ValueError):
             self.cdcs_v2.assign_blobs(workspace='Global Public Workspace',
@@ -149,6 +185,11 @@ class TestCDCS():
         content = self.cdcs_v2.get_blob_contents(filename='test_blob.txt')
         assert content == b'This is my blob for testing'
         
+        # Test iter_blob_contents()
+        chunks = list(self.cdcs_v2.iter_blob_contents(blob=blob, chunk_size=4))
+        assert len(chunks) == 7
+        assert b''.join(chunks) == b'This is my blob for testing'
+
         # Test get_blob_contents() with invalid inputs
         with raises(ValueError):
             content = self.cdcs_v2.get_blob_contents(blob=blob, id='1')
@@ -188,6 +229,35 @@ class TestCDCS():
             assert f.read() == 'This is my blob for testing'
         filename.unlink()
 
+        # Test download_blob() with checksum verification
+        savepath = self.cdcs_v2.download_blob(blob=blob, savedir=tmpdir, chunk_size=4,
+                                             checksum='e74aea1c4bc3f360487181892d1c710b4dca989fd25e4fcd02575a1232a0c3b4')
+        assert savepath == filename
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        with raises(ValueError):
+            self.cdcs_v2.download_blob(blob=blob, savedir=tmpdir, checksum='bad')
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        assert len(list(Path(tmpdir).iterdir())) == 1
+        filename.unlink()
+
+        # Test resuming download_blob() from a partial file
+        partpath = Path(tmpdir, '.test_blob.txt.part')
+        with open(partpath, 'wb') as f:
+            f.write(b'This is my')
+        self.cdcs_v2.download_blob(blob=blob, savedir=tmpdir, resume=True)
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        assert not partpath.exists()
+        filename.unlink()
+
+        # Test download_blob() of parallel ranges
+        self.cdcs_v2.download_blob(blob=blob, savedir=tmpdir, range_workers=3)
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        filename.unlink()
+
         # Test download_blob() with invalid inputs
         with raises(ValueError):
             self.cdcs_v2.download_blob(blob=blob, id='1')
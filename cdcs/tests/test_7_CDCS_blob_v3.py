@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+import mmap
 from pathlib import Path
 import requests
 import responses
 from cdcs import CDCS
+from cdcs.CDCS import _blob
+from cdcs.CDCS._multipart import MultipartEncoder
 from pytest import raises
 
 from mock_database import *
@@ -26,7 +30,7 @@ class TestCDCS():
             return self.__cdcs_v3
 
     @responses.activate
-    def test_upload_blob_v3(self, tmpdir):
+    def test_upload_blob_v3(self, tmpdir, capsys):
         """Tests upload_blob()"""
 
         # Add Mock responses
@@ -52,6 +56,104 @@ class TestCDCS():
                                        workspace='Global Public Workspace')
         assert handle == f'{self.host}/rest/blob/download/1/'
 
+        # Test upload_blob() from a memory map with a progress bar
+        handle = self.cdcs_v3.upload_blob(filename=filename, use_mmap=True,
+                                          progress_bar=True)
+        assert handle == f'{self.host}/rest/blob/download/1/'
+
+        # Test verbose only reports created blobs
+        capsys.readouterr()
+        self.cdcs_v3.upload_blob(filename=filename, verbose=True)
+        assert 'uploaded as blob' in capsys.readouterr().out
+        responses.replace(responses.POST, f'{self.host}/rest/blob/',
+                          json={'id': '1', 'filename': 'test_blob.txt',
+                                'handle': f'{self.host}/rest/blob/download/1/'},
+                          status=200)
+        self.cdcs_v3.upload_blob(filename=filename, verbose=True)
+        assert 'uploaded as blob' not in capsys.readouterr().out
+
+    def test_multipart_encoder(self, tmpdir):
+        """Tests the streamed multipart body used by upload_blob()"""
+
+        # Create file to upload
+        filename = Path(tmpdir, 'test_blob.txt')
+        with open(filename, 'wb') as f:
+            f.write(b'This is my blob for testing')
+
+        # Compare streamed body against one built by requests
+        with open(filename, 'rb') as f:
+            sent = []
+            body = MultipartEncoder({'filename': filename, 'pid': None},
+                                    'blob', f, callback=sent.append)
+            boundary = body.content_type.split('boundary=')[1]
+            content = b''.join(body)
+            assert len(content) == len(body) == sum(sent)
+
+            f.seek(0)
+            expected, content_type = requests.models.RequestEncodingMixin._encode_files(
+                {'blob': f}, {'filename': filename})
+            expected = expected.replace(content_type.split('boundary=')[1].encode(),
+                                        boundary.encode())
+            assert content == expected
+
+            # Test rewinding for resends
+            body.seek(0)
+            assert b''.join(body) == expected
+
+        # Test memory mapped source in small reads
+        with open(filename, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                body = MultipartEncoder({}, 'blob', mm, filename='test_blob.txt')
+                chunks = []
+                while True:
+                    chunk = body.read(5)
+                    if len(chunk) == 0:
+                        break
+                    assert len(chunk) <= 5
+                    chunks.append(chunk)
+                assert b'This is my blob for testing' in b''.join(chunks)
+
+    @responses.activate
+    def test_upload_blobs_v3(self, tmpdir):
+        """Tests upload_blobs()"""
+
+        # Add Mock responses
+        blob_responses(self.host, 3)
+        workspace_responses(self.host, 3)
+
+        # Create files to upload: one matching an existing blob
+        existing = Path(tmpdir, 'test_blob.txt')
+        with open(existing, 'wb') as f:
+            f.write(b'This is my blob for testing')
+        new = Path(tmpdir, 'new_blob.txt')
+        with open(new, 'wb') as f:
+            f.write(b'A new blob')
+        missing = Path(tmpdir, 'missing.txt')
+
+        # Test upload_blobs() skipping existing blobs
+        for max_workers in [1, 3]:
+            results = self.cdcs_v3.upload_blobs([existing, new, missing],
+                                                workspace='Global Public Workspace',
+                                                max_workers=max_workers,
+                                                progress_bar=False)
+            assert results.filename.tolist() == [str(existing), str(new), str(missing)]
+            assert results.status.tolist() == ['exists', 'uploaded', 'failed']
+            assert results.id.tolist()[:2] == [1, 1]
+            assert results.error[2] is not None
+
+        # Test upload_blobs() without skipping
+        results = self.cdcs_v3.upload_blobs([existing], skip_existing=False,
+                                            use_mmap=True, progress_bar=False)
+        assert results.status.tolist() == ['uploaded']
+
+        # Test failed workspace assignments are reported separately
+        responses.replace(responses.PATCH, f'{self.host}/rest/blob/1/assign/1',
+                          status=403)
+        results = self.cdcs_v3.upload_blobs([new], workspace='Global Public Workspace',
+                                            progress_bar=False)
+        assert results.status.tolist() == ['unassigned']
+        assert results.id.tolist() == [1]
+
     @responses.activate
     def test_get_blobs_v3(self):
         """Tests get_blobs()"""
@@ -113,6 +215,15 @@ class TestCDCS():
         self.cdcs_v3.assign_blobs(workspace='Global Public Workspace',
                                blobs=blob)
 
+        # Test concurrent assign_blobs() with failures collected
+        results = self.cdcs_v3.assign_blobs(workspace='Global Public Workspace',
+                                           ids=[1, 2, 99], max_workers=3,
+                                           raise_errors=False)
+        assert results.status.tolist() == ['assigned', 'assigned', 'failed']
+        with raises(Exception):
+            self.cdcs_v3.assign_blobs(workspace='Global Public Workspace',
+                                     ids=[1, 99], max_workers=2)
+
         # Test assign_blobs() with invalid inputs
         with raises(ValueError):
             self.cdcs_v3.assign_blobs(workspace='Global Public Workspace',
@@ -150,6 +261,22 @@ class TestCDCS():
         content = self.cdcs_v3.get_blob_contents(filename='test_blob.txt')
         assert content == b'This is my blob for testing'
         
+        # Test iter_blob_contents()
+        chunks = list(self.cdcs_v3.iter_blob_contents(blob=blob, chunk_size=4))
+        assert len(chunks) == 7
+        assert b''.join(chunks) == b'This is my blob for testing'
+
+        # Test iter_blob_contents() with checksum verification
+        checksum = 'e74aea1c4bc3f360487181892d1c710b4dca989fd25e4fcd02575a1232a0c3b4'
+        chunks = list(self.cdcs_v3.iter_blob_contents(blob=blob, chunk_size=4,
+                                                      checksum=checksum))
+        assert b''.join(chunks) == b'This is my blob for testing'
+        chunks = []
+        with raises(ValueError):
+            for chunk in self.cdcs_v3.iter_blob_contents(blob=blob, checksum='bad'):
+                chunks.append(chunk)
+        assert b''.join(chunks) == b'This is my blob for testing'
+
         # Test get_blob_contents() with invalid inputs
         with raises(ValueError):
             content = self.cdcs_v3.get_blob_contents(blob=blob, id=1)
@@ -159,7 +286,73 @@ class TestCDCS():
             content = self.cdcs_v3.get_blob_contents(id=1, filename='test_blob.txt')
 
     @responses.activate
-    def test_download_blob_v3(self, tmpdir):
+    def test_blob_cache_v3(self, tmpdir):
+        """Tests get_blob_contents() and download_blob() with a blob cache"""
+        blob_responses(self.host, 3)
+        cdcs = CDCS(self.host, username='', cdcsversion='3.0.0',
+                    blob_cache=Path(tmpdir, 'cache'))
+        content = b'This is my blob for testing'
+
+        blob = cdcs.get_blob(filename='test_blob.txt')
+        assert cdcs.get_blob_contents(blob=blob) == content
+        ncalls = len(responses.calls)
+
+        # Test contents are served from the cache without REST calls
+        assert cdcs.get_blob_contents(id=1) == content
+        assert cdcs.get_blob_contents(blob=blob) == content
+        savepath = cdcs.download_blob(blob=blob, savedir=tmpdir,
+                                      cache_link='hardlink')
+        assert savepath.read_bytes() == content
+        assert savepath.stat().st_nlink == 2
+        assert len(responses.calls) == ncalls
+
+        # Test bad cached contents are replaced when a checksum is given
+        cachepath = cdcs.blob_cache.get_path(cdcs.blob_cache_key(1))
+        cachepath.chmod(0o644)
+        cachepath.write_bytes(b'bad')
+        cdcs.download_blob(blob=blob, savedir=tmpdir,
+                           checksum='e74aea1c4bc3f360487181892d1c710b4dca989fd25e4fcd02575a1232a0c3b4')
+        assert len(responses.calls) == ncalls + 1
+        assert cdcs.blob_cache.get(cdcs.blob_cache_key(1)) == content
+
+    @responses.activate
+    def test_download_blobs_v3(self, tmpdir):
+        """Tests download_blobs()"""
+
+        # Add Mock responses
+        blob_responses(self.host, 3)
+        blobs = self.cdcs_v3.get_blobs()
+        filename = Path(tmpdir, 'test_blob.txt')
+
+        # Test download_blobs() with a failing blob
+        for max_workers in [1, 2]:
+            results = self.cdcs_v3.download_blobs(blobs, savedir=tmpdir,
+                                                  max_workers=max_workers,
+                                                  progress_bar=False)
+            assert results.id.tolist() == [1, 2]
+            assert results.status.tolist()[1] == 'failed'
+            with open(filename) as f:
+                assert f.read() == 'This is my blob for testing'
+        
+        # First download was new, second found the file
+        results = self.cdcs_v3.download_blobs(blobs.iloc[0], savedir=tmpdir,
+                                              progress_bar=False)
+        assert results.status.tolist() == ['exists']
+        with open(filename, 'wb') as f:
+            f.write(b'changed')
+        results = self.cdcs_v3.download_blobs(blobs.iloc[0], savedir=tmpdir,
+                                              progress_bar=False)
+        assert results.status.tolist() == ['downloaded']
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        
+        # Test duplicate file names
+        results = self.cdcs_v3.download_blobs(blobs.iloc[[0, 0]], savedir=tmpdir,
+                                              progress_bar=False)
+        assert results.status.tolist() == ['exists', 'failed']
+
+    @responses.activate
+    def test_download_blob_v3(self, tmpdir, monkeypatch):
         """Tests download_blob()"""
 
         # Add Mock responses
@@ -189,6 +382,72 @@ class TestCDCS():
             assert f.read() == 'This is my blob for testing'
         filename.unlink()
 
+        # Count files read back to compute checksums
+        reads = []
+        file_hexdigest = _blob.file_hexdigest
+        def counted_hexdigest(*args, **kwargs):
+            reads.append(args[0])
+            return file_hexdigest(*args, **kwargs)
+        monkeypatch.setattr(_blob, 'file_hexdigest', counted_hexdigest)
+
+        # Test download_blob() with checksum verification while streaming
+        savepath = self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir, chunk_size=4,
+                                             checksum='e74aea1c4bc3f360487181892d1c710b4dca989fd25e4fcd02575a1232a0c3b4')
+        assert savepath == filename
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        with raises(ValueError):
+            self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir, checksum='bad')
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        assert len(list(Path(tmpdir).iterdir())) == 1
+        assert len(reads) == 0
+        filename.unlink()
+
+        # Test checksums of resumed downloads are computed from the file
+        partpath = Path(tmpdir, '.test_blob.txt.part')
+        with open(partpath, 'wb') as f:
+            f.write(b'This is my')
+        self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir, resume=True,
+                                   checksum='e74aea1c4bc3f360487181892d1c710b4dca989fd25e4fcd02575a1232a0c3b4')
+        assert len(reads) == 1
+        filename.unlink()
+
+        # Test resuming download_blob() from a partial file
+        partpath = Path(tmpdir, '.test_blob.txt.part')
+        with open(partpath, 'wb') as f:
+            f.write(b'This is my')
+        self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir, resume=True)
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        assert not partpath.exists()
+        filename.unlink()
+
+        # Test download_blob() of parallel ranges
+        self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir, range_workers=3)
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        filename.unlink()
+
+        # Test parallel ranges of an empty blob
+        emptypath = Path(tmpdir, 'empty.txt')
+        _blob.download_blob_ranges(self.cdcs_v3, blob, emptypath, 0,
+                                   range_workers=3)
+        assert emptypath.read_bytes() == b''
+        emptypath.unlink()
+
+        # Test simultaneous downloads of the same blob use separate files
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            paths = list(executor.map(
+                lambda i: self.cdcs_v3.download_blob(blob=blob, savedir=tmpdir,
+                                                     chunk_size=2),
+                range(4)))
+        assert paths == [filename] * 4
+        with open(filename) as f:
+            assert f.read() == 'This is my blob for testing'
+        assert len(list(Path(tmpdir).iterdir())) == 1
+        filename.unlink()
+
         # Test download_blob() with invalid inputs
         with raises(ValueError):
             self.cdcs_v3.download_blob(blob=blob, id=1)